@@ -0,0 +1,300 @@
+"""
+Offline benchmarks for Energy News Bot
+Runs crawl → filter → generate → post against local stand-ins and compares with a stored baseline
+
+Usage:
+    python -m benchmarks.bench                      # small scenario, compare with baseline
+    python -m benchmarks.bench --scenario medium --llm-failure-rate 0.05
+    python -m benchmarks.bench --scenario all --save-baseline
+"""
+import argparse
+import json
+import logging
+import math
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Python 3.13 compatibility - must be imported before tweepy
+import imghdr_compat
+
+from benchmarks.corpus import FeedServer, build_corpus
+from benchmarks.fakes import FakeMediaAPI, FakeOpenAI, FakeXClient
+from crawler.rss_crawler import RSSCrawler
+from database.storage import connect
+from poster.x_poster import XPoster
+from processor.llm_executor import LLMExecutor
+from processor.llm_processor import LLMProcessor
+
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+# Corpus sizes (feeds x items per feed)
+SCENARIOS = {
+    'small': {'feeds': 5, 'items': 20},
+    'medium': {'feeds': 20, 'items': 50},
+    'large': {'feeds': 50, 'items': 100},
+}
+
+COMPONENTS = ['crawler', 'recrawl', 'filter', 'generate', 'poster', 'pipeline']
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for no samples)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def timed(fn: Callable, samples: List[float]) -> Callable:
+    """Wrap fn so every call's wall time (seconds) is appended to samples."""
+    lock = threading.Lock()
+
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with lock:
+                samples.append(time.perf_counter() - started)
+
+    return wrapper
+
+
+def summarize(items: int, seconds: float, samples: List[float]) -> Dict:
+    return {
+        'items': items,
+        'seconds': round(seconds, 3),
+        'articles_per_sec': round(items / seconds, 2) if seconds > 0 else 0.0,
+        'calls': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 1),
+        'p99_ms': round(percentile(samples, 99) * 1000, 1),
+    }
+
+
+def run_scenario(name: str, args) -> Dict:
+    """
+    Run one full pipeline pass on a fresh database.
+
+    Returns:
+        {component: summary} - see summarize()
+    """
+    size = SCENARIOS[name]
+    corpus = build_corpus(size['feeds'], size['items'], duplicate_rate=args.duplicate_rate, seed=args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp, FeedServer(corpus, latency_ms=args.feed_latency_ms,
+                                                          failure_rate=args.feed_failure_rate,
+                                                          seed=args.seed) as server:
+        db_path = str(Path(tmp) / "bench.db")
+        conn = connect(db_path)
+        conn.executemany("""
+            INSERT INTO sources (name, rss_url, website_url, priority, enabled)
+            VALUES (?, ?, '', 1, 1)
+        """, [(f"Bench Feed {i}", url) for i, url in enumerate(server.urls())])
+        conn.commit()
+
+        # Every feed is on one local host, so lift the per-host cap to the worker count
+        crawler = RSSCrawler(db_path, max_workers=args.crawl_workers, per_host_limit=args.crawl_workers)
+        fetch_samples: List[float] = []
+        crawler._fetch_feed = timed(crawler._fetch_feed, fetch_samples)
+
+        processor = LLMProcessor(
+            db_path, 'benchmark',
+            executor=LLMExecutor(max_concurrency=args.llm_concurrency),
+            use_cache=not args.no_cache,
+            fused=args.fused
+        )
+        processor.client = FakeOpenAI(
+            latency_ms=args.llm_latency_ms,
+            failure_rate=args.llm_failure_rate,
+            rate_limit_rate=args.llm_rate_limit_rate,
+            seed=args.seed
+        )
+        llm_samples: List[float] = []
+        processor._chat = timed(processor._chat, llm_samples)
+
+        poster = XPoster(db_path, 'benchmark', 'benchmark', 'benchmark', 'benchmark')
+        poster.client = FakeXClient(
+            latency_ms=args.x_latency_ms,
+            failure_rate=args.x_failure_rate,
+            rate_limit_rate=args.x_rate_limit_rate,
+            seed=args.seed
+        )
+        poster.api = FakeMediaAPI(seed=args.seed)
+        post_samples: List[float] = []
+        poster.client.create_tweet = timed(poster.client.create_tweet, post_samples)
+
+        # Time from pipeline start until each tweet went out
+        posted_after: List[float] = []
+        create_tweet = poster.client.create_tweet
+
+        def create_and_stamp(*a, **kw):
+            response = create_tweet(*a, **kw)
+            posted_after.append(time.perf_counter() - pipeline_started)
+            return response
+
+        poster.client.create_tweet = create_and_stamp
+
+        results = {}
+        pipeline_started = time.perf_counter()
+
+        started = time.perf_counter()
+        crawl_stats = crawler.crawl_all_sources(hours_back=48)
+        results['crawler'] = summarize(crawl_stats['articles_found'], time.perf_counter() - started, fetch_samples)
+
+        # filter_articles takes up to 50 representatives per call; drain the queue
+        started = time.perf_counter()
+        llm_samples.clear()
+        decided = 0
+        for _ in range(1000):
+            stats = processor.filter_articles()
+            progress = stats['approved'] + stats['filtered_out'] + stats['duplicates']
+            decided += progress
+            if stats['total'] == 0 or progress == 0:
+                break
+        results['filter'] = summarize(decided, time.perf_counter() - started, list(llm_samples))
+
+        started = time.perf_counter()
+        llm_samples.clear()
+        tweet_stats = processor.generate_tweets()
+        results['generate'] = summarize(tweet_stats['generated'], time.perf_counter() - started, list(llm_samples))
+
+        # No slot spacing, so every draft is due at once; after a 429 wait for the reset
+        started = time.perf_counter()
+        posted = 0
+        for _ in range(1000):
+            stats = poster.post_tweets(max_tweets=1000, delay_seconds=0)
+            posted += stats['posted']
+            if stats['next_post_at'] is None:
+                break
+            if stats['total'] == 0:
+                time.sleep(0.25)
+        results['poster'] = summarize(posted, time.perf_counter() - started, post_samples)
+
+        results['pipeline'] = summarize(crawl_stats['articles_new'], time.perf_counter() - pipeline_started, posted_after)
+
+        # Second pass over unchanged feeds (conditional GET path)
+        fetch_samples.clear()
+        started = time.perf_counter()
+        recrawl_stats = crawler.crawl_all_sources(hours_back=48)
+        results['recrawl'] = summarize(recrawl_stats['sources_crawled'], time.perf_counter() - started, fetch_samples)
+
+        with sqlite3.connect(db_path) as check:
+            results['pipeline']['articles_by_status'] = dict(
+                check.execute("SELECT status, COUNT(*) FROM articles GROUP BY status").fetchall()
+            )
+
+        if processor.cache:
+            processor.cache.close()
+        conn.close()
+
+    return results
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compare against the baseline.
+
+    Returns:
+        One message per regression: throughput down or p99 up by more than tolerance
+    """
+    regressions = []
+    for scenario, components in current.items():
+        for component, now in components.items():
+            before = baseline.get(scenario, {}).get(component)
+            if not before:
+                continue
+            if before['articles_per_sec'] and now['articles_per_sec'] < before['articles_per_sec'] * (1 - tolerance):
+                regressions.append(
+                    f"{scenario}/{component}: {now['articles_per_sec']} articles/sec "
+                    f"(baseline {before['articles_per_sec']})"
+                )
+            if before['p99_ms'] and now['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+                regressions.append(
+                    f"{scenario}/{component}: p99 {now['p99_ms']} ms (baseline {before['p99_ms']} ms)"
+                )
+    return regressions
+
+
+def print_report(results: Dict, baseline: Dict):
+    for scenario, components in results.items():
+        print(f"\n📊 Scenario: {scenario}")
+        print(f"   {'component':<10} {'items':>6} {'seconds':>8} {'art/s':>8} {'calls':>6} {'p50 ms':>8} {'p99 ms':>8}  vs baseline")
+        for component in COMPONENTS:
+            row = components.get(component)
+            if not row:
+                continue
+            before = baseline.get(scenario, {}).get(component)
+            delta = ''
+            if before and before['articles_per_sec']:
+                change = row['articles_per_sec'] / before['articles_per_sec'] - 1
+                delta = f"{change:+.0%} art/s"
+            print(
+                f"   {component:<10} {row['items']:>6} {row['seconds']:>8.2f} {row['articles_per_sec']:>8.2f} "
+                f"{row['calls']:>6} {row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f}  {delta}"
+            )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Energy News Bot offline benchmarks")
+    parser.add_argument('--scenario', default='small', choices=list(SCENARIOS) + ['all'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--duplicate-rate', type=float, default=0.1, help='Share of syndicated copies in the corpus')
+    parser.add_argument('--feed-latency-ms', type=float, default=50)
+    parser.add_argument('--feed-failure-rate', type=float, default=0.0)
+    parser.add_argument('--crawl-workers', type=int, default=8)
+    parser.add_argument('--llm-latency-ms', type=float, default=400)
+    parser.add_argument('--llm-failure-rate', type=float, default=0.0, help='Share of LLM calls failing with a 500')
+    parser.add_argument('--llm-rate-limit-rate', type=float, default=0.0, help='Share of LLM calls answered with a 429')
+    parser.add_argument('--llm-concurrency', type=int, default=8)
+    parser.add_argument('--no-cache', action='store_true', help='Disable the LLM response cache')
+    parser.add_argument('--fused', action='store_true', help='Filter and draft tweets in one LLM request')
+    parser.add_argument('--x-latency-ms', type=float, default=250)
+    parser.add_argument('--x-failure-rate', type=float, default=0.0)
+    parser.add_argument('--x-rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--baseline', default=str(BASELINE_PATH))
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed regression before failing (0.2 = 20%%)')
+    parser.add_argument('--output', help='Also write the results as JSON here')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    scenarios = list(SCENARIOS) if args.scenario == 'all' else [args.scenario]
+    results = {name: run_scenario(name, args) for name in scenarios}
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+
+    print_report(results, baseline)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.save_baseline:
+        baseline.update(results)
+        baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\n💾 Baseline saved to {baseline_path}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for message in regressions:
+            print(f"   {message}")
+        return 1
+
+    print("\n✅ No regressions" if baseline else "\n(no baseline yet - run with --save-baseline)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Synthetic feed corpus for benchmarks
+Generates RSS 2.0 / Atom feeds and serves them from a local HTTP server
+"""
+import hashlib
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from xml.sax.saxutils import escape
+
+# Title templates: roughly the mix the real sources produce
+ENERGY_TITLES = [
+    "{iso} approves {n} MW of new transmission capacity in {state}",
+    "FERC ruling reshapes interconnection queue for {state} solar projects",
+    "{company} signs {n} MW PPA to power {state} data center campus",
+    "Utility in {state} files rate case citing {n}% load growth from data centers",
+    "Natural gas prices jump as {state} heat wave strains the grid",
+    "DOE loan backs {n} MW battery storage project in {state}",
+    "{company} plans small modular reactor near {state} data center",
+    "{iso} capacity auction clears at record price amid data center demand",
+]
+AMBIGUOUS_TITLES = [
+    "{company} reports quarterly earnings, cites {state} expansion",
+    "{state} lawmakers debate infrastructure bill",
+    "Analysts weigh {company} outlook for {n}",
+]
+OFF_TOPIC_TITLES = [
+    "Celebrity chef opens {n}th restaurant in {state}",
+    "{company} unveils new smartphone lineup",
+    "Local team wins {state} championship after {n} seasons",
+    "Homeowners in {state} try rooftop solar panels for the first time",
+]
+ISOS = ["PJM", "ERCOT", "MISO", "CAISO", "SPP", "NYISO", "ISO-NE"]
+COMPANIES = ["Dominion", "Duke Energy", "NextEra", "Microsoft", "Google", "Amazon", "Constellation", "Vistra"]
+STATES = ["Virginia", "Texas", "Ohio", "Georgia", "Arizona", "Oregon", "Pennsylvania", "Iowa"]
+
+
+def build_corpus(n_feeds: int, items_per_feed: int, duplicate_rate: float = 0.1,
+                 summary_words: int = 60, seed: int = 0) -> Dict[str, bytes]:
+    """
+    Build feed bodies keyed by path (/feeds/<n>.xml).
+
+    Even feeds are RSS 2.0, odd feeds Atom. Items are newest first, five
+    minutes apart, with tracking parameters on their links. A share of
+    items re-run another feed's story with a slightly different title so
+    the story clusterer has syndicated copies to fold.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    stories: List[tuple] = []
+    corpus = {}
+
+    for feed in range(n_feeds):
+        items = []
+        for i in range(items_per_feed):
+            if stories and rng.random() < duplicate_rate:
+                title, summary = rng.choice(stories)
+                title = f"{title} - report"
+            else:
+                roll = rng.random()
+                templates = ENERGY_TITLES if roll < 0.5 else AMBIGUOUS_TITLES if roll < 0.7 else OFF_TOPIC_TITLES
+                title = rng.choice(templates).format(
+                    iso=rng.choice(ISOS),
+                    company=rng.choice(COMPANIES),
+                    state=rng.choice(STATES),
+                    n=rng.randint(2, 2000)
+                )
+                words = title.split() + ["grid", "load", "market", "policy", "capacity", "the", "and", "of"]
+                summary = "<p>" + " ".join(rng.choice(words) for _ in range(summary_words)) + "</p>"
+                stories.append((title, summary))
+
+            items.append({
+                'title': title,
+                'summary': summary,
+                'link': f"https://news{feed}.example.com/{feed}/{i}?utm_source=rss&utm_medium=feed#top",
+                'guid': f"feed-{feed}-item-{i}",
+                'published': now - timedelta(minutes=5 * i),
+            })
+
+        corpus[f"/feeds/{feed}.xml"] = (_atom if feed % 2 else _rss)(feed, items).encode('utf-8')
+
+    return corpus
+
+
+def _rss(feed: int, items: List[Dict]) -> str:
+    entries = "".join(f"""
+    <item>
+      <title>{escape(item['title'])}</title>
+      <link>{escape(item['link'])}</link>
+      <guid isPermaLink="false">{item['guid']}</guid>
+      <pubDate>{format_datetime(item['published'])}</pubDate>
+      <description>{escape(item['summary'])}</description>
+    </item>""" for item in items)
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0">
+  <channel>
+    <title>Benchmark Feed {feed}</title>
+    <link>https://news{feed}.example.com/</link>
+    <description>Synthetic benchmark feed</description>{entries}
+  </channel>
+</rss>
+"""
+
+
+def _atom(feed: int, items: List[Dict]) -> str:
+    entries = "".join(f"""
+  <entry>
+    <title>{escape(item['title'])}</title>
+    <link href="{escape(item['link'])}"/>
+    <id>urn:{item['guid']}</id>
+    <updated>{item['published'].isoformat()}</updated>
+    <summary type="html">{escape(item['summary'])}</summary>
+  </entry>""" for item in items)
+    updated = items[0]['published'].isoformat() if items else datetime.now(timezone.utc).isoformat()
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Benchmark Feed {feed}</title>
+  <id>urn:benchmark-feed-{feed}</id>
+  <updated>{updated}</updated>{entries}
+</feed>
+"""
+
+
+class FeedServer:
+    """Serves a corpus on localhost with ETag support and injectable latency."""
+
+    def __init__(self, corpus: Dict[str, bytes], latency_ms: float = 0, failure_rate: float = 0.0,
+                 seed: int = 0):
+        """
+        Args:
+            corpus: Feed bodies keyed by path (see build_corpus)
+            latency_ms: Delay added to every response
+            failure_rate: Share of requests answered with a 503
+        """
+        etags = {path: '"' + hashlib.sha256(body).hexdigest()[:16] + '"' for path, body in corpus.items()}
+        rng = random.Random(seed)
+        rng_lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if latency_ms:
+                    time.sleep(latency_ms / 1000)
+                with rng_lock:
+                    failed = rng.random() < failure_rate
+                body = corpus.get(self.path)
+                if failed or body is None:
+                    self.send_response(503 if failed else 404)
+                    self.end_headers()
+                    return
+                if self.headers.get('If-None-Match') == etags[self.path]:
+                    self.send_response(304)
+                    self.send_header('ETag', etags[self.path])
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/xml; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etags[self.path])
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.paths = sorted(corpus, key=lambda path: int(path.rsplit('/', 1)[1].split('.')[0]))
+        self.thread = threading.Thread(target=self.server.serve_forever, name='feed-server', daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def urls(self) -> List[str]:
+        return [self.base_url + path for path in self.paths]
+
+    def __enter__(self) -> 'FeedServer':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
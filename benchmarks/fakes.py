@@ -0,0 +1,185 @@
+"""
+Stand-in OpenAI and X clients for benchmarks
+Same call surface the bot uses, with configurable latency and failure injection
+"""
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+import tweepy
+
+
+class _Injector:
+    """Shared latency / failure dice, safe to roll from worker threads."""
+
+    def __init__(self, latency_ms: float, jitter_ms: float, failure_rate: float,
+                 rate_limit_rate: float, seed: int):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def roll(self) -> str:
+        """Sleep for the simulated latency; return 'ok', 'rate_limited' or 'failed'."""
+        with self.lock:
+            self.calls += 1
+            delay = max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            roll = self.rng.random()
+        time.sleep(delay)
+        if roll < self.rate_limit_rate:
+            return 'rate_limited'
+        if roll < self.rate_limit_rate + self.failure_rate:
+            return 'failed'
+        return 'ok'
+
+
+class FakeAPIError(Exception):
+    """Looks enough like openai.APIStatusError for LLMExecutor's retry logic."""
+
+    def __init__(self, status_code: int, retry_after: float = None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        headers = {'retry-after': str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+class FakeOpenAI:
+    """
+    Drop-in for openai.OpenAI's chat.completions.create.
+
+    Filter prompts get a verdict (JSON for batch prompts, with a draft per
+    relevant article for fused prompts), tweet prompts a short draft. Verdicts are stable per article title, approving about
+    `approve_rate` of them. Usage is reported at ~4 characters per token.
+    """
+
+    def __init__(self, latency_ms: float = 400, jitter_ms: float = 150, failure_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, approve_rate: float = 0.5, seed: int = 0):
+        self.injector = _Injector(latency_ms, jitter_ms, failure_rate, rate_limit_rate, seed)
+        self.approve_rate = approve_rate
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _relevant(self, text: str) -> bool:
+        return random.Random(text).random() < self.approve_rate
+
+    def _create(self, model: str, messages: List[Dict], temperature: float = None,
+                max_tokens: int = None, **kwargs):
+        outcome = self.injector.roll()
+        if outcome == 'rate_limited':
+            raise FakeAPIError(429, retry_after=0.05)
+        if outcome == 'failed':
+            raise FakeAPIError(500)
+
+        prompt = messages[-1]['content']
+        if kwargs.get('response_format', {}).get('type') == 'json_object':
+            verdicts = []
+            fused = '"tweet"' in prompt
+            for article_id, title in re.findall(r'\[id=(\d+)\]\nTitle: ([^\n]*)', prompt):
+                relevant = self._relevant(title)
+                verdict = {
+                    'id': int(article_id),
+                    'relevant': relevant,
+                    'reason': 'US energy infrastructure story' if relevant else 'Not about the energy industry'
+                }
+                if fused:
+                    verdict['tweet'] = f"🚨 BREAKING: ⚡ {title[:200]}" if relevant else None
+                verdicts.append(verdict)
+            content = json.dumps({'verdicts': verdicts})
+        elif 'tweet' in messages[0]['content'].lower():
+            title = re.search(r'Title: ([^\n]*)', prompt)
+            title = title.group(1) if title else 'Energy news'
+            content = f"🚨 BREAKING: ⚡ {title[:200]}"
+        else:
+            title = re.search(r'Title: ([^\n]*)', prompt)
+            relevant = self._relevant(title.group(1) if title else prompt)
+            content = "Yes. US energy infrastructure story" if relevant else "No. Not about the energy industry"
+
+        usage = SimpleNamespace(
+            prompt_tokens=sum(len(m['content']) for m in messages) // 4,
+            completion_tokens=len(content) // 4
+        )
+        usage.total_tokens = usage.prompt_tokens + usage.completion_tokens
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+class _FakeResponse:
+    """Minimal requests.Response for constructing tweepy exceptions."""
+
+    def __init__(self, status_code: int, headers: Dict):
+        self.status_code = status_code
+        self.reason = 'Too Many Requests' if status_code == 429 else 'Service Unavailable'
+        self.headers = headers
+
+    def json(self):
+        return {'detail': self.reason}
+
+
+class FakeXClient:
+    """
+    Drop-in for XPoster's tweepy client: create_tweet, get_tweets and last_headers.
+
+    Rate-limit headers report a generous quota so the post scheduler never
+    holds back; rate_limit_rate injects 429s with a reset a second away.
+    """
+
+    def __init__(self, latency_ms: float = 250, jitter_ms: float = 100, failure_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, seed: int = 0):
+        self.injector = _Injector(latency_ms, jitter_ms, failure_rate, rate_limit_rate, seed)
+        self.next_id = 10 ** 18
+        self.headers: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def _headers(self, remaining: int) -> Dict:
+        return {
+            'x-rate-limit-limit': '10000',
+            'x-rate-limit-remaining': str(remaining),
+            'x-rate-limit-reset': str(int(time.time()) + 1),
+        }
+
+    def create_tweet(self, text: str, media_ids: List[str] = None):
+        outcome = self.injector.roll()
+        if outcome == 'rate_limited':
+            headers = self._headers(0)
+            self.headers['POST /2/tweets'] = headers
+            raise tweepy.TooManyRequests(_FakeResponse(429, headers))
+        if outcome == 'failed':
+            self.headers['POST /2/tweets'] = {}
+            raise tweepy.TwitterServerError(_FakeResponse(503, {}))
+
+        self.headers['POST /2/tweets'] = self._headers(9999)
+        with self.lock:
+            self.next_id += 1
+            tweet_id = str(self.next_id)
+        return SimpleNamespace(data={'id': tweet_id, 'text': text})
+
+    def get_tweets(self, ids: List[str], tweet_fields: List[str] = None):
+        self.injector.roll()
+        self.headers['GET /2/tweets'] = self._headers(9999)
+        data = [
+            SimpleNamespace(id=int(tweet_id), public_metrics={
+                'like_count': 1, 'retweet_count': 0, 'reply_count': 0, 'impression_count': 100
+            })
+            for tweet_id in ids
+        ]
+        return SimpleNamespace(data=data)
+
+    def last_headers(self, endpoint: str) -> Dict:
+        return self.headers.get(endpoint, {})
+
+
+class FakeMediaAPI:
+    """Drop-in for tweepy.API.media_upload."""
+
+    def __init__(self, latency_ms: float = 300, seed: int = 0):
+        self.injector = _Injector(latency_ms, 0, 0.0, 0.0, seed)
+
+    def media_upload(self, filename: str):
+        self.injector.roll()
+        return SimpleNamespace(media_id_string=str(int(time.time() * 1000)))
@@ -0,0 +1,89 @@
+"""
+Raw feed archive for Energy News Bot
+Compressed, content-addressed storage of fetched feed bodies for offline replay
+"""
+import gzip
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+import logging
+
+try:
+    import zstandard
+except ImportError:  # optional - gzip is used without it
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+class FeedArchive:
+    """
+    Stores each distinct feed body once, under its sha256.
+
+    Blobs live at <root>/<hash[:2]>/<hash>.xml.zst (or .xml.gz when the
+    zstandard package isn't installed). Blobs written with either codec
+    can always be read back, so switching codecs never strands old data.
+    """
+
+    def __init__(self, root: str, level: Optional[int] = None):
+        """
+        Args:
+            root: Archive directory (created if missing)
+            level: Compression level (defaults: zstd 10, gzip 6)
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.codec = 'zst' if zstandard else 'gz'
+        self.level = level if level is not None else (10 if zstandard else 6)
+
+    def _path(self, content_hash: str, codec: str) -> Path:
+        return self.root / content_hash[:2] / f"{content_hash}.xml.{codec}"
+
+    def exists(self, content_hash: str) -> bool:
+        return any(self._path(content_hash, codec).exists() for codec in ('zst', 'gz'))
+
+    def put(self, content_hash: str, body: bytes) -> bool:
+        """
+        Store a body unless an identical one is already archived.
+
+        Returns:
+            True if a new blob was written
+        """
+        if self.exists(content_hash):
+            return False
+
+        if self.codec == 'zst':
+            data = zstandard.ZstdCompressor(level=self.level).compress(body)
+        else:
+            data = gzip.compress(body, compresslevel=self.level)
+
+        # Write then rename so readers never see a partial blob
+        path = self._path(content_hash, self.codec)
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return True
+
+    def get(self, content_hash: str) -> bytes:
+        """
+        Read an archived body.
+
+        Raises:
+            FileNotFoundError: No blob for this hash
+        """
+        path = self._path(content_hash, 'zst')
+        if path.exists():
+            if zstandard is None:
+                raise RuntimeError(f"{path.name} needs the zstandard package to read")
+            with open(path, 'rb') as f:
+                return zstandard.ZstdDecompressor().stream_reader(f).read()
+
+        with gzip.open(self._path(content_hash, 'gz'), 'rb') as f:
+            return f.read()
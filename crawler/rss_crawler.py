@@ -2,130 +2,434 @@
 RSS Feed Crawler for Energy News Bot
 """
 import feedparser
-import sqlite3
-from datetime import datetime, timedelta
-from typing import List, Dict
+import hashlib
+import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional
+from urllib.parse import urlparse
 import logging
 
+import metrics
+from crawler.feed_archive import FeedArchive
+from crawler.ingest import ArticleIngestor
+from crawler.stream_parser import StreamParseError, read_entries
+from database.storage import Storage
+from crawler.scheduler import PollScheduler
+
 logger = logging.getLogger(__name__)
 
+# A source's cutoff reaches back at least this far before its last successful poll
+POLL_CUTOFF_SLACK = timedelta(hours=1)
+
 
 class RSSCrawler:
     """Crawls RSS feeds and saves new articles to database."""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, max_workers: int = 8, per_host_limit: int = 2,
+                 timeout: int = 20, scheduler: PollScheduler = None, streaming: bool = True,
+                 archive: FeedArchive = None):
+        """
+        Args:
+            db_path: Path to SQLite database
+            max_workers: Maximum number of feeds fetched at the same time
+            per_host_limit: Maximum concurrent fetches against a single host
+            timeout: HTTP timeout in seconds for a single feed request
+            scheduler: Adaptive poll scheduler (defaults to PollScheduler())
+            streaming: Parse with the streaming parser and stop at the cutoff
+                (feedparser is still used for feeds it can't handle)
+            archive: Keep every fetched feed body here for replay() (off if None)
+        """
         self.db_path = db_path
+        self.storage = Storage(db_path)
+        self.scheduler = scheduler or PollScheduler()
+        self.ingestor = ArticleIngestor()
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.timeout = timeout
+        self.streaming = streaming
+        self.archive = archive
+        
+        # One semaphore per feed host, created on first use
+        self._host_locks = {}
+        self._host_locks_guard = threading.Lock()
     
-    def crawl_all_sources(self, hours_back: int = 12) -> Dict:
+    def crawl_all_sources(self, hours_back: int = 12, due_only: bool = False) -> Dict:
         """
         Crawl all enabled RSS sources.
         
+        Feeds are fetched and parsed in a thread pool (capped by
+        max_workers and per_host_limit). All database writes happen on
+        the calling thread, so SQLite only ever sees a single writer.
+        
+        Each source's cutoff is the earlier of hours_back ago and its last
+        successful poll (minus POLL_CUTOFF_SLACK), so sources the scheduler
+        polls less often than hours_back never drop entries between polls.
+        The watermark and URL dedupe keep the longer walk cheap.
+        
         Args:
-            hours_back: Only fetch articles from last N hours
+            hours_back: Only fetch articles from last N hours (or since the source's last poll, if earlier)
+            due_only: Only crawl sources the adaptive scheduler says are due
             
         Returns:
             Summary dict with stats
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.storage.session() as conn:
+            cursor = conn.cursor()
+            
+            if due_only:
+                sources = self.scheduler.due_sources(cursor)
+            else:
+                # Get all enabled sources
+                cursor.execute("""
+                    SELECT id, name, rss_url, priority 
+                    FROM sources 
+                    WHERE enabled = 1 
+                    ORDER BY priority ASC
+                """)
+                sources = cursor.fetchall()
+            
+            # Conditional GET validators from the previous crawl
+            cursor.execute("SELECT source_id, etag, last_modified, content_hash FROM feed_cache")
+            cache = {
+                row[0]: {'etag': row[1], 'last_modified': row[2], 'content_hash': row[3]}
+                for row in cursor.fetchall()
+            }
+            
+            # Known URLs for in-memory dedupe
+            self.ingestor.load(cursor)
+            
+            total_found = 0
+            total_new = 0
+            total_unchanged = 0
+            cutoff_time = datetime.now() - timedelta(hours=hours_back)
+            cutoffs = self._source_cutoffs(cursor, cutoff_time)
+            
+            logger.info(f"Starting crawl of {len(sources)} sources ({self.max_workers} workers)...")
+            
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                # Network fetch + parse runs in the pool
+                futures = {
+                    pool.submit(self._fetch_feed, rss_url, cache.get(source_id), name,
+                                cutoffs.get(source_id, cutoff_time)): (source_id, name)
+                    for source_id, name, rss_url, priority in sources
+                }
+                
+                # Results are written to SQLite as they arrive, on this thread only
+                for future in as_completed(futures):
+                    source_id, name = futures[future]
+                    try:
+                        result = future.result()
+                        
+                        if result['entries'] is None:
+                            # 304 Not Modified or byte-identical body - nothing to parse
+                            cursor.execute("""
+                                UPDATE sources SET last_crawled = CURRENT_TIMESTAMP WHERE id = ?
+                            """, (source_id,))
+                            cursor.execute("""
+                                INSERT INTO crawl_log (source, articles_found, articles_new, status)
+                                VALUES (?, 0, 0, 'unchanged')
+                            """, (name,))
+                            total_unchanged += 1
+                            logger.info(f"= {name}: unchanged ({result['status']})")
+                        else:
+                            found, new = self._crawl_source(
+                                cursor, 
+                                source_id, 
+                                name, 
+                                result['entries'], 
+                                cutoffs.get(source_id, cutoff_time)
+                            )
+                            total_found += found
+                            total_new += new
+                            
+                            # Log crawl
+                            cursor.execute("""
+                                INSERT INTO crawl_log (source, articles_found, articles_new, status)
+                                VALUES (?, ?, ?, 'success')
+                            """, (name, found, new))
+                            
+                            logger.info(f"✓ {name}: {found} articles, {new} new")
+                        
+                        self._save_cache(cursor, source_id, result)
+                        self._record_archive(cursor, source_id, result)
+                        
+                    except Exception as e:
+                        logger.error(f"✗ {name}: {e}")
+                        cursor.execute("""
+                            INSERT INTO crawl_log (source, articles_found, articles_new, status, error)
+                            VALUES (?, 0, 0, 'failed', ?)
+                        """, (name, str(e)))
+                    
+                    # Learn from this poll when the source is next due
+                    self.scheduler.reschedule(cursor, source_id, name)
+                    
+                    # One transaction per source batch
+                    conn.commit()
         
-        # Get all enabled sources
+        return {
+            'sources_crawled': len(sources),
+            'sources_unchanged': total_unchanged,
+            'articles_found': total_found,
+            'articles_new': total_new
+        }
+    
+    def _source_cutoffs(self, cursor, cutoff_time: datetime) -> Dict[int, datetime]:
+        """Per-source cutoffs reaching back past the last successful poll where that is older than cutoff_time."""
         cursor.execute("""
-            SELECT id, name, rss_url, priority 
-            FROM sources 
-            WHERE enabled = 1 
-            ORDER BY priority ASC
+            SELECT id, datetime(last_crawled, 'localtime') FROM sources WHERE last_crawled IS NOT NULL
         """)
-        sources = cursor.fetchall()
+        cutoffs = {}
+        for source_id, last_crawled in cursor.fetchall():
+            since_last_poll = datetime.fromisoformat(last_crawled) - POLL_CUTOFF_SLACK
+            if since_last_poll < cutoff_time:
+                cutoffs[source_id] = since_last_poll
+        return cutoffs
+    
+    def _host_lock(self, rss_url: str) -> threading.Semaphore:
+        """Get the semaphore limiting concurrent fetches for a feed's host."""
+        host = urlparse(rss_url).netloc.lower()
+        with self._host_locks_guard:
+            if host not in self._host_locks:
+                self._host_locks[host] = threading.Semaphore(self.per_host_limit)
+            return self._host_locks[host]
+    
+    def _fetch_feed(self, rss_url: str, cached: Dict = None, source: str = '',
+                    cutoff_time: datetime = None) -> Dict:
+        """
+        Fetch and parse a single RSS feed (runs in a worker thread).
         
-        total_found = 0
-        total_new = 0
-        cutoff_time = datetime.now() - timedelta(hours=hours_back)
+        Sends If-None-Match / If-Modified-Since from the previous crawl and
+        skips parsing on a 304 or when the body hash has not changed.
         
-        logger.info(f"Starting crawl of {len(sources)} sources...")
+        Returns:
+            Dict with 'status' (not_modified|unchanged|fetched), the new
+            cache validators and 'entries' (normalized entries, None unless
+            the body was parsed)
+        """
+        cached = cached or {}
+        headers = {'User-Agent': feedparser.USER_AGENT}
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
         
-        for source_id, name, rss_url, priority in sources:
+        with self._host_lock(rss_url):
             try:
-                found, new = self._crawl_source(
-                    cursor, 
-                    source_id, 
-                    name, 
-                    rss_url, 
-                    cutoff_time
-                )
-                total_found += found
-                total_new += new
+                with metrics.timer('crawler_fetch_seconds', source=source):
+                    response = requests.get(rss_url, headers=headers, timeout=self.timeout)
+            except requests.RequestException:
+                metrics.inc('crawler_fetch_total', source=source, status='error')
+                raise
+        metrics.inc('crawler_fetch_total', source=source, status=response.status_code)
+        
+        if response.status_code == 304:
+            return {
+                'status': 'not_modified',
+                'etag': response.headers.get('ETag', cached.get('etag')),
+                'last_modified': response.headers.get('Last-Modified', cached.get('last_modified')),
+                'content_hash': cached.get('content_hash'),
+                'entries': None
+            }
+        
+        response.raise_for_status()
+        
+        result = {
+            'status': 'fetched',
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': hashlib.sha256(response.content).hexdigest(),
+            'entries': None
+        }
+        
+        # Identical bodies are stored once; unchanged ones are archived only if missing
+        if self.archive:
+            result['archived'] = self.archive.put(result['content_hash'], response.content)
+            result['content_type'] = response.headers.get('Content-Type')
+        
+        if result['content_hash'] == cached.get('content_hash'):
+            result['status'] = 'unchanged'
+            return result
+        
+        with metrics.timer('crawler_parse_seconds', source=source):
+            result['entries'] = self._parse_entries(response.content, response.headers, cutoff_time, source)
+        return result
+    
+    def _parse_entries(self, content: bytes, headers: Dict, cutoff_time: datetime = None,
+                       source: str = '') -> List[Dict]:
+        """
+        Turn a feed body into normalized entries.
+        
+        The streaming parser stops reading once a newest-first feed falls
+        behind cutoff_time. Anything it can't handle (malformed XML, odd
+        date formats) goes through feedparser as before.
+        """
+        if self.streaming:
+            try:
+                entries, stopped_early = read_entries(content, cutoff_time)
+                if stopped_early:
+                    metrics.inc('crawler_parse_early_exit_total', source=source)
+                return entries
+            except StreamParseError as e:
+                metrics.inc('crawler_parse_fallback_total', source=source)
+                logger.debug(f"{source}: falling back to feedparser ({e})")
+        
+        # feedparser expects lower-cased header names for encoding detection
+        feed = feedparser.parse(
+            content,
+            response_headers={k.lower(): v for k, v in headers.items()}
+        )
+        
+        if feed.bozo:  # Feed has errors
+            raise Exception(f"Feed parse error: {feed.bozo_exception}")
+        
+        return [self._normalize_entry(entry) for entry in feed.entries]
+    
+    def _save_cache(self, cursor, source_id: int, result: Dict):
+        """Store conditional GET validators for the next crawl."""
+        cursor.execute("""
+            INSERT INTO feed_cache (source_id, etag, last_modified, content_hash, checked_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(source_id) DO UPDATE SET
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                content_hash = excluded.content_hash,
+                checked_at = excluded.checked_at
+        """, (source_id, result['etag'], result['last_modified'], result['content_hash']))
+    
+    def _record_archive(self, cursor, source_id: int, result: Dict):
+        """Log which archived body a source served, whenever it changed."""
+        if not self.archive or 'archived' not in result:
+            return
+        if result['status'] == 'fetched' or result['archived']:
+            cursor.execute("""
+                INSERT INTO feed_archive (source_id, content_hash, content_type)
+                VALUES (?, ?, ?)
+            """, (source_id, result['content_hash'], result['content_type']))
+    
+    def replay(self, since: datetime, until: Optional[datetime] = None,
+               source: Optional[str] = None, hours_back: Optional[float] = None) -> Dict:
+        """
+        Re-run ingestion from archived feed bodies - no network.
+        
+        Bodies are replayed oldest first and go through the same parser and
+        ingestor as a live crawl, but watermarks, the poll schedule and the
+        crawl log are left alone. Articles already stored are skipped as usual.
+        
+        Args:
+            since: Replay bodies fetched at or after this time (naive UTC or aware)
+            until: ...and before this time (same, default no limit)
+            source: Only this source name
+            hours_back: Only keep entries published within N hours of the
+                body's fetch time (default: every entry in the body)
+            
+        Returns:
+            Summary dict with stats
+        """
+        if not self.archive:
+            raise ValueError("replay needs a feed archive (set FEED_ARCHIVE_DIR)")
+        
+        clauses = ['fa.fetched_at >= ?']
+        params = [self._utc_text(since)]
+        if until:
+            clauses.append('fa.fetched_at < ?')
+            params.append(self._utc_text(until))
+        if source:
+            clauses.append('s.name = ?')
+            params.append(source)
+        
+        with self.storage.session() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT fa.content_hash, fa.content_type, fa.fetched_at, s.name
+                FROM feed_archive fa
+                JOIN sources s ON s.id = fa.source_id
+                WHERE {' AND '.join(clauses)}
+                ORDER BY fa.fetched_at ASC, fa.id ASC
+            """, params)
+            bodies = cursor.fetchall()
+            
+            self.ingestor.load(cursor)
+            
+            total_found = 0
+            total_new = 0
+            missing = 0
+            
+            logger.info(f"Replaying {len(bodies)} archived feed bodies...")
+            
+            for content_hash, content_type, fetched_at, name in bodies:
+                try:
+                    content = self.archive.get(content_hash)
+                except FileNotFoundError:
+                    missing += 1
+                    logger.warning(f"✗ {name}: archived body {content_hash[:12]} is missing")
+                    continue
                 
-                # Log crawl
-                cursor.execute("""
-                    INSERT INTO crawl_log (source, articles_found, articles_new, status)
-                    VALUES (?, ?, ?, 'success')
-                """, (name, found, new))
+                try:
+                    entries = self._parse_entries(content, {'Content-Type': content_type or ''}, source=name)
+                except Exception as e:
+                    logger.error(f"✗ {name} @ {fetched_at}: {e}")
+                    continue
                 
-                logger.info(f"✓ {name}: {found} articles, {new} new")
+                if hours_back is not None:
+                    cutoff_time = datetime.fromisoformat(str(fetched_at)) - timedelta(hours=hours_back)
+                    entries = [entry for entry in entries if entry['published_at'] >= cutoff_time]
                 
-            except Exception as e:
-                logger.error(f"✗ {name}: {e}")
-                cursor.execute("""
-                    INSERT INTO crawl_log (source, articles_found, articles_new, status, error)
-                    VALUES (?, 0, 0, 'failed', ?)
-                """, (name, str(e)))
+                new = self.ingestor.ingest(cursor, name, entries)
+                total_found += len(entries)
+                total_new += new
+                
+                # Same batching as a live crawl: one transaction per body
+                conn.commit()
         
-        conn.commit()
-        conn.close()
+        logger.info(f"Replay: {total_found} entries, {total_new} new ({missing} bodies missing)")
         
         return {
-            'sources_crawled': len(sources),
+            'bodies': len(bodies),
+            'bodies_missing': missing,
             'articles_found': total_found,
             'articles_new': total_new
         }
     
-    def _crawl_source(self, cursor, source_id: int, name: str, rss_url: str, cutoff_time: datetime) -> tuple:
-        """Crawl a single RSS source."""
+    def _crawl_source(self, cursor, source_id: int, name: str, entries: List[Dict],
+                      cutoff_time: datetime) -> tuple:
+        """
+        Save entries of an already-parsed RSS source.
         
-        # Parse RSS feed
-        feed = feedparser.parse(rss_url)
+        Uses the source's high-water mark (newest entry seen last time) to
+        stop as soon as the walk reaches known entries. That shortcut is only
+        taken for feeds sorted newest-first; unsorted feeds are walked in full.
+        """
         
-        if feed.bozo:  # Feed has errors
-            raise Exception(f"Feed parse error: {feed.bozo_exception}")
+        found = len(entries)
         
-        found = 0
-        new = 0
+        cursor.execute("""
+            SELECT guid, url, published_at FROM source_watermark WHERE source_id = ?
+        """, (source_id,))
+        watermark = cursor.fetchone()
         
-        for entry in feed.entries:
-            found += 1
-            
-            # Extract article data
-            url = entry.get('link', '')
-            title = entry.get('title', 'No title')
-            summary = entry.get('summary', entry.get('description', ''))
-            
-            # Parse published date
-            published_at = None
-            if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                published_at = datetime(*entry.published_parsed[:6])
-            elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-                published_at = datetime(*entry.updated_parsed[:6])
-            else:
-                published_at = datetime.now()
-            
-            # Skip if too old
-            if published_at < cutoff_time:
+        is_sorted = self._is_newest_first(entries)
+        
+        batch = []
+        for entry in entries:
+            if is_sorted:
+                # Reached known territory - everything after this is older
+                if watermark and self._at_watermark(entry, watermark):
+                    break
+                # Sorted feed: the rest of the entries are too old as well
+                if entry['published_at'] < cutoff_time:
+                    break
+            elif entry['published_at'] < cutoff_time:
+                # Skip if too old
                 continue
             
-            # Image extraction disabled - images were low quality
-            image_url = None
-            
-            # Insert article (ignore if duplicate URL)
-            try:
-                cursor.execute("""
-                    INSERT INTO articles (url, title, summary, image_url, source, published_at, status)
-                    VALUES (?, ?, ?, ?, ?, ?, 'pending')
-                """, (url, title, summary, image_url, name, published_at))
-                new += 1
-            except sqlite3.IntegrityError:
-                # Article already exists
-                pass
+            batch.append(entry)
+        
+        # Bulk insert, duplicates dropped in memory / by INSERT OR IGNORE
+        new = self.ingestor.ingest(cursor, name, batch)
+        
+        self._save_watermark(cursor, source_id, entries)
         
         # Update source last_crawled
         cursor.execute("""
@@ -133,6 +437,76 @@ class RSSCrawler:
         """, (source_id,))
         
         return found, new
+    
+    @staticmethod
+    def _normalize_entry(entry) -> Dict:
+        """Extract the fields we store from a feedparser entry."""
+        
+        url = entry.get('link', '')
+        
+        # Parse published date
+        dated = True
+        if hasattr(entry, 'published_parsed') and entry.published_parsed:
+            published_at = datetime(*entry.published_parsed[:6])
+        elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
+            published_at = datetime(*entry.updated_parsed[:6])
+        else:
+            published_at = datetime.now()
+            dated = False
+        
+        return {
+            'guid': entry.get('id') or url,
+            'url': url,
+            'title': entry.get('title', 'No title'),
+            'summary': entry.get('summary', entry.get('description', '')),
+            'published_at': published_at,
+            'dated': dated
+        }
+    
+    @staticmethod
+    def _utc_text(value: datetime) -> str:
+        """Format like SQLite's CURRENT_TIMESTAMP (naive UTC), converting aware datetimes first."""
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    
+    @staticmethod
+    def _is_newest_first(entries: List[Dict]) -> bool:
+        """True if every entry carries a date and dates never increase down the feed."""
+        if not all(entry['dated'] for entry in entries):
+            return False
+        return all(
+            earlier['published_at'] >= later['published_at']
+            for earlier, later in zip(entries, entries[1:])
+        )
+    
+    @staticmethod
+    def _at_watermark(entry: Dict, watermark: tuple) -> bool:
+        """True if the entry is the high-water mark or older than it."""
+        guid, url, published_at = watermark
+        if entry['guid'] == guid or entry['url'] == url:
+            return True
+        if published_at:
+            return entry['published_at'] < datetime.fromisoformat(str(published_at))
+        return False
+    
+    def _save_watermark(self, cursor, source_id: int, entries: List[Dict]):
+        """Record the newest dated entry as the source's high-water mark."""
+        dated = [entry for entry in entries if entry['dated']]
+        if not dated:
+            return
+        
+        newest = max(dated, key=lambda entry: entry['published_at'])
+        cursor.execute("""
+            INSERT INTO source_watermark (source_id, guid, url, published_at, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(source_id) DO UPDATE SET
+                guid = excluded.guid,
+                url = excluded.url,
+                published_at = excluded.published_at,
+                updated_at = excluded.updated_at
+            WHERE excluded.published_at >= source_watermark.published_at
+        """, (source_id, newest['guid'], newest['url'], newest['published_at']))
 
 
 if __name__ == "__main__":
@@ -146,6 +520,6 @@ if __name__ == "__main__":
     stats = crawler.crawl_all_sources(hours_back=24)
     
     print(f"\n✅ Crawl complete!")
-    print(f"   Sources: {stats['sources_crawled']}")
+    print(f"   Sources: {stats['sources_crawled']} ({stats['sources_unchanged']} unchanged)")
     print(f"   Articles found: {stats['articles_found']}")
     print(f"   New articles: {stats['articles_new']}")
@@ -0,0 +1,114 @@
+"""
+Adaptive polling scheduler for RSS sources
+Learns each feed's publish rate and decides when it is next due
+"""
+from datetime import datetime
+from typing import List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PollScheduler:
+    """Assigns each source a poll interval and next-due time."""
+
+    def __init__(self, min_interval: int = 60, max_interval: int = 6 * 3600,
+                 history_days: int = 7, polls_per_article: int = 2):
+        """
+        Args:
+            min_interval: Shortest allowed poll interval in seconds
+            max_interval: Longest allowed poll interval in seconds
+            history_days: How much publish history to learn from
+            polls_per_article: Target number of polls per expected new article
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.history_days = history_days
+        self.polls_per_article = max(1, polls_per_article)
+
+    def due_sources(self, cursor) -> List[Tuple]:
+        """Get enabled sources whose next-due time has passed (or was never set)."""
+        cursor.execute("""
+            SELECT s.id, s.name, s.rss_url, s.priority
+            FROM sources s
+            LEFT JOIN source_schedule ss ON ss.source_id = s.id
+            WHERE s.enabled = 1
+            AND (ss.next_due_at IS NULL OR ss.next_due_at <= datetime('now'))
+            ORDER BY s.priority ASC
+        """)
+        return cursor.fetchall()
+
+    def reschedule(self, cursor, source_id: int, name: str) -> int:
+        """
+        Recompute a source's poll interval after it has been crawled.
+
+        Returns:
+            The new poll interval in seconds
+        """
+        interval = self._interval_from_publish_rate(cursor, name)
+        interval = self._adjust_for_yield(cursor, name, interval)
+        interval = int(min(self.max_interval, max(self.min_interval, interval)))
+
+        cursor.execute("""
+            INSERT INTO source_schedule (source_id, poll_interval_seconds, next_due_at, updated_at)
+            VALUES (?, ?, datetime('now', '+' || ? || ' seconds'), CURRENT_TIMESTAMP)
+            ON CONFLICT(source_id) DO UPDATE SET
+                poll_interval_seconds = excluded.poll_interval_seconds,
+                next_due_at = excluded.next_due_at,
+                updated_at = excluded.updated_at
+        """, (source_id, interval, interval))
+
+        return interval
+
+    def _interval_from_publish_rate(self, cursor, name: str) -> float:
+        """Poll interval derived from the mean gap between published articles."""
+        cursor.execute("""
+            SELECT COUNT(*), MIN(published_at), MAX(published_at)
+            FROM articles
+            WHERE source = ?
+            AND published_at > datetime('now', ?)
+        """, (name, f'-{self.history_days} days'))
+        count, first, last = cursor.fetchone()
+
+        if count < 2:
+            # Too little history - start from the middle of the range
+            return (self.min_interval + self.max_interval) / 2
+
+        try:
+            span = (_parse_timestamp(last) - _parse_timestamp(first)).total_seconds()
+        except (TypeError, ValueError):
+            return (self.min_interval + self.max_interval) / 2
+
+        mean_gap = span / (count - 1)
+        return mean_gap / self.polls_per_article
+
+    def _adjust_for_yield(self, cursor, name: str, interval: float, window: int = 10) -> float:
+        """Tighten the interval for feeds that keep yielding, back off for idle ones."""
+        cursor.execute("""
+            SELECT articles_new
+            FROM crawl_log
+            WHERE source = ?
+            ORDER BY id DESC
+            LIMIT ?
+        """, (name, window))
+        yields = [row[0] or 0 for row in cursor.fetchall()]
+
+        if not yields:
+            return interval
+
+        productive = sum(1 for y in yields if y > 0) / len(yields)
+
+        if productive >= 0.5:
+            # Most polls find something - we are polling too slowly
+            return interval / 2
+        if productive == 0 and len(yields) >= window:
+            # Nothing new in the whole window - back off
+            return interval * 2
+        return interval
+
+
+def _parse_timestamp(value) -> datetime:
+    """Parse a SQLite timestamp string."""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
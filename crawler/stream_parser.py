@@ -0,0 +1,179 @@
+"""
+Streaming RSS / Atom parser for Energy News Bot
+Yields entries one at a time with ElementTree.iterparse so large feeds can be cut short
+"""
+import io
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+RSS1 = '{http://purl.org/rss/1.0/}'
+RDF = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}'
+DC = '{http://purl.org/dc/elements/1.1/}'
+CONTENT = '{http://purl.org/rss/1.0/modules/content/}'
+
+ROOT_TAGS = {'rss', RDF + 'RDF', ATOM + 'feed'}
+ENTRY_TAGS = {'item', RSS1 + 'item', ATOM + 'entry'}
+
+
+class StreamParseError(Exception):
+    """The document can't be handled here; the caller should fall back to feedparser."""
+
+
+def iter_entries(content: bytes) -> Iterator[Dict]:
+    """
+    Parse RSS 2.0, RSS 1.0 (RDF) or Atom and yield normalized entries.
+
+    Entries have the same shape as RSSCrawler._normalize_entry produces.
+    Each item is dropped from the tree once yielded, so memory stays flat
+    however long the feed is, and nothing past the point where the
+    caller stops iterating is parsed at all.
+
+    Raises:
+        StreamParseError: Malformed XML, an unknown root element, a date
+            format only feedparser's handlers understand, or items that
+            yield no usable (linked) entry at all, e.g. because they sit
+            in a namespace not handled here
+    """
+    stack = []
+    usable = 0
+    unusable = 0
+    try:
+        for event, elem in ET.iterparse(io.BytesIO(content), events=('start', 'end')):
+            if event == 'start':
+                if not stack and elem.tag not in ROOT_TAGS:
+                    raise StreamParseError(f"Not an RSS/Atom document (root <{elem.tag}>)")
+                stack.append(elem)
+                continue
+
+            stack.pop()
+            if elem.tag in ENTRY_TAGS:
+                entry = _atom_entry(elem) if elem.tag == ATOM + 'entry' else _rss_entry(elem)
+                if entry['url']:
+                    usable += 1
+                else:
+                    unusable += 1
+                yield entry
+            elif elem.tag.rpartition('}')[2] in ('item', 'entry'):
+                unusable += 1
+            else:
+                continue
+            if stack:
+                stack[-1].remove(elem)
+    except ET.ParseError as e:
+        raise StreamParseError(f"Malformed feed: {e}") from e
+
+    if unusable and not usable:
+        raise StreamParseError(f"No usable entries among {unusable} items")
+
+
+def read_entries(content: bytes, cutoff_time: Optional[datetime] = None,
+                 patience: int = 3) -> Tuple[List[Dict], bool]:
+    """
+    Read entries until the feed has clearly fallen behind the cutoff.
+
+    Parsing stops once `patience` consecutive entries are older than
+    cutoff_time, but only while every entry so far has been dated and in
+    newest-first order - unsorted feeds are always read in full.
+
+    Returns:
+        (entries, stopped_early)
+    """
+    entries: List[Dict] = []
+    in_order = True
+    behind = 0
+
+    for entry in iter_entries(content):
+        if not entry['dated'] or (entries and entries[-1]['published_at'] < entry['published_at']):
+            in_order = False
+        entries.append(entry)
+
+        if in_order and cutoff_time is not None and entry['published_at'] < cutoff_time:
+            behind += 1
+            if behind >= patience:
+                return entries, True
+        else:
+            behind = 0
+
+    return entries, False
+
+
+def _text(elem: Optional[ET.Element]) -> str:
+    if elem is None:
+        return ''
+    return ''.join(elem.itertext()).strip()
+
+
+def _first(elem: ET.Element, *tags: str) -> Optional[ET.Element]:
+    for tag in tags:
+        found = elem.find(tag)
+        if found is not None and _text(found):
+            return found
+    return None
+
+
+def _rss_entry(item: ET.Element) -> Dict:
+    # RSS 1.0 items live in the RSS 1.0 namespace, RSS 2.0 items in none
+    ns = RSS1 if item.tag.startswith(RSS1) else ''
+
+    url = _text(item.find(ns + 'link'))
+    guid_elem = item.find('guid')
+    guid = _text(guid_elem) or item.get(RDF + 'about', '')
+    # Like feedparser, a permalink guid (isPermaLink defaults to true) stands in for a missing link
+    if not url and guid_elem is not None and guid_elem.get('isPermaLink', 'true').lower() == 'true':
+        url = _text(guid_elem)
+    published = _first(item, 'pubDate', DC + 'date', ATOM + 'updated')
+
+    return _normalized(
+        guid=guid,
+        url=url,
+        title=_text(item.find(ns + 'title')),
+        summary=_text(_first(item, ns + 'description', CONTENT + 'encoded')),
+        date=_text(published)
+    )
+
+
+def _atom_entry(entry: ET.Element) -> Dict:
+    url = ''
+    for link in entry.findall(ATOM + 'link'):
+        if link.get('rel', 'alternate') == 'alternate':
+            url = link.get('href', '').strip()
+            break
+
+    return _normalized(
+        guid=_text(entry.find(ATOM + 'id')),
+        url=url,
+        title=_text(entry.find(ATOM + 'title')),
+        summary=_text(_first(entry, ATOM + 'summary', ATOM + 'content')),
+        date=_text(_first(entry, ATOM + 'published', ATOM + 'updated', DC + 'date'))
+    )
+
+
+def _normalized(guid: str, url: str, title: str, summary: str, date: str) -> Dict:
+    dated = bool(date)
+    published_at = _parse_date(date) if dated else datetime.now()
+    return {
+        'guid': guid or url,
+        'url': url,
+        'title': title or 'No title',
+        'summary': summary,
+        'published_at': published_at,
+        'dated': dated
+    }
+
+
+def _parse_date(value: str) -> datetime:
+    """RFC 822 or ISO 8601 date as naive UTC (matching feedparser's *_parsed fields)."""
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise StreamParseError(f"Unrecognized date: {value!r}")
+
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
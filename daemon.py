@@ -0,0 +1,185 @@
+"""
+Energy News Bot - Long-running daemon
+Runs crawl → filter → generate → post as independent stages in one process
+"""
+import queue
+import signal
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+import logging
+
+import metrics
+from database.retention import RetentionManager
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """
+    One pipeline stage running on its own thread.
+
+    The stage runs whenever its interval elapses or an upstream stage puts
+    work on its inbox, whichever comes first. When a run produces work
+    (see `produced`), a message is put on each downstream stage's inbox so
+    fresh articles flow straight through.
+    """
+
+    def __init__(self, name: str, run: Callable[[], Dict], interval: float,
+                 produced: Callable[[Dict], int] = lambda stats: 0):
+        """
+        Args:
+            name: Stage name for logs
+            run: Callable doing one pass of the stage and returning its stats dict
+            interval: Seconds between runs when nothing arrives on the inbox
+            produced: Extracts how many items this run handed to the next stage
+        """
+        self.name = name
+        self.run = run
+        self.interval = interval
+        self.produced = produced
+        self.inbox: queue.Queue = queue.Queue()
+        self.downstream: List['Stage'] = []
+        self.thread: Optional[threading.Thread] = None
+
+    def loop(self, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                self.inbox.get(timeout=self.interval)
+            except queue.Empty:
+                pass
+
+            if stop.is_set():
+                break
+
+            # Coalesce everything queued while we were busy into one run
+            while True:
+                try:
+                    self.inbox.get_nowait()
+                except queue.Empty:
+                    break
+
+            started = time.monotonic()
+            try:
+                with metrics.timer('pipeline_stage_seconds', stage=self.name):
+                    stats = self.run()
+            except Exception as e:
+                metrics.inc('pipeline_stage_failures_total', stage=self.name)
+                logger.error(f"[{self.name}] stage failed: {e}", exc_info=True)
+                continue
+
+            logger.info(f"[{self.name}] {stats} ({time.monotonic() - started:.1f}s)")
+
+            count = self.produced(stats)
+            if count:
+                for stage in self.downstream:
+                    stage.inbox.put(count)
+
+
+class PipelineDaemon:
+    """Keeps crawler, LLM and X clients warm and runs every stage on its own cadence."""
+
+    def __init__(self, crawler, processor, poster, hours_back: float = 0.5, max_tweets: int = 3,
+                 generate_limit: Optional[int] = None,
+                 crawl_interval: float = 60, filter_interval: float = 60,
+                 generate_interval: float = 60, post_interval: float = 60,
+                 engagement_interval: float = 3600, metrics_interval: float = 60,
+                 retention_interval: float = 3600, metrics_textfile: Optional[str] = None):
+        """
+        Args:
+            crawler: RSSCrawler
+            processor: LLMProcessor
+            poster: XPoster
+            hours_back: Crawl articles from last N hours
+            max_tweets: Maximum tweets to post per post-stage run
+            generate_limit: Most articles one generate-stage run claims (None = all)
+            *_interval: Seconds between runs of each stage when idle
+            metrics_textfile: Prometheus textfile refreshed on every metrics flush
+        """
+        self.stop_event = threading.Event()
+        self.flush_metrics = lambda: metrics.flush(crawler.storage.db_path, metrics_textfile)
+
+        crawl = Stage(
+            'crawl',
+            lambda: crawler.crawl_all_sources(hours_back=hours_back, due_only=True),
+            crawl_interval,
+            produced=lambda stats: stats['articles_new']
+        )
+        filter_ = Stage(
+            'filter',
+            processor.filter_articles,
+            filter_interval,
+            produced=lambda stats: stats['approved']
+        )
+        generate = Stage(
+            'generate',
+            lambda: processor.generate_tweets(limit=generate_limit),
+            generate_interval,
+            produced=lambda stats: stats['generated']
+        )
+        post = Stage(
+            'post',
+            lambda: poster.post_tweets(max_tweets=max_tweets, delay_seconds=60),
+            post_interval
+        )
+
+        engagement = Stage(
+            'engagement',
+            poster.update_engagement_metrics,
+            engagement_interval
+        )
+
+        crawl.downstream = [filter_]
+        # In fused mode the filter stage writes most drafts itself, so wake the poster too
+        filter_.downstream = [generate, post] if processor.fused else [generate]
+        generate.downstream = [post]
+
+        # Persists metrics and refreshes the Prometheus textfile
+        metrics_stage = Stage(
+            'metrics',
+            self.flush_metrics,
+            metrics_interval
+        )
+
+        # Archives finished articles, rolls up crawl_log/metrics, incremental VACUUM
+        retention = Stage(
+            'retention',
+            RetentionManager(crawler.storage.db_path).run,
+            retention_interval
+        )
+
+        self.stages = [crawl, filter_, generate, post, engagement, metrics_stage, retention]
+
+    def run(self):
+        """Run until SIGINT/SIGTERM, then let in-flight stage runs finish."""
+        signal.signal(signal.SIGINT, self._handle_signal)
+        signal.signal(signal.SIGTERM, self._handle_signal)
+
+        logger.info("Daemon starting: " + ", ".join(f"{s.name} every {s.interval:g}s" for s in self.stages))
+
+        for stage in self.stages:
+            stage.thread = threading.Thread(target=stage.loop, args=(self.stop_event,), name=f"stage-{stage.name}")
+            stage.thread.start()
+            # Kick off an immediate first run
+            stage.inbox.put(0)
+
+        while not self.stop_event.is_set():
+            self.stop_event.wait(1)
+
+        self.shutdown()
+
+    def shutdown(self):
+        """Stop all stages and wait for them to finish their current run."""
+        self.stop_event.set()
+        for stage in self.stages:
+            # Wake stages blocked on their inbox
+            stage.inbox.put(0)
+        for stage in self.stages:
+            if stage.thread:
+                stage.thread.join()
+        self.flush_metrics()
+        logger.info("Daemon stopped")
+
+    def _handle_signal(self, signum, frame):
+        logger.info(f"Received signal {signum}, shutting down after current stage runs...")
+        self.stop_event.set()
@@ -0,0 +1,138 @@
+"""
+Work leases for Energy News Bot
+Lets several filter / generate / post workers share one database without doing the same row twice
+"""
+import os
+import socket
+from typing import Iterable, List, Optional
+import logging
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Tables that carry claimed_by / lease_expires_at columns
+LEASE_TABLES = ('articles', 'tweets')
+
+
+def default_worker_id() -> str:
+    """hostname:pid - unique per process, even across nodes."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Leases:
+    """
+    Claim-by-update leases on articles and tweets rows.
+
+    A worker owns a row while claimed_by is its worker_id and
+    lease_expires_at is in the future. Claiming is a single UPDATE that
+    only matches unclaimed, own or expired rows, and SQLite serializes
+    writers, so two workers can never both win the same row. A worker
+    that crashes simply stops renewing; once its lease expires the row
+    can be claimed again.
+
+    Claims must be committed before slow work (LLM calls, posting) so
+    other workers see them.
+    """
+
+    def __init__(self, worker_id: Optional[str] = None, lease_seconds: int = 600):
+        """
+        Args:
+            worker_id: This worker's identity (defaults to hostname:pid)
+            lease_seconds: How long a claim lasts without being renewed
+        """
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+
+    def for_stage(self, stage: str) -> 'Leases':
+        """
+        Leases under this worker's id plus a stage name (hostname:pid:stage).
+
+        The daemon runs filter, generate and post as threads of one process,
+        so without this they would share an id and could renew or release
+        each other's claims.
+        """
+        return Leases(f"{self.worker_id}:{stage}", self.lease_seconds)
+
+    def claim(self, cursor, table: str, ids: Iterable[int], status: Optional[str] = None) -> List[int]:
+        """
+        Claim (or renew) rows for this worker.
+
+        Args:
+            status: Only claim rows still in this status, so a row another
+                worker finished meanwhile is never picked up again
+
+        Returns:
+            The ids this worker now holds, in the order given
+        """
+        ids = list(ids)
+        if not ids:
+            return []
+        if table not in LEASE_TABLES:
+            raise ValueError(f"No leases on table: {table}")
+
+        marks = ','.join('?' * len(ids))
+        status_clause = " AND status = ?" if status is not None else ""
+        status_params = [status] if status is not None else []
+
+        cursor.execute(f"""
+            UPDATE {table}
+            SET claimed_by = ?, lease_expires_at = datetime('now', ?)
+            WHERE id IN ({marks})
+            AND (claimed_by IS NULL OR claimed_by = ? OR lease_expires_at <= CURRENT_TIMESTAMP)
+        """ + status_clause, [self.worker_id, f'+{int(self.lease_seconds)} seconds'] + ids + [self.worker_id] + status_params)
+        if cursor.rowcount == len(ids):
+            return ids
+
+        # Same write transaction, so this sees exactly what the UPDATE matched
+        cursor.execute(f"""
+            SELECT id FROM {table} WHERE id IN ({marks}) AND claimed_by = ?
+        """ + status_clause, ids + [self.worker_id] + status_params)
+        held = {row[0] for row in cursor.fetchall()}
+        if len(held) < len(ids):
+            metrics.inc('lease_conflicts_total', len(ids) - len(held), table=table)
+        return [row_id for row_id in ids if row_id in held]
+
+    def release(self, cursor, table: str, ids: Iterable[int]) -> int:
+        """
+        Give up this worker's claims on the given rows (others' claims are untouched).
+
+        Returns:
+            Number of rows released
+        """
+        ids = list(ids)
+        if not ids:
+            return 0
+        if table not in LEASE_TABLES:
+            raise ValueError(f"No leases on table: {table}")
+
+        marks = ','.join('?' * len(ids))
+        cursor.execute(f"""
+            UPDATE {table}
+            SET claimed_by = NULL, lease_expires_at = NULL
+            WHERE id IN ({marks}) AND claimed_by = ?
+        """, ids + [self.worker_id])
+        return cursor.rowcount
+
+    def recover(self, cursor) -> int:
+        """
+        Clear leases left behind by workers that died mid-run.
+
+        claim() already ignores expired leases; this just tidies them up
+        and makes crashed workers visible in logs and metrics.
+
+        Returns:
+            Number of leases cleared
+        """
+        recovered = 0
+        for table in LEASE_TABLES:
+            cursor.execute(f"""
+                UPDATE {table}
+                SET claimed_by = NULL, lease_expires_at = NULL
+                WHERE claimed_by IS NOT NULL AND lease_expires_at <= CURRENT_TIMESTAMP
+            """)
+            if cursor.rowcount:
+                metrics.inc('leases_recovered_total', cursor.rowcount, table=table)
+                logger.warning(f"♻️  Recovered {cursor.rowcount} expired {table} leases")
+                recovered += cursor.rowcount
+        return recovered
@@ -0,0 +1,299 @@
+"""
+Data retention for Energy News Bot
+Archives finished articles, rolls up crawl_log and metrics, and reclaims free pages
+"""
+import json
+import zlib
+from typing import Dict, List
+import logging
+
+from database.storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# Articles that will never be tweeted
+DEAD_STATUSES = ('filtered_out', 'duplicate', 'expired')
+
+# PRAGMA auto_vacuum value for INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def pack(record: Dict) -> bytes:
+    """Compress a record for the archive tables."""
+    return zlib.compress(json.dumps(record, default=str).encode('utf-8'), 9)
+
+
+def unpack(blob: bytes) -> Dict:
+    return json.loads(zlib.decompress(blob))
+
+
+def _rows(cursor) -> List[Dict]:
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+class RetentionManager:
+    """
+    Keeps the hot tables small.
+
+    - filtered_out / duplicate / expired articles older than filtered_days, and posted
+      articles whose tweets went out more than posted_days ago, move to
+      articles_archive (one compressed row per article with its tweets and
+      engagement snapshots)
+    - crawl_log rows older than crawl_log_days are summed into
+      crawl_log_hourly, one row per source per hour
+    - metrics deltas older than metrics_days are merged into one row per
+      series (exported totals don't change)
+    - freed pages are returned to the OS with incremental VACUUM
+    """
+
+    def __init__(self, db_path, filtered_days: float = 14, posted_days: float = 90,
+                 crawl_log_days: float = 3, metrics_days: float = 7,
+                 vacuum_pages: int = 2000, batch_size: int = 500):
+        """
+        Args:
+            db_path: Path to SQLite database
+            filtered_days: Archive never-tweeted articles discovered this long ago
+            posted_days: Archive posted articles whose tweets are this old
+            crawl_log_days: Keep raw crawl_log rows this long (the poll scheduler reads recent ones)
+            metrics_days: Keep per-flush metrics rows this long
+            vacuum_pages: Most free pages released per run
+            batch_size: Articles archived per transaction
+        """
+        self.storage = Storage(db_path)
+        self.filtered_days = filtered_days
+        self.posted_days = posted_days
+        self.crawl_log_days = crawl_log_days
+        self.metrics_days = metrics_days
+        self.vacuum_pages = vacuum_pages
+        self.batch_size = batch_size
+
+    def run(self, full_vacuum: bool = False) -> Dict:
+        """
+        Run every retention step.
+
+        Args:
+            full_vacuum: Allow a one-off full VACUUM to switch an existing
+                database to incremental auto_vacuum (blocks writers meanwhile)
+
+        Returns:
+            Stats dict
+        """
+        stats = {
+            'articles_archived': self.archive_articles(),
+            'crawl_log_rolled_up': self.rollup_crawl_log(),
+            'metrics_rolled_up': self.rollup_metrics(),
+        }
+        stats['pages_freed'] = self.vacuum(full=full_vacuum)
+        logger.info(f"🧹 Retention: {stats}")
+        return stats
+
+    def archive_articles(self) -> int:
+        """
+        Move finished articles (and their tweets) to articles_archive.
+
+        Returns:
+            Number of articles archived
+        """
+        archived = 0
+        while True:
+            with self.storage.session() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT a.id
+                    FROM articles a
+                    WHERE (a.status IN (?, ?, ?) AND a.discovered_at < datetime('now', ?))
+                    OR (
+                        a.status = 'posted'
+                        AND a.discovered_at < datetime('now', ?)
+                        AND NOT EXISTS (
+                            SELECT 1 FROM tweets t
+                            WHERE t.article_id = a.id
+                            AND (t.status = 'draft' OR t.posted_at > datetime('now', ?))
+                        )
+                    )
+                    LIMIT ?
+                """, DEAD_STATUSES + (
+                    f'-{self.filtered_days} days',
+                    f'-{self.posted_days} days',
+                    f'-{self.posted_days} days',
+                    self.batch_size
+                ))
+                ids = [row[0] for row in cursor.fetchall()]
+                if ids:
+                    self._archive_batch(cursor, ids)
+                    archived += len(ids)
+
+            if len(ids) < self.batch_size:
+                break
+
+        if archived:
+            with self.storage.session() as conn:
+                conn.execute("""
+                    DELETE FROM story_clusters
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM article_clusters ac WHERE ac.cluster_id = story_clusters.id
+                    )
+                """)
+            logger.info(f"📦 Archived {archived} articles")
+
+        return archived
+
+    def _archive_batch(self, cursor, ids: List[int]):
+        marks = ','.join('?' * len(ids))
+
+        cursor.execute(f"SELECT * FROM articles WHERE id IN ({marks})", ids)
+        articles = _rows(cursor)
+
+        cursor.execute(f"SELECT * FROM tweets WHERE article_id IN ({marks})", ids)
+        tweets = _rows(cursor)
+
+        tweet_ids = [tweet['id'] for tweet in tweets]
+        snapshots: Dict[int, List[Dict]] = {}
+        if tweet_ids:
+            tweet_marks = ','.join('?' * len(tweet_ids))
+            cursor.execute(f"SELECT * FROM tweet_metrics WHERE tweet_id IN ({tweet_marks})", tweet_ids)
+            for snapshot in _rows(cursor):
+                snapshots.setdefault(snapshot['tweet_id'], []).append(snapshot)
+
+        by_article: Dict[int, List[Dict]] = {}
+        for tweet in tweets:
+            tweet['metrics'] = snapshots.get(tweet['id'], [])
+            by_article.setdefault(tweet['article_id'], []).append(tweet)
+
+        cursor.executemany("""
+            INSERT OR REPLACE INTO articles_archive
+                (id, url, url_key, title, source, status, published_at, discovered_at,
+                 us_energy_relevant, filter_reason, payload)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (
+                article['id'], article['url'], article['url_key'], article['title'], article['source'], article['status'],
+                article['published_at'], article['discovered_at'], article['us_energy_relevant'],
+                article['filter_reason'], pack(dict(article, tweets=by_article.get(article['id'], [])))
+            )
+            for article in articles
+        ])
+
+        if tweet_ids:
+            cursor.execute(f"DELETE FROM tweet_metrics WHERE tweet_id IN ({tweet_marks})", tweet_ids)
+            cursor.execute(f"DELETE FROM post_slots WHERE tweet_id IN ({tweet_marks})", tweet_ids)
+            cursor.execute(f"DELETE FROM tweets WHERE id IN ({tweet_marks})", tweet_ids)
+        cursor.execute(f"DELETE FROM article_clusters WHERE article_id IN ({marks})", ids)
+        cursor.execute(f"DELETE FROM articles WHERE id IN ({marks})", ids)
+
+    def rollup_crawl_log(self) -> int:
+        """
+        Fold crawl_log rows from complete hours older than crawl_log_days into crawl_log_hourly.
+
+        Returns:
+            Number of crawl_log rows rolled up
+        """
+        with self.storage.session() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT strftime('%Y-%m-%d %H:00:00', 'now', ?)", (f'-{self.crawl_log_days} days',))
+            cutoff = cursor.fetchone()[0]
+
+            cursor.execute("""
+                INSERT INTO crawl_log_hourly
+                    (source, hour, polls, unchanged, failed, articles_found, articles_new)
+                SELECT source, strftime('%Y-%m-%d %H:00:00', crawled_at), COUNT(*),
+                       SUM(status = 'unchanged'), SUM(status = 'failed'),
+                       SUM(articles_found), SUM(articles_new)
+                FROM crawl_log
+                WHERE crawled_at < ?
+                GROUP BY 1, 2
+                ON CONFLICT (source, hour) DO UPDATE SET
+                    polls = polls + excluded.polls,
+                    unchanged = unchanged + excluded.unchanged,
+                    failed = failed + excluded.failed,
+                    articles_found = articles_found + excluded.articles_found,
+                    articles_new = articles_new + excluded.articles_new
+            """, (cutoff,))
+            cursor.execute("DELETE FROM crawl_log WHERE crawled_at < ?", (cutoff,))
+            return cursor.rowcount
+
+    def rollup_metrics(self) -> int:
+        """
+        Merge old per-flush metrics rows into one row per series.
+
+        Returns:
+            Number of rows removed
+        """
+        with self.storage.session() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, name, labels, kind, count, total, buckets, recorded_at
+                FROM metrics
+                WHERE recorded_at < datetime('now', ?)
+                ORDER BY id
+            """, (f'-{self.metrics_days} days',))
+
+            series: Dict[tuple, Dict] = {}
+            for row_id, name, labels, kind, count, total, buckets, recorded_at in cursor.fetchall():
+                merged = series.setdefault((name, labels, kind), {
+                    'ids': [], 'count': 0, 'total': 0.0, 'buckets': None, 'recorded_at': recorded_at
+                })
+                merged['ids'].append(row_id)
+                merged['count'] += count
+                merged['total'] += total
+                merged['recorded_at'] = recorded_at
+                if buckets is not None:
+                    values = json.loads(buckets)
+                    if merged['buckets'] is None:
+                        merged['buckets'] = values
+                    else:
+                        # Older rows may predate buckets appended to metrics.BUCKETS
+                        width = max(len(merged['buckets']), len(values))
+                        merged['buckets'] = [
+                            (merged['buckets'][i] if i < len(merged['buckets']) else 0)
+                            + (values[i] if i < len(values) else 0)
+                            for i in range(width)
+                        ]
+
+            removed = 0
+            for (name, labels, kind), merged in series.items():
+                if len(merged['ids']) < 2:
+                    continue
+                cursor.execute("""
+                    INSERT INTO metrics (name, labels, kind, count, total, buckets, recorded_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    name, labels, kind, merged['count'], merged['total'],
+                    json.dumps(merged['buckets']) if merged['buckets'] is not None else None,
+                    merged['recorded_at']
+                ))
+                cursor.executemany("DELETE FROM metrics WHERE id = ?", [(row_id,) for row_id in merged['ids']])
+                removed += len(merged['ids']) - 1
+
+            return removed
+
+    def vacuum(self, full: bool = False) -> int:
+        """
+        Release free pages back to the filesystem.
+
+        Databases created before auto_vacuum was enabled need one full
+        VACUUM to switch modes; that only happens when full=True.
+
+        Returns:
+            Number of pages freed
+        """
+        conn = self.storage.connection()
+        conn.commit()
+
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+        if mode != AUTO_VACUUM_INCREMENTAL:
+            if not full:
+                logger.info("auto_vacuum is off for this database - run `python run.py retention --full-vacuum` once to enable incremental vacuum")
+                return 0
+            logger.info("Running a one-off full VACUUM to enable incremental auto_vacuum...")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        else:
+            # execute() steps the pragma once (one page); executescript runs it to completion
+            conn.executescript(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)});")
+
+        conn.execute("PRAGMA optimize")
+        return free_before - conn.execute("PRAGMA freelist_count").fetchone()[0]
@@ -3,7 +3,8 @@
 -- Articles discovered from news sources
 CREATE TABLE IF NOT EXISTS articles (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
-    url TEXT UNIQUE NOT NULL,
+    url TEXT UNIQUE NOT NULL,  -- link as published (this is what gets tweeted)
+    url_key TEXT,  -- canonical form used for dedupe (crawler/ingest.py)
     title TEXT NOT NULL,
     summary TEXT,
     content TEXT,
@@ -11,9 +12,11 @@ CREATE TABLE IF NOT EXISTS articles (
     source TEXT NOT NULL,
     published_at TIMESTAMP NOT NULL,
     discovered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    status TEXT DEFAULT 'pending',  -- pending|approved|filtered_out|posted|failed
+    status TEXT DEFAULT 'pending',  -- pending|approved|filtered_out|duplicate|expired|posted|failed
     us_energy_relevant BOOLEAN,
-    filter_reason TEXT
+    filter_reason TEXT,
+    claimed_by TEXT,  -- worker holding a lease on this row (see database/leases.py)
+    lease_expires_at TIMESTAMP
 );
 
 -- Generated tweets ready to post
@@ -32,9 +35,22 @@ CREATE TABLE IF NOT EXISTS tweets (
     impressions INTEGER DEFAULT 0,
     status TEXT DEFAULT 'draft',  -- draft|posted|failed
     error TEXT,
+    claimed_by TEXT,
+    lease_expires_at TIMESTAMP,
     FOREIGN KEY (article_id) REFERENCES articles(id)
 );
 
+-- Engagement metric snapshots (time series per posted tweet)
+CREATE TABLE IF NOT EXISTS tweet_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tweet_id INTEGER NOT NULL REFERENCES tweets(id),
+    captured_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    likes INTEGER DEFAULT 0,
+    retweets INTEGER DEFAULT 0,
+    replies INTEGER DEFAULT 0,
+    impressions INTEGER DEFAULT 0
+);
+
 -- Crawl execution log
 CREATE TABLE IF NOT EXISTS crawl_log (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -42,10 +58,22 @@ CREATE TABLE IF NOT EXISTS crawl_log (
     crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     articles_found INTEGER DEFAULT 0,
     articles_new INTEGER DEFAULT 0,
-    status TEXT DEFAULT 'success',  -- success|failed
+    status TEXT DEFAULT 'success',  -- success|unchanged|failed
     error TEXT
 );
 
+-- Hourly per-source crawl totals for crawl_log rows past retention (see database/retention.py)
+CREATE TABLE IF NOT EXISTS crawl_log_hourly (
+    source TEXT NOT NULL,
+    hour TIMESTAMP NOT NULL,  -- start of the hour
+    polls INTEGER NOT NULL,
+    unchanged INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    articles_found INTEGER NOT NULL,
+    articles_new INTEGER NOT NULL,
+    PRIMARY KEY (source, hour)
+);
+
 -- News sources configuration
 CREATE TABLE IF NOT EXISTS sources (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -58,8 +86,180 @@ CREATE TABLE IF NOT EXISTS sources (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Conditional GET validators per source (ETag / Last-Modified / body hash)
+CREATE TABLE IF NOT EXISTS feed_cache (
+    source_id INTEGER PRIMARY KEY REFERENCES sources(id),
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,  -- sha256 of the last parsed feed body
+    checked_at TIMESTAMP
+);
+
+-- Adaptive poll schedule per source
+CREATE TABLE IF NOT EXISTS source_schedule (
+    source_id INTEGER PRIMARY KEY REFERENCES sources(id),
+    poll_interval_seconds INTEGER NOT NULL,
+    next_due_at TIMESTAMP NOT NULL,  -- UTC
+    updated_at TIMESTAMP
+);
+
+-- Newest entry seen per source, used to stop walking a feed early
+CREATE TABLE IF NOT EXISTS source_watermark (
+    source_id INTEGER PRIMARY KEY REFERENCES sources(id),
+    guid TEXT,
+    url TEXT,
+    published_at TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+-- Archived feed bodies per source (blobs live in FEED_ARCHIVE_DIR, keyed by content_hash)
+CREATE TABLE IF NOT EXISTS feed_archive (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_id INTEGER NOT NULL REFERENCES sources(id),
+    content_hash TEXT NOT NULL,  -- sha256 of the raw body
+    content_type TEXT,
+    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Near-duplicate story clusters (one representative goes to the LLM)
+CREATE TABLE IF NOT EXISTS story_clusters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    representative_id INTEGER REFERENCES articles(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS article_clusters (
+    article_id INTEGER PRIMARY KEY REFERENCES articles(id),
+    cluster_id INTEGER NOT NULL REFERENCES story_clusters(id),
+    simhash INTEGER NOT NULL  -- 64-bit SimHash of title + summary (signed)
+);
+
+-- LLM response cache, keyed by a hash of (model, system prompt, prompt, parameters)
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    prompts_version TEXT NOT NULL,  -- sha256 of config/prompts.yaml
+    response TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    hits INTEGER DEFAULT 0
+);
+
+-- Last trained pre-classifier model, shared by every process (see processor/preclassifier.py)
+CREATE TABLE IF NOT EXISTS preclassifier_model (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    n_features INTEGER NOT NULL,
+    labels INTEGER NOT NULL,  -- LLM-labelled articles when it was trained
+    bias REAL NOT NULL,
+    weights BLOB NOT NULL,  -- zlib-compressed non-zero (index, weight) pairs
+    trained_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Planned post slots for draft tweets (posting never sleeps in-process)
+CREATE TABLE IF NOT EXISTS post_slots (
+    tweet_id INTEGER PRIMARY KEY REFERENCES tweets(id),
+    planned_at TIMESTAMP NOT NULL,  -- UTC
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Latest X quotas from rate-limit response headers, per endpoint/bucket
+CREATE TABLE IF NOT EXISTS x_rate_limits (
+    endpoint TEXT PRIMARY KEY,  -- e.g. 'POST /2/tweets', 'POST /2/tweets:user24h'
+    limit_total INTEGER,
+    remaining INTEGER,
+    reset_at TIMESTAMP,  -- UTC
+    updated_at TIMESTAMP
+);
+
+-- Pipeline metrics: one delta row per series per flush (see metrics.py)
+CREATE TABLE IF NOT EXISTS metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,  -- JSON object with sorted keys
+    kind TEXT NOT NULL,  -- counter|histogram
+    count INTEGER NOT NULL,  -- increments / observations
+    total REAL NOT NULL,  -- counter value / sum of observed seconds
+    buckets TEXT,  -- JSON per-bucket counts for histograms
+    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Running totals per series, updated on every flush so exports never rescan metrics
+CREATE TABLE IF NOT EXISTS metrics_totals (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,  -- JSON object with sorted keys
+    kind TEXT NOT NULL,  -- counter|histogram
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    buckets TEXT,  -- JSON per-bucket counts for histograms
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (name, labels, kind)
+);
+
+-- Finished articles moved out of the hot tables (payload: zlib JSON of the article, its tweets and their metrics)
+CREATE TABLE IF NOT EXISTS articles_archive (
+    id INTEGER PRIMARY KEY,  -- original articles.id
+    url TEXT UNIQUE NOT NULL,
+    url_key TEXT,
+    title TEXT NOT NULL,
+    source TEXT NOT NULL,
+    status TEXT NOT NULL,
+    published_at TIMESTAMP,
+    discovered_at TIMESTAMP,
+    us_energy_relevant BOOLEAN,
+    filter_reason TEXT,
+    payload BLOB NOT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Full-text indexes over article and tweet text (external content, kept in sync by the triggers below)
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, summary,
+    content='articles', content_rowid='id',
+    tokenize='porter unicode61'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS tweets_fts USING fts5(
+    tweet_text,
+    content='tweets', content_rowid='id',
+    tokenize='porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+END;
+
+CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+END;
+
+CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, summary ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+    INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tweets_fts_insert AFTER INSERT ON tweets BEGIN
+    INSERT INTO tweets_fts (rowid, tweet_text) VALUES (new.id, new.tweet_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tweets_fts_delete AFTER DELETE ON tweets BEGIN
+    INSERT INTO tweets_fts (tweets_fts, rowid, tweet_text) VALUES ('delete', old.id, old.tweet_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tweets_fts_update AFTER UPDATE OF tweet_text ON tweets BEGIN
+    INSERT INTO tweets_fts (tweets_fts, rowid, tweet_text) VALUES ('delete', old.id, old.tweet_text);
+    INSERT INTO tweets_fts (rowid, tweet_text) VALUES (new.id, new.tweet_text);
+END;
+
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_articles_status ON articles(status);
 CREATE INDEX IF NOT EXISTS idx_articles_published ON articles(published_at);
+CREATE INDEX IF NOT EXISTS idx_articles_source ON articles(source, published_at);
+CREATE INDEX IF NOT EXISTS idx_crawl_log_source ON crawl_log(source);
+CREATE INDEX IF NOT EXISTS idx_crawl_log_crawled ON crawl_log(crawled_at);
+CREATE INDEX IF NOT EXISTS idx_article_clusters_cluster ON article_clusters(cluster_id);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_used ON llm_cache(last_used_at);
 CREATE INDEX IF NOT EXISTS idx_tweets_status ON tweets(status);
 CREATE INDEX IF NOT EXISTS idx_tweets_posted ON tweets(posted_at);
+CREATE INDEX IF NOT EXISTS idx_tweet_metrics_tweet ON tweet_metrics(tweet_id, captured_at);
+CREATE INDEX IF NOT EXISTS idx_post_slots_planned ON post_slots(planned_at);
+CREATE INDEX IF NOT EXISTS idx_metrics_name ON metrics(name, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_feed_archive_fetched ON feed_archive(fetched_at);
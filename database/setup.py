@@ -1,26 +1,26 @@
 """
 Database setup for Energy News Bot
 """
-import sqlite3
+import sys
 import yaml
 from pathlib import Path
 
+# Run as a script (python3 database/setup.py), so make the project importable
+sys.path.append(str(Path(__file__).parent.parent))
+
+from database.storage import connect
+
 def setup_database(db_path: str = "./database/energy_news.db"):
     """Create database and tables."""
     
     # Create database directory if it doesn't exist
     Path(db_path).parent.mkdir(parents=True, exist_ok=True)
     
-    # Connect to database
-    conn = sqlite3.connect(db_path)
+    # Connect with the standard pragmas (WAL, incremental auto_vacuum) and
+    # schema - auto_vacuum only sticks if it is set before the first table
+    conn = connect(db_path)
     cursor = conn.cursor()
     
-    # Read and execute schema
-    schema_path = Path(__file__).parent / "schema.sql"
-    with open(schema_path, 'r') as f:
-        schema = f.read()
-        cursor.executescript(schema)
-    
     # Load and insert news sources
     sources_path = Path(__file__).parent.parent / "config" / "sources.yaml"
     with open(sources_path, 'r') as f:
@@ -0,0 +1,217 @@
+"""
+Shared SQLite storage layer for Energy News Bot
+WAL mode, tuned pragmas, per-thread connection reuse and status transitions
+"""
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_PATH = Path(__file__).parent / "schema.sql"
+
+PRAGMAS = {
+    'auto_vacuum': 'INCREMENTAL',  # only takes effect on new databases (or after a VACUUM)
+    'journal_mode': 'WAL',        # readers never block the writer (persistent)
+    'synchronous': 'NORMAL',      # safe with WAL, far fewer fsyncs than FULL
+    'cache_size': -20000,         # ~20 MB page cache
+    'mmap_size': 268435456,       # 256 MB memory-mapped reads
+    'temp_store': 'MEMORY',
+    'busy_timeout': 30000,        # wait up to 30s for a competing writer
+}
+
+# Sentinel for transition fields that should be set to the database's CURRENT_TIMESTAMP
+CURRENT_TIMESTAMP = object()
+
+COLUMN_RE = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+# Schema is applied once per database per process
+_schema_applied = set()
+_schema_lock = threading.Lock()
+
+
+def connect(db_path, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a new connection with the standard pragmas (and schema) applied."""
+    conn = sqlite3.connect(str(db_path), timeout=PRAGMAS['busy_timeout'] / 1000,
+                           check_same_thread=check_same_thread)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    ensure_schema(conn, db_path)
+    return conn
+
+
+def ensure_schema(conn: sqlite3.Connection, db_path):
+    """Create any missing tables/indexes so existing databases pick up new ones."""
+    key = str(Path(db_path).resolve())
+    with _schema_lock:
+        if key in _schema_applied:
+            return
+        with open(SCHEMA_PATH, 'r') as f:
+            conn.executescript(f.read())
+        _add_columns(conn)
+        for sql in ADDED_INDEXES:
+            conn.execute(sql)
+        _backfill_fts(conn)
+        _schema_applied.add(key)
+
+
+# Columns added to existing tables after their first release
+# (CREATE TABLE IF NOT EXISTS never alters a table that already exists)
+ADDED_COLUMNS = {
+    'articles': {'claimed_by': 'TEXT', 'lease_expires_at': 'TIMESTAMP', 'url_key': 'TEXT'},
+    'tweets': {'claimed_by': 'TEXT', 'lease_expires_at': 'TIMESTAMP'},
+    'articles_archive': {'url_key': 'TEXT'},
+}
+
+# Indexes on added columns (schema.sql runs before _add_columns, so they can't live there)
+ADDED_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_articles_url_key ON articles(url_key)",
+    "CREATE INDEX IF NOT EXISTS idx_articles_archive_url_key ON articles_archive(url_key)",
+]
+
+
+def _add_columns(conn: sqlite3.Connection):
+    """ALTER older databases to match schema.sql (one-off per database)."""
+    for table, columns in ADDED_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column, declaration in columns.items():
+            if column in existing:
+                continue
+            logger.info(f"Adding column {table}.{column}")
+            try:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+            except sqlite3.OperationalError as e:
+                # Another process migrated the same database first
+                if 'duplicate column' not in str(e):
+                    raise
+    conn.commit()
+
+
+# Full-text index -> the table its triggers mirror
+FTS_TABLES = {'articles_fts': 'articles', 'tweets_fts': 'tweets'}
+
+
+def _backfill_fts(conn: sqlite3.Connection):
+    """Index rows written before the full-text tables existed (one-off per database)."""
+    for fts_table, table in FTS_TABLES.items():
+        indexed = conn.execute(f"SELECT COUNT(*) FROM {fts_table}_docsize").fetchone()[0]
+        total = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if indexed != total:
+            logger.info(f"Rebuilding {fts_table} ({indexed}/{total} rows indexed)")
+            conn.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+            conn.commit()
+
+
+class Storage:
+    """
+    Stage-agnostic access to the bot database.
+
+    Each thread gets its own long-lived connection. Stages open a
+    session(), record status transitions, and call tick() after each
+    unit of work so progress is committed in small batches.
+    """
+
+    def __init__(self, db_path, commit_every: int = 10):
+        """
+        Args:
+            db_path: Path to SQLite database
+            commit_every: Commit after this many tick() calls
+        """
+        self.db_path = str(db_path)
+        self.commit_every = max(1, commit_every)
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+            self._local.pending = 0
+        return conn
+
+    @contextmanager
+    def session(self) -> Iterator[sqlite3.Connection]:
+        """Commit on success, roll back on error - never leave a write lock behind."""
+        conn = self.connection()
+        self._local.pending = 0
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.pending = 0
+
+    def lock(self):
+        """
+        Take the write lock now (BEGIN IMMEDIATE) rather than at the first write.
+
+        Use before reading what to work on, so another worker can't claim
+        or cluster the same rows between this worker's read and its writes.
+        """
+        conn = self.connection()
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+
+    def tick(self, force: bool = False):
+        """Count one unit of work; commit once commit_every have accumulated."""
+        conn = self.connection()
+        self._local.pending += 1
+        if force or self._local.pending >= self.commit_every:
+            conn.commit()
+            self._local.pending = 0
+
+    def transition_article(self, row_id: int, to_status: str,
+                           from_status: Optional[str] = None, **fields) -> bool:
+        """
+        Move an article to a new status, optionally only from an expected one.
+
+        Returns:
+            True if the row was updated
+        """
+        return self._transition('articles', row_id, to_status, from_status, fields)
+
+    def transition_tweet(self, row_id: int, to_status: str,
+                         from_status: Optional[str] = None, **fields) -> bool:
+        """
+        Move a tweet to a new status, optionally only from an expected one.
+
+        Returns:
+            True if the row was updated
+        """
+        return self._transition('tweets', row_id, to_status, from_status, fields)
+
+    def _transition(self, table: str, row_id: int, to_status: str,
+                    from_status: Optional[str], fields: Dict) -> bool:
+        assignments = ['status = ?']
+        params = [to_status]
+        for column, value in fields.items():
+            if not COLUMN_RE.match(column):
+                raise ValueError(f"Invalid column name: {column}")
+            if value is CURRENT_TIMESTAMP:
+                assignments.append(f"{column} = CURRENT_TIMESTAMP")
+            else:
+                assignments.append(f"{column} = ?")
+                params.append(value)
+
+        sql = f"UPDATE {table} SET {', '.join(assignments)} WHERE id = ?"
+        params.append(row_id)
+        if from_status is not None:
+            sql += " AND status = ?"
+            params.append(from_status)
+
+        cursor = self.connection().execute(sql, params)
+        return cursor.rowcount > 0
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
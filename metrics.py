@@ -0,0 +1,264 @@
+"""
+Pipeline metrics for Energy News Bot
+In-process counters and latency histograms, persisted to SQLite and exported for Prometheus
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+
+from database.storage import connect
+
+logger = logging.getLogger(__name__)
+
+# Histogram upper bounds in seconds. Stored bucket counts line up with this
+# tuple, so only ever append to it.
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+PREFIX = 'energy_news_bot_'
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and histograms keyed by name + labels.
+
+    Values accumulate in memory until flush() writes them to the metrics
+    table as one delta row per series and resets them.
+    """
+
+    def __init__(self):
+        self.counters: Dict[Tuple, list] = {}
+        self.histograms: Dict[Tuple, list] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Add to a counter (names end in _total)."""
+        key = (name, _label_key(labels))
+        with self.lock:
+            series = self.counters.setdefault(key, [0, 0.0])
+            series[0] += 1
+            series[1] += amount
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record one latency observation."""
+        key = (name, _label_key(labels))
+        with self.lock:
+            series = self.histograms.setdefault(key, [0, 0.0, [0] * (len(BUCKETS) + 1)])
+            series[0] += 1
+            series[1] += seconds
+            series[2][_bucket_index(seconds)] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observe the wall time of the with-block (also when it raises)."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started, **labels)
+
+    def flush(self, cursor) -> int:
+        """
+        Write accumulated values to the metrics table and reset them.
+
+        Also folds them into metrics_totals, so call this inside a write
+        transaction when several processes share the database.
+
+        Returns:
+            Number of series written
+        """
+        with self.lock:
+            counters, self.counters = self.counters, {}
+            histograms, self.histograms = self.histograms, {}
+
+        rows = [
+            (name, json.dumps(dict(labels), sort_keys=True), 'counter', count, total, None)
+            for (name, labels), (count, total) in counters.items()
+        ] + [
+            (name, json.dumps(dict(labels), sort_keys=True), 'histogram', count, total, buckets)
+            for (name, labels), (count, total, buckets) in histograms.items()
+        ]
+        cursor.executemany("""
+            INSERT INTO metrics (name, labels, kind, count, total, buckets)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [row[:5] + (json.dumps(row[5]) if row[5] is not None else None,) for row in rows])
+        _add_totals(cursor, rows)
+        return len(rows)
+
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _bucket_index(seconds: float) -> int:
+    for i, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            return i
+    return len(BUCKETS)
+
+
+def _merge_buckets(a: Optional[list], b: Optional[list]) -> Optional[list]:
+    """Add two bucket lists (older rows may predate buckets appended to BUCKETS)."""
+    if a is None or b is None:
+        return a if b is None else b
+    width = max(len(a), len(b))
+    return [(a[i] if i < len(a) else 0) + (b[i] if i < len(b) else 0) for i in range(width)]
+
+
+def _add_totals(cursor, rows: List[Tuple]):
+    """Add (name, labels, kind, count, total, buckets) deltas to metrics_totals."""
+    for name, labels, kind, count, total, buckets in rows:
+        if buckets is not None:
+            cursor.execute("""
+                SELECT buckets FROM metrics_totals WHERE name = ? AND labels = ? AND kind = ?
+            """, (name, labels, kind))
+            row = cursor.fetchone()
+            if row and row[0]:
+                buckets = _merge_buckets(json.loads(row[0]), buckets)
+        cursor.execute("""
+            INSERT INTO metrics_totals (name, labels, kind, count, total, buckets)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (name, labels, kind) DO UPDATE SET
+                count = count + excluded.count,
+                total = total + excluded.total,
+                buckets = excluded.buckets,
+                updated_at = CURRENT_TIMESTAMP
+        """, (name, labels, kind, count, total, json.dumps(buckets) if buckets is not None else None))
+
+
+def _seed_totals(cursor) -> int:
+    """
+    Build metrics_totals from the metrics table (one-off for databases
+    that predate it).
+
+    Returns:
+        Number of series seeded
+    """
+    cursor.execute("""
+        SELECT name, labels, kind, SUM(count), SUM(total)
+        FROM metrics
+        WHERE kind = 'counter'
+        GROUP BY name, labels, kind
+    """)
+    rows = [row + (None,) for row in cursor.fetchall()]
+
+    cursor.execute("SELECT name, labels, count, total, buckets FROM metrics WHERE kind = 'histogram'")
+    histograms: Dict[Tuple[str, str], list] = {}
+    for name, labels, count, total, buckets in cursor.fetchall():
+        series = histograms.setdefault((name, labels), [0, 0.0, None])
+        series[0] += count
+        series[1] += total
+        series[2] = _merge_buckets(series[2], json.loads(buckets) if buckets else None)
+    rows += [(name, labels, 'histogram', count, total, buckets)
+             for (name, labels), (count, total, buckets) in histograms.items()]
+
+    _add_totals(cursor, rows)
+    if rows:
+        logger.info(f"Seeded metrics_totals with {len(rows)} series")
+    return len(rows)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict, **extra) -> str:
+    items = list(labels.items()) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(str(v))}"' for k, v in items) + '}'
+
+
+def render_prometheus(cursor) -> str:
+    """
+    Render totals over every stored delta in the Prometheus text format.
+
+    Counters and histograms are cumulative across process restarts, since
+    they come from metrics_totals rather than from memory. That table holds
+    one row per series, so rendering costs the same however long the
+    metrics history gets.
+    """
+    cursor.execute("""
+        SELECT name, labels, kind, count, total, buckets
+        FROM metrics_totals
+        ORDER BY kind, name, labels
+    """)
+    counters = []
+    histograms: Dict[Tuple[str, str], list] = {}
+    for name, labels, kind, count, total, buckets in cursor.fetchall():
+        if kind == 'counter':
+            counters.append((name, labels, total))
+        else:
+            histograms[(name, labels)] = [count, total, json.loads(buckets) if buckets else []]
+
+    lines = []
+    typed = set()
+    for name, labels, total in counters:
+        if name not in typed:
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            typed.add(name)
+        lines.append(f"{PREFIX}{name}{_format_labels(json.loads(labels))} {total:g}")
+
+    for (name, labels), (count, total, buckets) in histograms.items():
+        if name not in typed:
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            typed.add(name)
+        labels = json.loads(labels)
+        cumulative = 0
+        for bound, value in zip(BUCKETS, buckets):
+            cumulative += value
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, le=f'{bound:g}')} {cumulative}")
+        lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, le='+Inf')} {count}")
+        lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {count}")
+
+    lines.append(f"# TYPE {PREFIX}metrics_flushed_timestamp_seconds gauge")
+    lines.append(f"{PREFIX}metrics_flushed_timestamp_seconds {time.time():.0f}")
+    return '\n'.join(lines) + '\n'
+
+
+def flush(db_path: str, textfile: Optional[str] = None) -> Dict:
+    """
+    Persist this process's metrics and optionally export a Prometheus textfile.
+
+    Args:
+        db_path: Path to SQLite database
+        textfile: Where to write the .prom file (for node_exporter's textfile collector)
+
+    Returns:
+        Stats dict
+    """
+    conn = connect(db_path)
+    try:
+        cursor = conn.cursor()
+        # Histogram totals are read-modify-write, so hold the write lock throughout
+        conn.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT 1 FROM metrics_totals LIMIT 1")
+        if cursor.fetchone() is None:
+            _seed_totals(cursor)
+        written = REGISTRY.flush(cursor)
+        conn.commit()
+
+        if textfile:
+            # Write then rename so the collector never reads a partial file
+            directory = os.path.dirname(textfile)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{textfile}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(render_prometheus(cursor))
+            os.replace(tmp_path, textfile)
+    finally:
+        conn.close()
+
+    return {'series': written, 'textfile': textfile}
+
+
+# Process-wide registry used by every stage
+REGISTRY = MetricsRegistry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
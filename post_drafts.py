@@ -3,7 +3,6 @@
 Post existing draft tweets directly
 """
 import os
-import sqlite3
 from dotenv import load_dotenv
 
 # Python 3.13 compatibility
@@ -11,12 +10,15 @@ import imghdr_compat
 
 import tweepy
 
+from database.storage import CURRENT_TIMESTAMP, Storage
+
 load_dotenv()
 
 db_path = "database/energy_news.db"
 
 # Connect to database
-conn = sqlite3.connect(db_path)
+storage = Storage(db_path)
+conn = storage.connection()
 cursor = conn.cursor()
 
 # Get draft tweets
@@ -48,26 +50,22 @@ for tweet_id, tweet_text in draft_tweets:
         response = client.create_tweet(text=tweet_text)
         x_tweet_id = response.data['id']
         
-        # Update database
-        cursor.execute("""
-            UPDATE tweets
-            SET status = 'posted', tweet_id = ?, posted_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (x_tweet_id, tweet_id))
+        # Update database (committed right away so a crash can't re-post it)
+        storage.transition_tweet(
+            tweet_id, 'posted', from_status='draft',
+            tweet_id=x_tweet_id, posted_at=CURRENT_TIMESTAMP
+        )
+        conn.commit()
         
         posted += 1
         print(f"✅ Posted! Tweet ID: {x_tweet_id}\n")
         
     except Exception as e:
         print(f"❌ Failed: {e}\n")
-        cursor.execute("""
-            UPDATE tweets
-            SET status = 'failed', error = ?
-            WHERE id = ?
-        """, (str(e), tweet_id))
+        storage.transition_tweet(tweet_id, 'failed', from_status='draft', error=str(e))
+        conn.commit()
 
-conn.commit()
-conn.close()
+storage.close()
 
 print(f"\n{'='*60}")
 print(f"Posted {posted} out of {len(draft_tweets)} tweets")
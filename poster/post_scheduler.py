@@ -0,0 +1,158 @@
+"""
+Posting scheduler for Energy News Bot
+Plans post slots in the database and respects the rate limits X reports
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# X rate-limit header prefixes -> bucket suffix stored in x_rate_limits
+RATE_LIMIT_HEADERS = {
+    'x-rate-limit': '',                      # per 15-minute window
+    'x-user-limit-24hour': ':user24h',       # per-user daily post cap
+    'x-app-limit-24hour': ':app24h',         # per-app daily post cap
+}
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def utc_now() -> datetime:
+    """Naive UTC now, comparable with SQLite's CURRENT_TIMESTAMP."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class PostScheduler:
+    """Keeps a persistent queue of planned post slots and the latest X quotas."""
+
+    def __init__(self, min_spacing_seconds: int = 60):
+        """
+        Args:
+            min_spacing_seconds: Minimum gap between two planned posts
+        """
+        self.min_spacing = timedelta(seconds=max(0, min_spacing_seconds))
+
+    def plan(self, cursor) -> int:
+        """
+        Give every draft without a slot the next free slot.
+
+        Returns:
+            Number of drafts newly scheduled
+        """
+        cursor.execute("""
+            SELECT t.id
+            FROM tweets t
+            LEFT JOIN post_slots ps ON ps.tweet_id = t.id
+            WHERE t.status = 'draft' AND ps.tweet_id IS NULL
+            ORDER BY t.id ASC
+        """)
+        drafts = [row[0] for row in cursor.fetchall()]
+        if not drafts:
+            return 0
+
+        cursor.execute("SELECT MAX(planned_at) FROM post_slots")
+        last = cursor.fetchone()[0]
+        slot = utc_now()
+        if last:
+            slot = max(slot, datetime.strptime(last, TIMESTAMP_FORMAT) + self.min_spacing)
+
+        for tweet_id in drafts:
+            cursor.execute("""
+                INSERT INTO post_slots (tweet_id, planned_at) VALUES (?, ?)
+            """, (tweet_id, slot.strftime(TIMESTAMP_FORMAT)))
+            slot += self.min_spacing
+
+        return len(drafts)
+
+    def blocked_until(self, cursor, endpoint: str) -> Optional[datetime]:
+        """Time the endpoint's exhausted quota resets, or None if we may post now."""
+        cursor.execute("""
+            SELECT MAX(reset_at)
+            FROM x_rate_limits
+            WHERE (endpoint = ? OR endpoint LIKE ?)
+            AND remaining <= 0
+            AND reset_at > ?
+        """, (endpoint, endpoint + ':%', utc_now().strftime(TIMESTAMP_FORMAT)))
+        reset_at = cursor.fetchone()[0]
+        return datetime.strptime(reset_at, TIMESTAMP_FORMAT) if reset_at else None
+
+    def remaining(self, cursor, endpoint: str) -> Optional[int]:
+        """Smallest remaining quota reported for the endpoint (None if unknown)."""
+        cursor.execute("""
+            SELECT MIN(remaining)
+            FROM x_rate_limits
+            WHERE (endpoint = ? OR endpoint LIKE ?)
+            AND reset_at > ?
+        """, (endpoint, endpoint + ':%', utc_now().strftime(TIMESTAMP_FORMAT)))
+        return cursor.fetchone()[0]
+
+    def due(self, cursor, limit: int) -> List[Tuple]:
+        """Drafts whose slot has arrived, oldest slot first."""
+        cursor.execute("""
+            SELECT t.id, t.tweet_text, t.image_url, t.article_link
+            FROM post_slots ps
+            JOIN tweets t ON t.id = ps.tweet_id
+            WHERE t.status = 'draft' AND ps.planned_at <= ?
+            ORDER BY ps.planned_at ASC, t.id ASC
+            LIMIT ?
+        """, (utc_now().strftime(TIMESTAMP_FORMAT), limit))
+        return cursor.fetchall()
+
+    def next_slot(self, cursor) -> Optional[str]:
+        """Earliest planned slot still waiting."""
+        cursor.execute("""
+            SELECT MIN(ps.planned_at)
+            FROM post_slots ps
+            JOIN tweets t ON t.id = ps.tweet_id
+            WHERE t.status = 'draft'
+        """)
+        return cursor.fetchone()[0]
+
+    def release(self, cursor, tweet_id: int):
+        """Remove a slot once its tweet is posted or has failed."""
+        cursor.execute("DELETE FROM post_slots WHERE tweet_id = ?", (tweet_id,))
+
+    def postpone_all(self, cursor, until: datetime):
+        """Push every waiting slot to at least `until`, keeping their spacing."""
+        cursor.execute("SELECT MIN(planned_at) FROM post_slots")
+        first = cursor.fetchone()[0]
+        if not first:
+            return
+        shift = until - datetime.strptime(first, TIMESTAMP_FORMAT)
+        if shift.total_seconds() <= 0:
+            return
+        cursor.execute("""
+            UPDATE post_slots SET planned_at = datetime(planned_at, ?)
+        """, (f'+{int(shift.total_seconds()) + 1} seconds',))
+
+    def record_headers(self, cursor, endpoint: str, headers: Dict) -> Optional[Dict]:
+        """
+        Store the quotas X reported in a response's rate-limit headers.
+
+        Returns:
+            The parsed {bucket: remaining} values, or None if no headers were present
+        """
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        recorded = {}
+        for prefix, suffix in RATE_LIMIT_HEADERS.items():
+            try:
+                limit = int(headers[f'{prefix}-limit'])
+                remaining = int(headers[f'{prefix}-remaining'])
+                reset = int(headers[f'{prefix}-reset'])
+            except (KeyError, ValueError):
+                continue
+
+            reset_at = datetime.fromtimestamp(reset, timezone.utc).replace(tzinfo=None)
+            cursor.execute("""
+                INSERT INTO x_rate_limits (endpoint, limit_total, remaining, reset_at, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(endpoint) DO UPDATE SET
+                    limit_total = excluded.limit_total,
+                    remaining = excluded.remaining,
+                    reset_at = excluded.reset_at,
+                    updated_at = excluded.updated_at
+            """, (endpoint + suffix, limit, remaining, reset_at.strftime(TIMESTAMP_FORMAT)))
+            recorded[endpoint + suffix] = remaining
+
+        return recorded or None
@@ -2,128 +2,255 @@
 X (Twitter) Poster for Energy News Bot
 Posts tweets with images using X API v2
 """
-import sqlite3
 import tweepy
 import requests
-from datetime import datetime
+from datetime import timedelta
 from typing import Dict
 import logging
+import threading
 import time
 
+import metrics
+from database.leases import Leases
+from database.storage import CURRENT_TIMESTAMP, Storage
+from poster.post_scheduler import PostScheduler, utc_now
+
 logger = logging.getLogger(__name__)
 
+# Endpoints whose rate-limit headers are tracked in x_rate_limits
+POST_ENDPOINT = 'POST /2/tweets'
+LOOKUP_ENDPOINT = 'GET /2/tweets'
+MEDIA_ENDPOINT = 'POST 1.1/media/upload'
+
+# (max tweet age in hours, refresh interval in hours) - engagement refreshes decay with age
+METRICS_SCHEDULE = [
+    (24, 1),        # first day: hourly
+    (7 * 24, 24),   # rest of the first week: daily
+]
+
+
+class RateLimitedClient(tweepy.Client):
+    """tweepy.Client that remembers the last response headers per endpoint."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._headers = {}
+        self._headers_lock = threading.Lock()
+    
+    def request(self, method, route, params=None, json=None, user_auth=False):
+        endpoint = f"{method} {route}"
+        status = 'error'
+        try:
+            with metrics.timer('x_api_request_seconds', endpoint=endpoint):
+                response = super().request(method, route, params=params, json=json, user_auth=user_auth)
+            status = response.status_code
+        except tweepy.HTTPException as e:
+            status = e.response.status_code
+            self._remember(method, route, e.response)
+            raise
+        finally:
+            metrics.inc('x_api_calls_total', endpoint=endpoint, status=status)
+        self._remember(method, route, response)
+        return response
+    
+    def last_headers(self, endpoint: str) -> Dict:
+        """Headers of the last response from e.g. 'POST /2/tweets'."""
+        with self._headers_lock:
+            return self._headers.get(endpoint, {})
+    
+    def _remember(self, method, route, response):
+        if response is not None:
+            with self._headers_lock:
+                self._headers[f"{method} {route}"] = dict(response.headers)
+
 
 class XPoster:
     """Posts tweets to X (Twitter) with media."""
     
     def __init__(self, db_path: str, api_key: str, api_secret: str, 
-                 access_token: str, access_token_secret: str):
+                 access_token: str, access_token_secret: str, leases: Leases = None):
         self.db_path = db_path
+        self.storage = Storage(db_path)
+        self.scheduler = PostScheduler()
+        self.leases = (leases or Leases()).for_stage('post')
         
-        # Initialize Tweepy client (v2 API) with OAuth 1.0a
-        self.client = tweepy.Client(
-            consumer_key=api_key,
-            consumer_secret=api_secret,
-            access_token=access_token,
-            access_token_secret=access_token_secret
-        )
-        
-        # Initialize API v1.1 for media upload
-        auth = tweepy.OAuth1UserHandler(
-            api_key, api_secret, access_token, access_token_secret
-        )
-        self.api = tweepy.API(auth)
+        # Clients are built on first use, so runs with nothing due never set up OAuth
+        self._credentials = (api_key, api_secret, access_token, access_token_secret)
+        self._client = None
+        self._api = None
+        self._client_lock = threading.Lock()
+    
+    @property
+    def client(self) -> RateLimitedClient:
+        """Tweepy client (v2 API) with OAuth 1.0a."""
+        with self._client_lock:
+            if self._client is None:
+                api_key, api_secret, access_token, access_token_secret = self._credentials
+                self._client = RateLimitedClient(
+                    consumer_key=api_key,
+                    consumer_secret=api_secret,
+                    access_token=access_token,
+                    access_token_secret=access_token_secret
+                )
+            return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+    
+    @property
+    def api(self) -> tweepy.API:
+        """API v1.1 for media upload."""
+        with self._client_lock:
+            if self._api is None:
+                auth = tweepy.OAuth1UserHandler(*self._credentials)
+                self._api = tweepy.API(auth)
+            return self._api
+    
+    @api.setter
+    def api(self, api):
+        self._api = api
     
     def post_tweets(self, max_tweets: int = 10, delay_seconds: int = 60) -> Dict:
         """
-        Post draft tweets to X.
+        Post the draft tweets whose planned slot has arrived.
+        
+        New drafts are given slots delay_seconds apart in post_slots, and
+        this call only posts what is due before returning - it never
+        sleeps. Slots are pushed back whenever X reports an exhausted
+        quota in its rate-limit headers or answers 429.
         
         Args:
             max_tweets: Maximum number of tweets to post in this run
-            delay_seconds: Delay between posts to avoid rate limits
+            delay_seconds: Spacing between planned post slots
             
         Returns:
             Stats dict
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get draft tweets
-        cursor.execute("""
-            SELECT id, tweet_text, image_url, article_link
-            FROM tweets
-            WHERE status = 'draft'
-            ORDER BY id ASC
-            LIMIT ?
-        """, (max_tweets,))
-        tweets = cursor.fetchall()
-        
-        posted = 0
-        failed = 0
-        
-        logger.info(f"Posting {len(tweets)} tweets...")
-        
-        for tweet_id, text, image_url, article_link in tweets:
-            try:
-                # Download and upload image if available
-                media_id = None
-                if image_url:
-                    try:
-                        media_id = self._upload_image(image_url)
-                    except Exception as e:
-                        logger.warning(f"Failed to upload image: {e}")
+        self.scheduler.min_spacing = timedelta(seconds=max(0, delay_seconds))
+        
+        with self.storage.session() as conn:
+            cursor = conn.cursor()
+            self.storage.lock()
+            
+            planned = self.scheduler.plan(cursor)
+            self.leases.recover(cursor)
+            
+            # Hold everything back while a known quota is exhausted
+            blocked_until = self.scheduler.blocked_until(cursor, POST_ENDPOINT)
+            if blocked_until:
+                self.scheduler.postpone_all(cursor, blocked_until)
+                tweets = []
+            else:
+                remaining = self.scheduler.remaining(cursor, POST_ENDPOINT)
+                limit = max_tweets if remaining is None else min(max_tweets, remaining)
+                tweets = self.scheduler.due(cursor, limit)
+            
+            # Drafts another poster already holds are left to it
+            held = self.leases.claim(cursor, 'tweets', [tweet[0] for tweet in tweets], status='draft')
+            claimed_elsewhere = len(tweets) - len(held)
+            if claimed_elsewhere:
+                logger.info(f"🔒 Skipped {claimed_elsewhere} due tweets claimed by other workers")
+                held_ids = set(held)
+                tweets = [tweet for tweet in tweets if tweet[0] in held_ids]
+            conn.commit()
+            
+            posted = 0
+            failed = 0
+            rate_limited = blocked_until is not None
+            
+            logger.info(f"Posting {len(tweets)} due tweets ({planned} newly scheduled)...")
+            
+            for tweet_id, text, image_url, article_link in tweets:
+                # Renew right before posting - if the lease lapsed and another
+                # worker took (or posted) the draft, it must not go out twice
+                if not self.leases.claim(cursor, 'tweets', [tweet_id], status='draft'):
+                    logger.warning(f"🔒 Lost the lease on tweet {tweet_id}, skipping")
+                    continue
+                self.storage.tick(force=True)
                 
-                # Post tweet
-                if media_id:
-                    response = self.client.create_tweet(
-                        text=text,
-                        media_ids=[media_id]
+                try:
+                    # Download and upload image if available
+                    media_id = None
+                    if image_url:
+                        try:
+                            media_id = self._upload_image(image_url)
+                        except Exception as e:
+                            logger.warning(f"Failed to upload image: {e}")
+                    
+                    # Post tweet
+                    try:
+                        if media_id:
+                            response = self.client.create_tweet(
+                                text=text,
+                                media_ids=[media_id]
+                            )
+                        else:
+                            response = self.client.create_tweet(text=text)
+                    finally:
+                        self.scheduler.record_headers(cursor, POST_ENDPOINT, self.client.last_headers(POST_ENDPOINT))
+                    
+                    tweet_x_id = response.data['id']
+                    
+                    # Update database
+                    self.storage.transition_tweet(
+                        tweet_id, 'posted', from_status='draft',
+                        tweet_id=tweet_x_id, posted_at=CURRENT_TIMESTAMP
                     )
-                else:
-                    response = self.client.create_tweet(text=text)
-                
-                tweet_x_id = response.data['id']
-                
-                # Update database
-                cursor.execute("""
-                    UPDATE tweets
-                    SET status = 'posted', tweet_id = ?, posted_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                """, (tweet_x_id, tweet_id))
-                
-                # Update article status
-                cursor.execute("""
-                    UPDATE articles
-                    SET status = 'posted'
-                    WHERE id = (SELECT article_id FROM tweets WHERE id = ?)
-                """, (tweet_id,))
-                
-                posted += 1
-                logger.info(f"✓ Posted tweet {tweet_id}: {text[:50]}...")
-                
-                # Delay between posts
-                if posted < len(tweets):
-                    time.sleep(delay_seconds)
-                
-            except Exception as e:
-                logger.error(f"✗ Failed to post tweet {tweet_id}: {e}")
-                
-                # Mark as failed
-                cursor.execute("""
-                    UPDATE tweets
-                    SET status = 'failed', error = ?
-                    WHERE id = ?
-                """, (str(e), tweet_id))
-                
-                failed += 1
+                    self.scheduler.release(cursor, tweet_id)
+                    
+                    # Update article status
+                    cursor.execute("""
+                        UPDATE articles
+                        SET status = 'posted'
+                        WHERE id = (SELECT article_id FROM tweets WHERE id = ?)
+                    """, (tweet_id,))
+                    
+                    # Commit right away so a crash can never re-post this tweet
+                    self.storage.tick(force=True)
+                    
+                    posted += 1
+                    logger.info(f"✓ Posted tweet {tweet_id}: {text[:50]}...")
+                    
+                    # Stop early if that post used up a quota
+                    if self.scheduler.blocked_until(cursor, POST_ENDPOINT):
+                        rate_limited = True
+                        break
+                    
+                except tweepy.TooManyRequests as e:
+                    # Leave it a draft and move every waiting slot past the reset
+                    reset_at = self.scheduler.blocked_until(cursor, POST_ENDPOINT) or utc_now() + timedelta(minutes=15)
+                    self.scheduler.postpone_all(cursor, reset_at)
+                    self.storage.tick(force=True)
+                    
+                    rate_limited = True
+                    logger.warning(f"⏳ Rate limited posting tweet {tweet_id}, next slot after {reset_at}: {e}")
+                    break
+                    
+                except Exception as e:
+                    logger.error(f"✗ Failed to post tweet {tweet_id}: {e}")
+                    
+                    # Mark as failed
+                    self.storage.transition_tweet(tweet_id, 'failed', from_status='draft', error=str(e))
+                    self.scheduler.release(cursor, tweet_id)
+                    self.storage.tick(force=True)
+                    
+                    failed += 1
+            
+            self.leases.release(cursor, 'tweets', held)
+            next_post_at = self.scheduler.next_slot(cursor)
         
-        conn.commit()
-        conn.close()
+        if next_post_at:
+            logger.info(f"Next post slot: {next_post_at} UTC")
         
         return {
             'total': len(tweets),
             'posted': posted,
-            'failed': failed
+            'failed': failed,
+            'planned': planned,
+            'rate_limited': rate_limited,
+            'claimed_elsewhere': claimed_elsewhere,
+            'next_post_at': next_post_at
         }
     
     def _upload_image(self, image_url: str) -> str:
@@ -139,7 +266,13 @@ class XPoster:
             f.write(response.content)
         
         # Upload to X
-        media = self.api.media_upload(temp_path)
+        status = 'error'
+        try:
+            with metrics.timer('x_api_request_seconds', endpoint=MEDIA_ENDPOINT):
+                media = self.api.media_upload(temp_path)
+            status = 200
+        finally:
+            metrics.inc('x_api_calls_total', endpoint=MEDIA_ENDPOINT, status=status)
         
         # Clean up
         import os
@@ -147,57 +280,100 @@ class XPoster:
         
         return media.media_id_string
     
-    def update_engagement_metrics(self) -> Dict:
-        """Fetch and update engagement metrics for posted tweets."""
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get posted tweets from last 7 days
-        cursor.execute("""
-            SELECT id, tweet_id
-            FROM tweets
-            WHERE status = 'posted' 
-            AND posted_at > datetime('now', '-7 days')
-            AND tweet_id IS NOT NULL
-        """)
-        tweets = cursor.fetchall()
-        
-        updated = 0
-        
-        for tweet_id, x_tweet_id in tweets:
-            try:
-                # Fetch tweet metrics from X
-                tweet_data = self.client.get_tweet(
-                    x_tweet_id,
-                    tweet_fields=['public_metrics']
-                )
-                
-                metrics = tweet_data.data.public_metrics
+    def update_engagement_metrics(self, batch_size: int = 100) -> Dict:
+        """
+        Snapshot engagement metrics for posted tweets that are due a refresh.
+        
+        Refreshes decay with tweet age (see METRICS_SCHEDULE) and lookups go
+        through the multi-ID tweets endpoint, up to 100 IDs per request.
+        Every snapshot is kept in tweet_metrics; the counters on tweets
+        mirror the latest one.
+        
+        Args:
+            batch_size: Tweet IDs per lookup (X allows at most 100)
+        """
+        
+        # Refresh interval per age band, e.g. hourly for a day, then daily
+        due_clauses = []
+        params = []
+        lower_age = 0
+        for max_age_hours, refresh_hours in METRICS_SCHEDULE:
+            due_clauses.append("""
+                (t.posted_at <= datetime('now', ?) AND t.posted_at > datetime('now', ?)
+                 AND m.last_captured <= datetime('now', ?))
+            """)
+            params += [f'-{lower_age} hours', f'-{max_age_hours} hours', f'-{refresh_hours} hours']
+            lower_age = max_age_hours
+        
+        with self.storage.session() as conn:
+            cursor = conn.cursor()
+            
+            # Get posted tweets due a refresh
+            cursor.execute(f"""
+                SELECT t.id, t.tweet_id
+                FROM tweets t
+                LEFT JOIN (
+                    SELECT tweet_id, MAX(captured_at) AS last_captured
+                    FROM tweet_metrics
+                    GROUP BY tweet_id
+                ) m ON m.tweet_id = t.id
+                WHERE t.status = 'posted' 
+                AND t.tweet_id IS NOT NULL
+                AND t.posted_at > datetime('now', ?)
+                AND (m.last_captured IS NULL OR {' OR '.join(due_clauses)})
+            """, [f'-{lower_age} hours'] + params)
+            tweets = cursor.fetchall()
+            
+            updated = 0
+            requests_made = 0
+            size = max(1, min(100, batch_size))
+            
+            for start in range(0, len(tweets), size):
+                batch = dict((x_id, tweet_id) for tweet_id, x_id in tweets[start:start + size])
+                try:
+                    # Fetch metrics for up to 100 tweets in one request
+                    response = self.client.get_tweets(
+                        ids=list(batch),
+                        tweet_fields=['public_metrics']
+                    )
+                    requests_made += 1
+                except Exception as e:
+                    self.scheduler.record_headers(cursor, LOOKUP_ENDPOINT, self.client.last_headers(LOOKUP_ENDPOINT))
+                    logger.error(f"Failed to fetch metrics for {len(batch)} tweets: {e}")
+                    continue
                 
-                # Update database
-                cursor.execute("""
-                    UPDATE tweets
-                    SET likes = ?, retweets = ?, replies = ?, impressions = ?
-                    WHERE id = ?
-                """, (
-                    metrics.get('like_count', 0),
-                    metrics.get('retweet_count', 0),
-                    metrics.get('reply_count', 0),
-                    metrics.get('impression_count', 0),
-                    tweet_id
-                ))
+                self.scheduler.record_headers(cursor, LOOKUP_ENDPOINT, self.client.last_headers(LOOKUP_ENDPOINT))
                 
-                updated += 1
+                for tweet in response.data or []:
+                    tweet_id = batch.get(str(tweet.id))
+                    if tweet_id is None:
+                        continue
+                    public = tweet.public_metrics or {}
+                    values = (
+                        public.get('like_count', 0),
+                        public.get('retweet_count', 0),
+                        public.get('reply_count', 0),
+                        public.get('impression_count', 0)
+                    )
+                    
+                    # Keep a snapshot, and mirror the latest values on tweets
+                    cursor.execute("""
+                        INSERT INTO tweet_metrics (tweet_id, likes, retweets, replies, impressions)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (tweet_id,) + values)
+                    cursor.execute("""
+                        UPDATE tweets
+                        SET likes = ?, retweets = ?, replies = ?, impressions = ?
+                        WHERE id = ?
+                    """, values + (tweet_id,))
+                    
+                    updated += 1
                 
-            except Exception as e:
-                logger.error(f"Failed to update metrics for tweet {tweet_id}: {e}")
+                self.storage.tick(force=True)
         
-        conn.commit()
-        conn.close()
+        logger.info(f"Updated metrics for {updated}/{len(tweets)} due tweets in {requests_made} requests")
         
-        return {'updated': updated}
-
+        return {'updated': updated, 'due': len(tweets), 'requests': requests_made}
 
 if __name__ == "__main__":
     # Test poster
@@ -223,3 +399,4 @@ if __name__ == "__main__":
     print(f"   Total: {stats['total']}")
     print(f"   Posted: {stats['posted']}")
     print(f"   Failed: {stats['failed']}")
+    print(f"   Next slot: {stats['next_post_at']}")
@@ -0,0 +1,200 @@
+"""
+Near-duplicate story clustering for Energy News Bot
+Groups wire copies of the same story so only one goes to the LLM filter
+"""
+import hashlib
+import html
+import re
+from typing import Dict, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+TAG_RE = re.compile(r'<[^>]+>')
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have',
+    'in', 'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'to', 'was', 'will', 'with'
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens with markup and stopwords removed."""
+    text = html.unescape(TAG_RE.sub(' ', text or ''))
+    return [word for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS]
+
+
+def _feature_hash(feature: str) -> int:
+    """Stable 64-bit hash (Python's hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(title: str, summary: str = '') -> int:
+    """
+    64-bit SimHash over title and summary words and word pairs.
+
+    Title features are weighted double since outlets rewrite summaries
+    far more than headlines.
+    """
+    weights: Dict[str, int] = {}
+    for text, weight in ((title, 2), (summary, 1)):
+        words = tokenize(text)
+        for feature in words + [f'{a} {b}' for a, b in zip(words, words[1:])]:
+            weights[feature] = weights.get(feature, 0) + weight
+
+    vector = [0] * 64
+    for feature, weight in weights.items():
+        h = _feature_hash(feature)
+        for bit in range(64):
+            vector[bit] += weight if (h >> bit) & 1 else -weight
+
+    return sum(1 << bit for bit in range(64) if vector[bit] > 0)
+
+
+def _to_signed(value: int) -> int:
+    """Map an unsigned 64-bit value onto SQLite's signed INTEGER."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class StoryClusterer:
+    """Assigns pending articles to story clusters and reuses cluster verdicts."""
+
+    def __init__(self, max_distance: int = 4, window_hours: int = 48):
+        """
+        Args:
+            max_distance: Maximum SimHash Hamming distance for the same story
+            window_hours: Only match against articles discovered this recently
+        """
+        self.max_distance = max_distance
+        self.window_hours = window_hours
+
+        # processor.search builds on this module's tokenizer, so import it late
+        from processor.search import FullTextSearch
+        self.search = FullTextSearch()
+
+    def assign_pending(self, cursor) -> Dict:
+        """
+        Cluster pending articles that have not been clustered yet.
+
+        Candidates come from the full-text index (the best-ranked clustered
+        articles sharing words with this one), so the cost per article does
+        not grow with the window. An article that matches a candidate's
+        cluster joins it; otherwise it starts a new cluster as its
+        representative. If the cluster's
+        representative already has a verdict, it is applied right away.
+
+        Returns:
+            Stats dict
+        """
+        cursor.execute("""
+            SELECT a.id, a.title, a.summary
+            FROM articles a
+            LEFT JOIN article_clusters ac ON ac.article_id = a.id
+            WHERE a.status = 'pending' AND ac.article_id IS NULL
+            ORDER BY a.id ASC
+        """)
+        articles = cursor.fetchall()
+
+        new_clusters = 0
+        joined = 0
+        resolved = 0
+
+        for article_id, title, summary in articles:
+            signature = simhash(title, summary)
+            candidates = self.search.similar_clustered(cursor, article_id, title, summary, self.window_hours)
+            cluster_id = self._match(
+                [(candidate_cluster, _to_unsigned(other)) for candidate_cluster, other in candidates],
+                signature
+            )
+
+            if cluster_id is None:
+                cursor.execute("""
+                    INSERT INTO story_clusters (representative_id) VALUES (?)
+                """, (article_id,))
+                cluster_id = cursor.lastrowid
+                new_clusters += 1
+            else:
+                joined += 1
+
+            cursor.execute("""
+                INSERT INTO article_clusters (article_id, cluster_id, simhash) VALUES (?, ?, ?)
+            """, (article_id, cluster_id, _to_signed(signature)))
+
+            if self._resolve_from_cluster(cursor, article_id, cluster_id):
+                resolved += 1
+
+        if joined:
+            logger.info(f"Clustered {len(articles)} articles: {new_clusters} new stories, {joined} duplicates ({resolved} resolved from earlier verdicts)")
+
+        return {
+            'clustered': len(articles),
+            'new_clusters': new_clusters,
+            'duplicates': joined,
+            'resolved': resolved
+        }
+
+    def apply_verdict(self, cursor, article_id: int, relevant: bool, reason: str) -> int:
+        """
+        Propagate a representative's verdict to the other pending members of its cluster.
+
+        Relevant duplicates become 'duplicate' (so only the representative
+        gets a tweet); irrelevant ones become 'filtered_out'.
+
+        Returns:
+            Number of member articles updated
+        """
+        cursor.execute("""
+            UPDATE articles
+            SET status = ?, us_energy_relevant = ?, filter_reason = ?
+            WHERE status = 'pending'
+            AND id IN (
+                SELECT member.article_id
+                FROM article_clusters rep
+                JOIN article_clusters member ON member.cluster_id = rep.cluster_id
+                WHERE rep.article_id = ? AND member.article_id != ?
+            )
+        """, (
+            'duplicate' if relevant else 'filtered_out',
+            1 if relevant else 0,
+            reason,
+            article_id,
+            article_id
+        ))
+        return cursor.rowcount
+
+    def _match(self, known: List[Tuple[int, int]], signature: int):
+        """Find the cluster of the closest candidate signature within max_distance."""
+        best_cluster = None
+        best_distance = self.max_distance + 1
+        for cluster_id, other in known:
+            distance = bin(signature ^ other).count('1')
+            if distance < best_distance:
+                best_cluster, best_distance = cluster_id, distance
+                if distance == 0:
+                    break
+        return best_cluster
+
+    def _resolve_from_cluster(self, cursor, article_id: int, cluster_id: int) -> bool:
+        """Apply the cluster representative's verdict if it already has one."""
+        cursor.execute("""
+            SELECT a.id, a.us_energy_relevant, a.filter_reason
+            FROM story_clusters sc
+            JOIN articles a ON a.id = sc.representative_id
+            WHERE sc.id = ? AND a.status != 'pending' AND a.us_energy_relevant IS NOT NULL
+        """, (cluster_id,))
+        row = cursor.fetchone()
+        if not row or row[0] == article_id:
+            return False
+
+        _, relevant, reason = row
+        cursor.execute("""
+            UPDATE articles
+            SET status = ?, us_energy_relevant = ?, filter_reason = ?
+            WHERE id = ?
+        """, ('duplicate' if relevant else 'filtered_out', relevant, reason, article_id))
+        return True
@@ -0,0 +1,117 @@
+"""
+Prompt compaction for Energy News Bot
+Strips markup and boilerplate from article text and truncates it to a token budget
+"""
+import html
+import re
+import threading
+import yaml
+from pathlib import Path
+from typing import Optional
+import logging
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+TAG_RE = re.compile(r'<(script|style)\b.*?</\1\s*>|<[^>]+>', re.IGNORECASE | re.DOTALL)
+SPACE_RE = re.compile(r'\s+')
+
+# Tokenizer used by gpt-4o-mini
+ENCODING = 'o200k_base'
+CHARS_PER_TOKEN = 4
+
+
+class PromptCompactor:
+    """
+    Cleans article text before it goes into a prompt.
+
+    Tags (and script/style bodies) and HTML entities are removed, the
+    boilerplate patterns in config/compaction.yaml are dropped, whitespace
+    is collapsed and the result is cut to max_tokens at a word boundary.
+    Token counts before and after are recorded as metrics.
+    """
+
+    def __init__(self, max_tokens: int = 160):
+        """
+        Args:
+            max_tokens: Token budget for one compacted text
+        """
+        self.max_tokens = max_tokens
+
+        rules_path = Path(__file__).parent.parent / "config" / "compaction.yaml"
+        with open(rules_path, 'r') as f:
+            rules = yaml.safe_load(f) or {}
+        self.boilerplate = [re.compile(pattern, re.IGNORECASE) for pattern in rules.get('boilerplate', [])]
+
+        self._encoding = None
+        self._encoding_lock = threading.Lock()
+        self._encoding_failed = False
+
+    @property
+    def encoding(self):
+        """tiktoken encoding, imported and loaded on first use (None when unavailable)."""
+        with self._encoding_lock:
+            if self._encoding is None and not self._encoding_failed:
+                try:
+                    import tiktoken
+                    self._encoding = tiktoken.get_encoding(ENCODING)
+                except ImportError:
+                    # optional - a ~4 characters/token estimate is used without it
+                    self._encoding_failed = True
+                except Exception as e:
+                    # The BPE file is downloaded on first use; offline hosts fall back to estimates
+                    logger.warning(f"tiktoken unavailable ({e}), estimating tokens from length")
+                    self._encoding_failed = True
+            return self._encoding
+
+    def count(self, text: str) -> int:
+        """Tokens in text (exact with tiktoken, estimated otherwise)."""
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    def clean(self, text: Optional[str]) -> str:
+        """Markup, entities and boilerplate removed; whitespace collapsed."""
+        text = html.unescape(TAG_RE.sub(' ', text or ''))
+        for pattern in self.boilerplate:
+            text = pattern.sub(' ', text)
+        return SPACE_RE.sub(' ', text).strip()
+
+    def compact(self, text: Optional[str], purpose: str = 'summary') -> str:
+        """
+        Clean text and truncate it to max_tokens.
+
+        Args:
+            purpose: Label for the recorded token counts
+        """
+        if not text:
+            return ''
+
+        compacted = self.truncate(self.clean(text))
+
+        metrics.inc('llm_compaction_tokens_total', self.count(text), purpose=purpose, stage='raw')
+        metrics.inc('llm_compaction_tokens_total', self.count(compacted), purpose=purpose, stage='compacted')
+        return compacted
+
+    def truncate(self, text: str) -> str:
+        """Cut text to max_tokens, preferring a sentence end, then a word boundary."""
+        if self.count(text) <= self.max_tokens:
+            return text
+
+        if self.encoding is not None:
+            cut = self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:self.max_tokens])
+        else:
+            cut = text[:self.max_tokens * CHARS_PER_TOKEN]
+
+        # Keep whole sentences if that loses at most a third of the budget
+        sentence_end = max(cut.rfind('. '), cut.rfind('! '), cut.rfind('? '))
+        if sentence_end >= len(cut) * 2 // 3:
+            return cut[:sentence_end + 1]
+
+        word_end = cut.rfind(' ')
+        if word_end > 0:
+            cut = cut[:word_end]
+        return cut.rstrip(' ,;:-') + '…'
@@ -0,0 +1,126 @@
+"""
+Persistent LLM response cache for Energy News Bot
+Content-addressed by (model, system prompt, rendered prompt, parameters)
+"""
+import hashlib
+import json
+import threading
+from typing import Dict, Optional
+import logging
+
+from database.storage import connect
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """SQLite-backed completion cache with TTL / size eviction and hit counters."""
+
+    def __init__(self, db_path: str, prompts_version: str, ttl_hours: int = 24 * 7,
+                 max_entries: int = 50000, evict_every: int = 500):
+        """
+        Args:
+            db_path: Path to SQLite database
+            prompts_version: Hash of config/prompts.yaml; entries from other versions are dropped
+            ttl_hours: Entries older than this are treated as misses and evicted
+            max_entries: Least recently used entries beyond this are evicted
+            evict_every: Run evict() again after this many put() calls, so
+                long-running processes keep the table bounded
+        """
+        self.prompts_version = prompts_version
+        self.ttl_hours = ttl_hours
+        self.max_entries = max_entries
+        self.evict_every = max(1, evict_every)
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+
+        # Shared by the LLM worker threads, serialized by the lock
+        self.conn = connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+        # Prompt edits invalidate everything cached under the old prompts
+        with self.lock:
+            self.conn.execute("DELETE FROM llm_cache WHERE prompts_version != ?", (prompts_version,))
+            self.conn.commit()
+
+    @staticmethod
+    def make_key(model: str, system: str, prompt: str, temperature: float, **params) -> str:
+        """Content address of a completion request."""
+        payload = json.dumps(
+            [model, system, prompt, temperature, params],
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response text, or None on a miss."""
+        with self.lock:
+            row = self.conn.execute("""
+                SELECT response FROM llm_cache
+                WHERE key = ? AND prompts_version = ?
+                AND created_at > datetime('now', ?)
+            """, (key, self.prompts_version, f'-{self.ttl_hours} hours')).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.conn.execute("""
+                UPDATE llm_cache SET hits = hits + 1, last_used_at = CURRENT_TIMESTAMP WHERE key = ?
+            """, (key,))
+            self.conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """Store a response."""
+        with self.lock:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO llm_cache (key, prompts_version, response, created_at, last_used_at, hits)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 0)
+            """, (key, self.prompts_version, response))
+            self.conn.commit()
+            self._puts += 1
+            due = self._puts % self.evict_every == 0
+
+        if due:
+            removed = self.evict()
+            if removed:
+                logger.debug(f"LLM cache: evicted {removed} entries")
+
+    def evict(self) -> int:
+        """
+        Drop expired entries and trim the cache to max_entries.
+
+        Returns:
+            Number of entries removed
+        """
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.execute("""
+                DELETE FROM llm_cache WHERE created_at <= datetime('now', ?)
+            """, (f'-{self.ttl_hours} hours',))
+            self.conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache
+                    ORDER BY last_used_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self.conn.commit()
+            return self.conn.total_changes - before
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for this process."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
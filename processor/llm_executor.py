@@ -0,0 +1,123 @@
+"""
+Concurrent, rate-limited execution of LLM calls
+Worker pool with request/token buckets and automatic backoff on 429s
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously up to its capacity."""
+
+    def __init__(self, capacity: float, per_minute: float):
+        """
+        Args:
+            capacity: Maximum tokens held (burst size)
+            per_minute: Refill rate
+        """
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount: float = 1):
+        """Block until `amount` tokens are available, then take them."""
+        # Never wait for more than the bucket can ever hold
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    """True for OpenAI 429 errors (without importing openai here)."""
+    return getattr(error, 'status_code', None) == 429 or type(error).__name__ == 'RateLimitError'
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait, if it said so."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('retry-after')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LLMExecutor:
+    """Runs LLM calls on a bounded worker pool within RPM/TPM limits."""
+
+    def __init__(self, max_concurrency: int = 8, requests_per_minute: int = 500,
+                 tokens_per_minute: int = 200000, max_retries: int = 5):
+        """
+        Args:
+            max_concurrency: Maximum calls in flight at once
+            requests_per_minute: Request budget (OpenAI RPM limit)
+            tokens_per_minute: Token budget (OpenAI TPM limit)
+            max_retries: Attempts after a 429 before giving up
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+
+    def call(self, fn: Callable[[], Any], estimated_tokens: int = 0) -> Any:
+        """
+        Run one call within the rate limits, backing off on 429s.
+
+        Args:
+            fn: Zero-argument callable doing the API request
+            estimated_tokens: Prompt + completion tokens to reserve
+        """
+        for attempt in range(self.max_retries + 1):
+            self.requests.acquire(1)
+            if estimated_tokens:
+                self.tokens.acquire(estimated_tokens)
+
+            try:
+                return fn()
+            except Exception as e:
+                if not _is_rate_limit(e) or attempt == self.max_retries:
+                    raise
+                delay = _retry_after(e) or min(60.0, 2 ** attempt) + random.uniform(0, 1)
+                logger.warning(f"Rate limited by OpenAI, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+
+    def map(self, fn: Callable[[Any], Any], items: Iterable) -> List[Tuple[Any, Optional[Exception]]]:
+        """
+        Apply fn to every item concurrently.
+
+        Returns:
+            List of (result, error) pairs in the same order as items, so
+            callers can apply database updates in a deterministic order
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        def run(item):
+            try:
+                return fn(item), None
+            except Exception as e:
+                return None, e
+
+        if self.max_concurrency == 1 or len(items) == 1:
+            return [run(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(items))) as pool:
+            return list(pool.map(run, items))
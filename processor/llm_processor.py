@@ -2,13 +2,26 @@
 LLM Processor for Energy News Bot
 Filters articles and generates tweets using OpenAI
 """
-import sqlite3
+import hashlib
+import json
 import yaml
 from pathlib import Path
-from typing import Dict
-from openai import OpenAI
+from typing import Dict, List, Optional, Tuple
 import logging
 import os
+import threading
+import time
+
+import metrics
+from database.leases import Leases
+from database.storage import Storage
+from processor.clustering import StoryClusterer
+from processor.compaction import PromptCompactor
+from processor.llm_cache import LLMCache
+from processor.llm_executor import LLMExecutor
+from processor.preclassifier import PreClassifier, agreement_stats
+from processor.search import FullTextSearch
+from processor.work_queue import WorkQueue
 
 logger = logging.getLogger(__name__)
 
@@ -16,154 +29,565 @@ logger = logging.getLogger(__name__)
 class LLMProcessor:
     """Processes articles with LLM for filtering and tweet generation."""
     
-    def __init__(self, db_path: str, openai_api_key: str):
+    def __init__(self, db_path: str, openai_api_key: str, executor: LLMExecutor = None,
+                 use_cache: bool = True, coverage_hours: float = 168, queue: WorkQueue = None,
+                 fused: bool = False, compactor: PromptCompactor = None, leases: Leases = None):
+        """
+        Args:
+            db_path: Path to SQLite database
+            openai_api_key: OpenAI API key
+            executor: Concurrency / rate-limit engine (defaults to LLMExecutor())
+            use_cache: Reuse stored completions for identical requests
+            coverage_hours: Don't draft a tweet for a story tweeted within this many hours
+            queue: Ranking, expiry and per-run token budget (defaults to WorkQueue())
+            fused: Filter and draft in one request - approved articles get their
+                tweet draft straight from filter_articles
+            compactor: Cleans and truncates article text for prompts (defaults to PromptCompactor())
+            leases: Claims articles so concurrent workers never process the same one (defaults to Leases())
+        """
         self.db_path = db_path
-        self.client = OpenAI(api_key=openai_api_key)
+        self.storage = Storage(db_path)
+        self.executor = executor or LLMExecutor()
+        self.queue = queue or WorkQueue()
+        self.fused = fused
+        self.compactor = compactor or PromptCompactor()
+        # Separate ids so the daemon's filter and generate threads never release each other's claims
+        leases = leases or Leases()
+        self.filter_leases = leases.for_stage('filter')
+        self.generate_leases = leases.for_stage('generate')
         
         # Load prompts
         prompts_path = Path(__file__).parent.parent / "config" / "prompts.yaml"
-        with open(prompts_path, 'r') as f:
-            self.prompts = yaml.safe_load(f)
-    
-    def filter_articles(self) -> Dict:
-        """Filter pending articles for US energy relevance."""
+        with open(prompts_path, 'rb') as f:
+            raw_prompts = f.read()
+        self.prompts = yaml.safe_load(raw_prompts)
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Cache entries are tied to this exact prompts.yaml
+        self.cache = None
+        if use_cache:
+            self.cache = LLMCache(db_path, hashlib.sha256(raw_prompts).hexdigest())
+            self.cache.evict()
         
-        # Get pending articles
-        cursor.execute("""
-            SELECT id, title, summary 
-            FROM articles 
-            WHERE status = 'pending'
-            ORDER BY published_at DESC
-            LIMIT 50
-        """)
-        articles = cursor.fetchall()
+        self.clusterer = StoryClusterer()
+        self.search = FullTextSearch()
+        self.coverage_hours = coverage_hours
+        self.preclassifier = PreClassifier()
         
-        approved = 0
-        filtered_out = 0
+        # OpenAI client is built on first use (cache hits and pre-classified runs never need it)
+        self._openai_api_key = openai_api_key
+        self._client = None
+        self._client_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        """OpenAI client, imported and constructed on first use."""
+        with self._client_lock:
+            if self._client is None:
+                from openai import OpenAI
+                self._client = OpenAI(api_key=self._openai_api_key)
+            return self._client
+    
+    @client.setter
+    def client(self, client):
+        with self._client_lock:
+            self._client = client
+    
+    def filter_articles(self, batch_size: int = 20, limit: int = 50) -> Dict:
+        """
+        Filter pending articles for US energy relevance, best-scoring stories first.
         
-        logger.info(f"Filtering {len(articles)} articles...")
+        Args:
+            batch_size: Articles packed into one LLM request (1 = one call per article)
+            limit: Most articles sent to the LLM per run
+        """
         
-        for article_id, title, summary in articles:
-            try:
-                # Build filter prompt
-                prompt = self.prompts['filter_prompt'].format(
-                    title=title,
-                    summary=summary or "No summary available"
-                )
-                
-                # Call LLM
-                response = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are a news filter that identifies US energy and data center news."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.3,
-                    max_tokens=100
-                )
-                
-                result = response.choices[0].message.content.strip()
-                
-                # Parse response
-                if result.lower().startswith('yes'):
-                    cursor.execute("""
-                        UPDATE articles 
-                        SET status = 'approved', us_energy_relevant = 1, filter_reason = ?
-                        WHERE id = ?
-                    """, (result, article_id))
-                    approved += 1
-                    logger.info(f"✓ Approved: {title[:50]}...")
+        with self.storage.session() as conn:
+            cursor = conn.cursor()
+            self.storage.lock()
+            
+            # Group wire copies of the same story before paying for LLM calls
+            cluster_stats = self.clusterer.assign_pending(cursor)
+            expired = self.queue.expire(cursor)
+            self.filter_leases.recover(cursor)
+            
+            # One article per undecided story, best first (priority, freshness, coverage)
+            candidates = self.queue.pending(cursor)
+            conn.commit()
+            
+            counts = {'approved': 0, 'filtered_out': 0, 'duplicates': cluster_stats['resolved'], 'drafted': 0, 'stale': 0}
+            
+            logger.info(f"Filtering up to {limit} of {len(candidates)} pending stories...")
+            
+            # Decide obvious articles locally; only uncertain ones go to the LLM
+            # (retrained once enough new verdicts arrive, otherwise the saved model is reused)
+            self.preclassifier.refresh(cursor)
+            
+            size = max(1, batch_size)
+            if self.fused:
+                template = self.prompts['fused_batch_prompt']
+            else:
+                template = self.prompts['filter_batch_prompt' if size > 1 else 'filter_prompt']
+            # Fused responses carry a ~70 token draft on top of the verdict
+            completion_tokens = 130 if self.fused else 60
+            budget = self.queue.budget()
+            
+            articles = []
+            uncertain = []
+            probabilities = {}
+            claimed_elsewhere = 0
+            for article_id, title, summary in candidates:
+                if len(uncertain) >= limit:
+                    break
+                # Another worker is already filtering this one
+                if not self.filter_leases.claim(cursor, 'articles', [article_id], status='pending'):
+                    claimed_elsewhere += 1
+                    continue
+                relevant, probability, reason = self.preclassifier.classify(title, summary)
+                if relevant is None:
+                    # Only the LLM sees compacted text; the pre-classifier was trained on raw summaries
+                    title, summary = self.compactor.clean(title), self.compactor.compact(summary)
+                    
+                    # Template overhead is shared by the articles batched into one request
+                    prompt_tokens = (len(template) // size + len(title) + len(summary or '')) // 4
+                    if not budget.admit(prompt_tokens, completion_tokens):
+                        logger.info(f"💰 Filter budget reached ({budget.tokens} tokens, ${budget.cost_usd:.4f}), deferring the rest")
+                        self.filter_leases.release(cursor, 'articles', [article_id])
+                        break
+                    uncertain.append((article_id, title, summary))
+                    probabilities[article_id] = probability
                 else:
-                    cursor.execute("""
-                        UPDATE articles 
-                        SET status = 'filtered_out', us_energy_relevant = 0, filter_reason = ?
-                        WHERE id = ?
-                    """, (result, article_id))
-                    filtered_out += 1
-                    logger.info(f"✗ Filtered: {title[:50]}...")
-                
-            except Exception as e:
-                logger.error(f"Error filtering article {article_id}: {e}")
+                    self._record_verdict(cursor, article_id, title, relevant, reason, counts)
+                articles.append(article_id)
+            
+            # Publish the claims and release the write lock before LLM workers touch the response cache
+            conn.commit()
+            
+            if claimed_elsewhere:
+                logger.info(f"🔒 Skipped {claimed_elsewhere} articles claimed by other workers")
+            
+            prefiltered = len(articles) - len(uncertain)
+            if prefiltered:
+                logger.info(f"Pre-classifier decided {prefiltered}/{len(articles)} articles, {len(uncertain)} sent to LLM")
+            
+            chunks = [uncertain[start:start + size] for start in range(0, len(uncertain), size)]
+            
+            # LLM calls run concurrently; DB updates are applied below in order
+            results = self.executor.map(self._filter_chunk, chunks)
+            
+            model_vs_llm = []
+            for chunk, (verdicts, error) in zip(chunks, results):
+                verdicts = verdicts or {}
+                for article_id, title, summary in chunk:
+                    try:
+                        verdict = verdicts.get(article_id, error)
+                        if isinstance(verdict, Exception) or verdict is None:
+                            raise verdict or Exception("no verdict returned")
+                        relevant, reason, tweet_text = verdict
+                        
+                        if self._record_verdict(cursor, article_id, title, relevant, reason, counts, tweet_text):
+                            model_vs_llm.append((probabilities[article_id], relevant))
+                        
+                    except Exception as e:
+                        logger.error(f"Error filtering article {article_id}: {e}")
+            
+            # Anything left pending (failed calls) is free for the next worker
+            self.filter_leases.release(cursor, 'articles', articles)
+            
+            if self.preclassifier.weights is not None:
+                agreement = agreement_stats(model_vs_llm)
+                if agreement['compared']:
+                    logger.info(f"Pre-classifier agreed with LLM on {agreement['agreement']:.0%} of {agreement['compared']} uncertain articles")
         
-        conn.commit()
-        conn.close()
+        self._log_cache_stats()
         
         return {
             'total': len(articles),
-            'approved': approved,
-            'filtered_out': filtered_out
+            'approved': counts['approved'],
+            'filtered_out': counts['filtered_out'],
+            'duplicates': counts['duplicates'],
+            'drafted': counts['drafted'],
+            'stale': counts['stale'],
+            'prefiltered': prefiltered,
+            'expired': expired,
+            'claimed_elsewhere': claimed_elsewhere,
+            'deferred': len(candidates) - len(articles) - claimed_elsewhere
         }
     
-    def generate_tweets(self) -> Dict:
-        """Generate tweets for approved articles."""
+    def _record_verdict(self, cursor, article_id: int, title: str, relevant: bool,
+                        reason: str, counts: Dict, tweet_text: str = None) -> bool:
+        """
+        Write a filter verdict and copy it to the rest of the story cluster.
+        
+        A tweet_text (fused mode) is saved as the article's draft in the same
+        transaction, unless the story was already covered recently. Nothing
+        is written if the article is no longer pending (e.g. its cluster was
+        resolved meanwhile).
+        
+        Returns:
+            True if the verdict was recorded
+        """
+        if not self.storage.transition_article(
+            article_id, 'approved' if relevant else 'filtered_out', from_status='pending',
+            us_energy_relevant=1 if relevant else 0, filter_reason=reason
+        ):
+            counts['stale'] += 1
+            logger.debug(f"Article {article_id} is no longer pending, dropping its verdict")
+            return False
+        
+        if relevant:
+            counts['approved'] += 1
+            logger.info(f"✓ Approved: {title[:50]}...")
+            if tweet_text:
+                self._save_fused_draft(cursor, article_id, title, tweet_text, counts)
+        else:
+            counts['filtered_out'] += 1
+            logger.info(f"✗ Filtered: {title[:50]}...")
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        counts['duplicates'] += self.clusterer.apply_verdict(cursor, article_id, relevant, reason)
+        
+        # Paid-for verdicts are committed in small batches, not at the very end
+        self.storage.tick()
+        return True
+    
+    def _save_fused_draft(self, cursor, article_id: int, title: str, tweet_text: str, counts: Dict):
+        """Save a fused-mode draft, or mark the article a duplicate if its story was just tweeted."""
+        cursor.execute("SELECT summary FROM articles WHERE id = ?", (article_id,))
+        summary = cursor.fetchone()[0]
+        coverage = self.search.recent_coverage(
+            cursor, title, summary,
+            hours=self.coverage_hours,
+            max_distance=self.clusterer.max_distance,
+            exclude_article_id=article_id
+        )
+        if coverage:
+            self.storage.transition_article(
+                article_id, 'duplicate', from_status='approved',
+                filter_reason=f"Already covered by tweet {coverage[0]['tweet_id']}"
+            )
+            return
         
-        # Get approved articles without tweets
         cursor.execute("""
-            SELECT a.id, a.title, a.summary, a.url, a.image_url
-            FROM articles a
-            LEFT JOIN tweets t ON a.id = t.article_id
-            WHERE a.status = 'approved' AND t.id IS NULL
-            ORDER BY a.published_at DESC
-        """)
-        articles = cursor.fetchall()
+            INSERT INTO tweets (article_id, tweet_text, hashtags, image_url, article_link, status)
+            SELECT id, ?, '', NULL, url, 'draft' FROM articles WHERE id = ?
+        """, (self._clamp_tweet(tweet_text), article_id))
+        counts['drafted'] += 1
+    
+    def _filter_chunk(self, chunk: List[Tuple]) -> Dict:
+        """
+        Get verdicts for one chunk of articles (runs in a worker thread).
         
-        generated = 0
+        Returns:
+            Dict of article_id -> (relevant, reason, tweet_text or None), or
+            the Exception raised while filtering that article
+        """
+        verdicts = {}
+        if len(chunk) > 1 or self.fused:
+            try:
+                verdicts = self._filter_batch(chunk)
+            except Exception as e:
+                logger.warning(f"Batch filter failed, falling back to single calls: {e}")
+        
+        # Fall back to a single call for anything the batch missed (no draft -
+        # generate_tweets picks those articles up as usual)
+        for article_id, title, summary in chunk:
+            if article_id not in verdicts:
+                try:
+                    verdicts[article_id] = self._filter_single(title, summary) + (None,)
+                except Exception as e:
+                    verdicts[article_id] = e
+        
+        return verdicts
+    
+    def _chat(self, system: str, prompt: str, temperature: float, max_tokens: int,
+              purpose: str = 'chat', **kwargs) -> str:
+        """
+        Run a single chat completion (or reuse a cached one) and return the stripped message text.
         
-        logger.info(f"Generating tweets for {len(articles)} articles...")
+        `purpose` only labels the call's metrics (filter, filter_batch, fused, tweet).
+        """
         
-        for article_id, title, summary, url, image_url in articles:
+        key = None
+        if self.cache:
+            key = LLMCache.make_key("gpt-4o-mini", system, prompt, temperature, max_tokens=max_tokens, **kwargs)
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics.inc('llm_cache_hits_total', purpose=purpose)
+                return cached
+        
+        def request():
+            # Timed per attempt, so rate-limit waits and retries are not counted as latency
+            started = time.monotonic()
+            outcome = 'error'
             try:
-                # Generate tweet text
-                tweet_prompt = self.prompts['tweet_prompt'].format(
-                    title=title,
-                    summary=summary or "No summary available",
-                    url=url
-                )
-                
                 response = self.client.chat.completions.create(
                     model="gpt-4o-mini",
                     messages=[
-                        {"role": "system", "content": "You are a professional energy news writer creating concise, engaging tweets."},
-                        {"role": "user", "content": tweet_prompt}
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": prompt}
                     ],
-                    temperature=0.7,
-                    max_tokens=200
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    **kwargs
                 )
-                
-                tweet_text = response.choices[0].message.content.strip()
-                
-                # Hard enforce 280 character limit (including newlines)
-                if len(tweet_text) > 280:
-                    # Truncate to 277 chars and add ellipsis
-                    tweet_text = tweet_text[:277] + "..."
-                
-                full_tweet = tweet_text
-                
-                # Save tweet draft (no hashtags, no images)
-                cursor.execute("""
-                    INSERT INTO tweets (article_id, tweet_text, hashtags, image_url, article_link, status)
-                    VALUES (?, ?, ?, ?, ?, 'draft')
-                """, (article_id, full_tweet, "", None, url))
-                
-                generated += 1
-                logger.info(f"✓ Generated tweet for: {title[:50]}...")
-                
-            except Exception as e:
-                logger.error(f"Error generating tweet for article {article_id}: {e}")
+                outcome = 'ok'
+                return response
+            finally:
+                metrics.observe('llm_request_seconds', time.monotonic() - started, purpose=purpose)
+                metrics.inc('llm_requests_total', purpose=purpose, outcome=outcome)
+        
+        # Rough token estimate (~4 chars per token) reserved against the TPM budget
+        estimated_tokens = (len(system) + len(prompt)) // 4 + max_tokens
+        response = self.executor.call(request, estimated_tokens=estimated_tokens)
+        
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            metrics.inc('llm_prompt_tokens_total', usage.prompt_tokens or 0, purpose=purpose)
+            metrics.inc('llm_completion_tokens_total', usage.completion_tokens or 0, purpose=purpose)
+        
+        content = response.choices[0].message.content.strip()
+        
+        if self.cache:
+            self.cache.put(key, content)
+        
+        return content
+    
+    def _log_cache_stats(self):
+        if self.cache:
+            stats = self.cache.stats()
+            logger.info(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+    
+    def _filter_single(self, title: str, summary: str) -> Tuple[bool, str]:
+        """Filter one article; returns (relevant, reason)."""
         
-        conn.commit()
-        conn.close()
+        # Build filter prompt
+        prompt = self.prompts['filter_prompt'].format(
+            title=title,
+            summary=summary or "No summary available"
+        )
+        
+        result = self._chat(
+            "You are a news filter that identifies US energy and data center news.",
+            prompt,
+            temperature=0.3,
+            max_tokens=100,
+            purpose='filter'
+        )
+        
+        # Parse response
+        return result.lower().startswith('yes'), result
+    
+    def _filter_batch(self, articles: List[Tuple]) -> Dict[int, Tuple[bool, str, str]]:
+        """
+        Filter several articles in one request with a JSON verdict per article.
+        
+        In fused mode each relevant verdict also carries a draft tweet.
+        
+        Returns:
+            Dict of article_id -> (relevant, reason, tweet_text or None) for
+            every verdict that validated; missing or malformed items are
+            simply left out
+        """
+        listing = "\n\n".join(
+            f"[id={article_id}]\nTitle: {title}\nSummary: {summary or 'No summary available'}"
+            for article_id, title, summary in articles
+        )
+        
+        if self.fused:
+            result = self._chat(
+                "You are a news filter that identifies US energy and data center news and a "
+                "professional energy news writer creating concise, engaging tweets. Respond in JSON.",
+                self.prompts['fused_batch_prompt'].format(articles=listing),
+                temperature=0.5,
+                max_tokens=160 * len(articles) + 50,
+                purpose='fused',
+                response_format={"type": "json_object"}
+            )
+        else:
+            result = self._chat(
+                "You are a news filter that identifies US energy and data center news. Respond in JSON.",
+                self.prompts['filter_batch_prompt'].format(articles=listing),
+                temperature=0.3,
+                max_tokens=60 * len(articles) + 50,
+                purpose='filter_batch',
+                response_format={"type": "json_object"}
+            )
+        
+        expected = {article_id for article_id, _, _ in articles}
+        verdicts = {}
+        for item in json.loads(result).get('verdicts', []):
+            if not isinstance(item, dict):
+                continue
+            try:
+                article_id = int(item.get('id'))
+            except (TypeError, ValueError):
+                continue
+            relevant = item.get('relevant')
+            if article_id not in expected or not isinstance(relevant, bool):
+                continue
+            reason = str(item.get('reason') or '').strip()
+            tweet_text = item.get('tweet') if relevant and self.fused else None
+            if not isinstance(tweet_text, str) or not tweet_text.strip():
+                tweet_text = None
+            verdicts[article_id] = (relevant, f"{'Yes' if relevant else 'No'}. {reason}".strip(), tweet_text)
+        
+        if len(verdicts) < len(articles):
+            logger.warning(f"Batch filter returned {len(verdicts)}/{len(articles)} valid verdicts")
+        
+        return verdicts
+    
+    def generate_tweets(self, limit: Optional[int] = None) -> Dict:
+        """
+        Generate tweets for approved articles, best-scoring first, within the run's token budget.
+        
+        Args:
+            limit: Most articles claimed per run (None = all); lets several
+                workers running this stage split the approved backlog
+        """
+        
+        with self.storage.session() as conn:
+            cursor = conn.cursor()
+            self.storage.lock()
+            
+            # Approved articles without tweets (too-stale ones are expired instead)
+            expired = self.queue.expire(cursor)
+            self.generate_leases.recover(cursor)
+            articles = self.queue.approved(cursor)
+            
+            # Leave articles another worker is drafting to that worker
+            held = []
+            claimed_elsewhere = 0
+            for article in articles:
+                if limit is not None and len(held) >= limit:
+                    break
+                if self.generate_leases.claim(cursor, 'articles', [article[0]], status='approved'):
+                    held.append(article)
+                else:
+                    claimed_elsewhere += 1
+            if claimed_elsewhere:
+                logger.info(f"🔒 Skipped {claimed_elsewhere} articles claimed by other workers")
+            articles = held
+            
+            # Skip stories we already tweeted (or drafted) about recently
+            already_covered = 0
+            fresh = []
+            for article in articles:
+                article_id, title, summary = article[:3]
+                coverage = self.search.recent_coverage(
+                    cursor, title, summary,
+                    hours=self.coverage_hours,
+                    max_distance=self.clusterer.max_distance,
+                    exclude_article_id=article_id
+                )
+                if coverage:
+                    self.storage.transition_article(
+                        article_id, 'duplicate', from_status='approved',
+                        filter_reason=f"Already covered by tweet {coverage[0]['tweet_id']}"
+                    )
+                    already_covered += 1
+                else:
+                    fresh.append(article)
+            if already_covered:
+                logger.info(f"⏭️  Skipped {already_covered} approved articles already covered in the last {self.coverage_hours}h")
+            
+            budget = self.queue.budget()
+            articles = []
+            for article_id, title, summary, url, image_url in fresh:
+                title, summary = self.compactor.clean(title), self.compactor.compact(summary)
+                prompt_tokens = (len(self.prompts['tweet_prompt']) + len(title) + len(summary) + len(url)) // 4
+                if not budget.admit(prompt_tokens, 70):
+                    logger.info(f"💰 Tweet budget reached ({budget.tokens} tokens, ${budget.cost_usd:.4f}), deferring {len(fresh) - len(articles)} articles")
+                    break
+                articles.append((article_id, title, summary, url, image_url))
+            
+            # Deferred articles can go to another worker straight away
+            self.generate_leases.release(cursor, 'articles', [article[0] for article in fresh[len(articles):]])
+            
+            # Publish the claims and release the write lock (expiry / coverage updates)
+            # before LLM workers touch the response cache
+            conn.commit()
+            
+            generated = 0
+            lost_lease = 0
+            
+            logger.info(f"Generating tweets for {len(articles)} articles...")
+            
+            # LLM calls run concurrently; drafts are saved below in order
+            results = self.executor.map(self._draft_tweet, articles)
+            
+            for (article_id, title, summary, url, image_url), (tweet_text, error) in zip(articles, results):
+                try:
+                    if error:
+                        raise error
+                    
+                    full_tweet = tweet_text
+                    
+                    # A slow or rate-limited run can outlast the lease; renew it (or
+                    # skip the draft if another worker took the article meanwhile)
+                    if not self.generate_leases.claim(cursor, 'articles', [article_id], status='approved'):
+                        lost_lease += 1
+                        logger.warning(f"🔒 Lost the claim on article {article_id} while drafting, skipping it")
+                        continue
+                    
+                    # Save tweet draft (no hashtags, no images), unless one already exists
+                    cursor.execute("""
+                        INSERT INTO tweets (article_id, tweet_text, hashtags, image_url, article_link, status)
+                        SELECT ?, ?, ?, ?, ?, 'draft'
+                        WHERE NOT EXISTS (SELECT 1 FROM tweets WHERE article_id = ?)
+                    """, (article_id, full_tweet, "", None, url, article_id))
+                    if not cursor.rowcount:
+                        lost_lease += 1
+                        continue
+                    
+                    generated += 1
+                    self.storage.tick()
+                    logger.info(f"✓ Generated tweet for: {title[:50]}...")
+                    
+                except Exception as e:
+                    logger.error(f"Error generating tweet for article {article_id}: {e}")
+            
+            self.generate_leases.release(cursor, 'articles', [article[0] for article in held])
+        
+        self._log_cache_stats()
         
         return {
             'total': len(articles),
-            'generated': generated
+            'generated': generated,
+            'already_covered': already_covered,
+            'expired': expired,
+            'claimed_elsewhere': claimed_elsewhere,
+            'lost_lease': lost_lease,
+            'deferred': len(fresh) - len(articles)
         }
+    
+    def _draft_tweet(self, article: Tuple) -> str:
+        """Generate tweet text for one approved article (runs in a worker thread)."""
+        article_id, title, summary, url, image_url = article
+        
+        # Generate tweet text
+        tweet_prompt = self.prompts['tweet_prompt'].format(
+            title=title,
+            summary=summary or "No summary available",
+            url=url
+        )
+        
+        tweet_text = self._chat(
+            "You are a professional energy news writer creating concise, engaging tweets.",
+            tweet_prompt,
+            temperature=0.7,
+            max_tokens=200,
+            purpose='tweet'
+        )
+        
+        return self._clamp_tweet(tweet_text)
+    
+    @staticmethod
+    def _clamp_tweet(tweet_text: str) -> str:
+        """Hard enforce the 280 character limit (including newlines)."""
+        tweet_text = tweet_text.strip()
+        if len(tweet_text) > 280:
+            # Truncate to 277 chars and add ellipsis
+            tweet_text = tweet_text[:277] + "..."
+        return tweet_text
 
 
 if __name__ == "__main__":
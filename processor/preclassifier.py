@@ -0,0 +1,325 @@
+"""
+Local pre-classifier for Energy News Bot
+Keyword rules plus a hashed-feature logistic model trained on past LLM verdicts
+"""
+import math
+import random
+import re
+import yaml
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from database.retention import unpack
+from processor.clustering import tokenize
+
+logger = logging.getLogger(__name__)
+
+# filter_reason prefix for verdicts made here (kept out of the training data)
+REASON_PREFIX = "Pre-classifier:"
+
+# Rows per vectorized SGD step (numpy training only)
+BATCH_SIZE = 32
+
+# Running CRCs of the 't:' / 's:' feature prefixes
+TITLE_SEED = zlib.crc32(b't:')
+SUMMARY_SEED = zlib.crc32(b's:')
+
+
+class PreClassifier:
+    """Decides obvious articles locally so only uncertain ones reach the LLM."""
+
+    def __init__(self, approve_threshold: float = 0.97, reject_threshold: float = 0.03,
+                 min_training_rows: int = 200, n_features: int = 2 ** 18,
+                 retrain_every: int = 200, max_age_hours: float = 24):
+        """
+        Args:
+            approve_threshold: Model probability at or above which an article is approved
+            reject_threshold: Model probability at or below which an article is filtered out
+            min_training_rows: Labelled articles needed before the model is used at all
+            n_features: Size of the hashed feature space
+            retrain_every: Retrain once this many new LLM verdicts have come in
+            max_age_hours: Retrain a model older than this even without new verdicts
+        """
+        self.approve_threshold = approve_threshold
+        self.reject_threshold = reject_threshold
+        self.min_training_rows = min_training_rows
+        self.n_features = n_features
+        self.retrain_every = retrain_every
+        self.max_age_hours = max_age_hours
+
+        rules_path = Path(__file__).parent.parent / "config" / "preclassifier.yaml"
+        with open(rules_path, 'r') as f:
+            rules = yaml.safe_load(f) or {}
+        self.exclude = [re.compile(pattern, re.IGNORECASE) for pattern in rules.get('exclude', [])]
+        self.include = [re.compile(pattern, re.IGNORECASE) for pattern in rules.get('include', [])]
+
+        self.weights: Optional[List[float]] = None
+        self.bias = 0.0
+        # LLM-labelled article count behind the current model (None = never trained or loaded)
+        self.labels: Optional[int] = None
+
+    def refresh(self, cursor) -> bool:
+        """
+        Make sure the model reflects recent verdicts, retraining only when needed.
+
+        A model saved by any process is reused while it is within
+        retrain_every labels and max_age_hours of now; otherwise the model
+        is retrained and saved for the other processes.
+
+        Returns:
+            True if the model was (re)trained or loaded
+        """
+        labels = self._label_count(cursor)
+        if labels < self.min_training_rows:
+            if self.labels is None or self.weights is not None:
+                logger.info(f"Pre-classifier model off ({labels}/{self.min_training_rows} labelled articles)")
+            self.weights, self.labels = None, labels
+            return False
+
+        cursor.execute("""
+            SELECT labels, (julianday('now') - julianday(trained_at)) * 24
+            FROM preclassifier_model WHERE n_features = ?
+        """, (self.n_features,))
+        saved = cursor.fetchone()
+        if saved and labels - saved[0] < self.retrain_every and saved[1] < self.max_age_hours:
+            if self.weights is not None and self.labels == saved[0]:
+                return False
+            return self.load(cursor)
+
+        self.train(cursor)
+        self.save(cursor, labels)
+        return True
+
+    def _label_count(self, cursor) -> int:
+        """LLM verdicts available for training (live and archived)."""
+        total = 0
+        for table in ('articles', 'articles_archive'):
+            cursor.execute(f"""
+                SELECT COUNT(*) FROM {table}
+                WHERE us_energy_relevant IS NOT NULL
+                AND (filter_reason IS NULL OR filter_reason NOT LIKE ?)
+            """, (REASON_PREFIX + '%',))
+            total += cursor.fetchone()[0]
+        return total
+
+    def save(self, cursor, labels: int):
+        """Store the trained model so other processes (and later runs) can load it."""
+        if self.weights is None:
+            return
+        indices = array('I')
+        values = array('d')
+        for index, weight in enumerate(self.weights):
+            if weight:
+                indices.append(index)
+                values.append(weight)
+        cursor.execute("""
+            INSERT OR REPLACE INTO preclassifier_model (id, n_features, labels, bias, weights, trained_at)
+            VALUES (1, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (self.n_features, labels, self.bias,
+              zlib.compress(array('I', [len(indices)]).tobytes() + indices.tobytes() + values.tobytes())))
+        self.labels = labels
+
+    def load(self, cursor) -> bool:
+        """
+        Load the saved model, if one exists for this feature space.
+
+        Returns:
+            True if a model was loaded
+        """
+        cursor.execute("""
+            SELECT labels, bias, weights FROM preclassifier_model WHERE n_features = ?
+        """, (self.n_features,))
+        row = cursor.fetchone()
+        if row is None:
+            return False
+        labels, bias, blob = row
+        data = zlib.decompress(blob)
+        count = array('I', data[:4])[0]
+        indices = array('I', data[4:4 + 4 * count])
+        values = array('d', data[4 + 4 * count:])
+        weights = [0.0] * self.n_features
+        for index, weight in zip(indices, values):
+            weights[index] = weight
+        self.weights, self.bias, self.labels = weights, bias, labels
+        logger.info(f"Pre-classifier model loaded ({labels} labelled articles)")
+        return True
+
+    def train(self, cursor, epochs: int = 5, learning_rate: float = 0.2, l2: float = 1e-5) -> int:
+        """
+        Fit the model on articles the LLM has already labelled.
+
+        Returns:
+            Number of training rows (0 if there were too few and the model is off)
+        """
+        cursor.execute("""
+            SELECT title, summary, us_energy_relevant
+            FROM articles
+            WHERE us_energy_relevant IS NOT NULL
+            AND (filter_reason IS NULL OR filter_reason NOT LIKE ?)
+            ORDER BY id DESC
+            LIMIT 20000
+        """, (REASON_PREFIX + '%',))
+        labelled = cursor.fetchall()
+
+        # Verdicts on archived articles are still good training data
+        if len(labelled) < 20000:
+            cursor.execute("""
+                SELECT payload
+                FROM articles_archive
+                WHERE us_energy_relevant IS NOT NULL
+                AND (filter_reason IS NULL OR filter_reason NOT LIKE ?)
+                ORDER BY id DESC
+                LIMIT ?
+            """, (REASON_PREFIX + '%', 20000 - len(labelled)))
+            for (payload,) in cursor.fetchall():
+                article = unpack(payload)
+                labelled.append((article['title'], article['summary'], article['us_energy_relevant']))
+
+        rows = [(self._features(title, summary), 1.0 if label else 0.0) for title, summary, label in labelled]
+
+        if len(rows) < self.min_training_rows:
+            self.weights = None
+            logger.info(f"Pre-classifier model off ({len(rows)}/{self.min_training_rows} labelled articles)")
+            return 0
+
+        try:
+            self.weights, self.bias = self._fit_numpy(rows, epochs, learning_rate, l2)
+        except ImportError:  # optional - falls back to a per-example Python loop
+            self.weights, self.bias = self._fit_python(rows, epochs, learning_rate, l2)
+        logger.info(f"Pre-classifier model trained on {len(rows)} labelled articles")
+        return len(rows)
+
+    def _fit_python(self, rows: List[Tuple[List[int], float]], epochs: int, learning_rate: float,
+                    l2: float) -> Tuple[List[float], float]:
+        """Per-example SGD in plain Python."""
+        weights = [0.0] * self.n_features
+        bias = 0.0
+        rng = random.Random(0)
+        for _ in range(epochs):
+            rng.shuffle(rows)
+            for features, label in rows:
+                gradient = _sigmoid(bias + sum(weights[i] for i in features)) - label
+                bias -= learning_rate * gradient
+                for i in features:
+                    weights[i] -= learning_rate * (gradient + l2 * weights[i])
+        return weights, bias
+
+    def _fit_numpy(self, rows: List[Tuple[List[int], float]], epochs: int, learning_rate: float,
+                   l2: float) -> Tuple[List[float], float]:
+        """
+        Mini-batch SGD over a sparse (CSR) feature matrix.
+
+        Each step scores BATCH_SIZE rows with one gather + bincount and
+        applies their per-example updates with one scatter-add, so the
+        result tracks the per-example loop closely.
+
+        Raises:
+            ImportError: numpy is not installed (imported here, not at
+                module load, so processes that never train skip it)
+        """
+        import numpy
+
+        lengths = numpy.fromiter((len(features) for features, _ in rows), dtype=numpy.int64, count=len(rows))
+        indices = numpy.fromiter((i for features, _ in rows for i in features), dtype=numpy.int64,
+                                 count=int(lengths.sum()))
+        labels = numpy.fromiter((label for _, label in rows), dtype=numpy.float64, count=len(rows))
+        offsets = numpy.concatenate(([0], numpy.cumsum(lengths)[:-1]))
+
+        weights = numpy.zeros(self.n_features)
+        bias = 0.0
+        rng = numpy.random.default_rng(0)
+        for _ in range(epochs):
+            order = rng.permutation(len(rows))
+            for start in range(0, len(rows), BATCH_SIZE):
+                batch = order[start:start + BATCH_SIZE]
+                counts = lengths[batch]
+                row_of = numpy.repeat(numpy.arange(len(batch)), counts)
+                # Position of every feature of every batch row inside `indices`
+                positions = numpy.arange(counts.sum()) + numpy.repeat(offsets[batch] - (numpy.cumsum(counts) - counts), counts)
+                columns = indices[positions]
+
+                logits = bias + numpy.bincount(row_of, weights=weights[columns], minlength=len(batch))
+                gradient = 1.0 / (1.0 + numpy.exp(-numpy.clip(logits, -35, 35))) - labels[batch]
+
+                bias -= learning_rate * gradient.mean()
+                numpy.add.at(weights, columns, -learning_rate * (gradient[row_of] + l2 * weights[columns]))
+
+        return weights.tolist(), float(bias)
+
+    def classify(self, title: str, summary: str) -> Tuple[Optional[bool], float, str]:
+        """
+        Classify one article.
+
+        Returns:
+            (verdict, probability, reason) - verdict is None when uncertain;
+            probability is the model's P(relevant) (0.5 if the model is off)
+        """
+        text = f"{title or ''} {summary or ''}"
+        excluded = next((p.pattern for p in self.exclude if p.search(text)), None)
+        included = next((p.pattern for p in self.include if p.search(text)), None)
+
+        probability = self.probability(title, summary)
+
+        if excluded and not included:
+            return False, probability, f"{REASON_PREFIX} No. Matched exclude rule {excluded}"
+        if included and not excluded:
+            return True, probability, f"{REASON_PREFIX} Yes. Matched include rule {included}"
+
+        if self.weights is not None:
+            if probability >= self.approve_threshold:
+                return True, probability, f"{REASON_PREFIX} Yes. Model confidence {probability:.2f}"
+            if probability <= self.reject_threshold:
+                return False, probability, f"{REASON_PREFIX} No. Model confidence {1 - probability:.2f}"
+
+        return None, probability, ''
+
+    def probability(self, title: str, summary: str) -> float:
+        """Model P(relevant), or 0.5 when the model is not trained."""
+        if self.weights is None:
+            return 0.5
+        return _sigmoid(self.bias + sum(self.weights[i] for i in self._features(title, summary)))
+
+    def _features(self, title: str, summary: str) -> List[int]:
+        """
+        Hashed unigram + bigram feature indices (title and summary kept apart).
+
+        Feature 'a' of the title hashes as crc32(b't:a') and bigram 'a b' as
+        crc32(b't:a_b'). crc32 is stable across processes (models are
+        saved), and continuing a word's CRC yields its bigrams' without
+        building the strings.
+        """
+        features = set()
+        for seed, text in ((TITLE_SEED, title), (SUMMARY_SEED, summary)):
+            previous = None
+            for word in tokenize(text):
+                encoded = word.encode('utf-8')
+                unigram = zlib.crc32(encoded, seed)
+                features.add(unigram % self.n_features)
+                if previous is not None:
+                    features.add(zlib.crc32(b'_' + encoded, previous) % self.n_features)
+                previous = unigram
+        return list(features)
+
+
+def _sigmoid(x: float) -> float:
+    if x < -35:
+        return 0.0
+    if x > 35:
+        return 1.0
+    return 1.0 / (1.0 + math.exp(-x))
+
+
+def agreement_stats(pairs: List[Tuple[float, bool]]) -> Dict:
+    """
+    Compare model leanings against LLM verdicts for uncertain articles.
+
+    Args:
+        pairs: (model probability, LLM verdict) for each article sent to the LLM
+    """
+    if not pairs:
+        return {'compared': 0, 'agreement': 0.0}
+    agreed = sum(1 for probability, verdict in pairs if (probability >= 0.5) == verdict)
+    return {'compared': len(pairs), 'agreement': agreed / len(pairs)}
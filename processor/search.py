@@ -0,0 +1,180 @@
+"""
+Full-text search for Energy News Bot
+Ranked FTS5 lookups over articles and tweets (indexes are kept in sync by triggers in schema.sql)
+"""
+import sqlite3
+from typing import Dict, List, Optional
+import logging
+
+from processor.clustering import simhash, tokenize
+
+logger = logging.getLogger(__name__)
+
+# bm25 column weights: title matches count double
+ARTICLE_WEIGHTS = (2.0, 1.0)
+
+
+class FullTextSearch:
+    """Ranked search, similar-story candidates and recent-coverage checks."""
+
+    def __init__(self, max_terms: int = 16):
+        """
+        Args:
+            max_terms: Most distinct words used when turning free text into a query
+        """
+        self.max_terms = max_terms
+
+    def match_query(self, *texts: str) -> str:
+        """
+        Build an FTS5 query matching any significant word of the given texts.
+
+        Words from earlier texts come first (pass the title before the
+        summary). Returns '' when there is nothing worth searching for.
+        """
+        terms = []
+        for text in texts:
+            for word in tokenize(text):
+                if len(word) > 1 and word not in terms:
+                    terms.append(word)
+        return ' OR '.join(f'"{term}"' for term in terms[:self.max_terms])
+
+    def articles(self, cursor, query: str, limit: int = 20, hours: Optional[float] = None,
+                 status: Optional[str] = None) -> List[Dict]:
+        """
+        Ranked article search.
+
+        Args:
+            query: FTS5 query syntax; plain text is used if it doesn't parse
+            hours: Only articles discovered within the last N hours
+            status: Only articles with this status
+        """
+        clauses = []
+        params: list = []
+        if hours is not None:
+            clauses.append("a.discovered_at > datetime('now', ?)")
+            params.append(f'-{hours} hours')
+        if status:
+            clauses.append("a.status = ?")
+            params.append(status)
+
+        sql = f"""
+            SELECT a.id, a.title, a.source, a.status, a.published_at, a.url,
+                   snippet(articles_fts, 1, '[', ']', '…', 12),
+                   bm25(articles_fts, ?, ?) AS rank
+            FROM articles_fts
+            JOIN articles a ON a.id = articles_fts.rowid
+            WHERE articles_fts MATCH ?
+            {''.join(' AND ' + clause for clause in clauses)}
+            ORDER BY rank
+            LIMIT ?
+        """
+        rows = self._run(cursor, sql, list(ARTICLE_WEIGHTS), query, params + [limit])
+        return [
+            {
+                'id': row[0], 'title': row[1], 'source': row[2], 'status': row[3],
+                'published_at': row[4], 'url': row[5], 'snippet': row[6], 'rank': row[7]
+            }
+            for row in rows
+        ]
+
+    def tweets(self, cursor, query: str, limit: int = 20, hours: Optional[float] = None) -> List[Dict]:
+        """Ranked tweet search (hours filters on posted_at, or drafts' article discovery time)."""
+        clauses = []
+        params: list = []
+        if hours is not None:
+            clauses.append("COALESCE(t.posted_at, a.discovered_at) > datetime('now', ?)")
+            params.append(f'-{hours} hours')
+
+        sql = f"""
+            SELECT t.id, t.tweet_text, t.status, t.tweet_id, t.posted_at, t.article_link,
+                   bm25(tweets_fts) AS rank
+            FROM tweets_fts
+            JOIN tweets t ON t.id = tweets_fts.rowid
+            LEFT JOIN articles a ON a.id = t.article_id
+            WHERE tweets_fts MATCH ?
+            {''.join(' AND ' + clause for clause in clauses)}
+            ORDER BY rank
+            LIMIT ?
+        """
+        rows = self._run(cursor, sql, [], query, params + [limit])
+        return [
+            {
+                'id': row[0], 'tweet_text': row[1], 'status': row[2], 'tweet_id': row[3],
+                'posted_at': row[4], 'article_link': row[5], 'rank': row[6]
+            }
+            for row in rows
+        ]
+
+    def similar_clustered(self, cursor, article_id: int, title: str, summary: str,
+                          hours: float, limit: int = 20) -> List[tuple]:
+        """
+        Best-ranked already-clustered articles sharing words with this one.
+
+        Returns:
+            (cluster_id, signed simhash) candidates for StoryClusterer
+        """
+        query = self.match_query(title, summary)
+        if not query:
+            return []
+        cursor.execute("""
+            SELECT ac.cluster_id, ac.simhash
+            FROM articles_fts
+            JOIN articles a ON a.id = articles_fts.rowid
+            JOIN article_clusters ac ON ac.article_id = a.id
+            WHERE articles_fts MATCH ?
+            AND a.discovered_at > datetime('now', ?)
+            AND a.id != ?
+            ORDER BY bm25(articles_fts, ?, ?)
+            LIMIT ?
+        """, (query, f'-{hours} hours', article_id) + ARTICLE_WEIGHTS + (limit,))
+        return cursor.fetchall()
+
+    def recent_coverage(self, cursor, title: str, summary: str = '', hours: float = 168,
+                        max_distance: Optional[int] = None, exclude_article_id: Optional[int] = None,
+                        limit: int = 5) -> List[Dict]:
+        """
+        Tweets (posted or drafted) in the last N hours about a similar story.
+
+        Args:
+            max_distance: If set, only keep candidates whose article text is
+                within this SimHash distance (i.e. the same story)
+            exclude_article_id: Ignore tweets for this article
+        """
+        query = self.match_query(title, summary)
+        if not query:
+            return []
+        cursor.execute("""
+            SELECT t.id, t.tweet_id, t.status, t.posted_at, a.id, a.title, a.summary
+            FROM articles_fts
+            JOIN articles a ON a.id = articles_fts.rowid
+            JOIN tweets t ON t.article_id = a.id
+            WHERE articles_fts MATCH ?
+            AND t.status IN ('draft', 'posted')
+            AND COALESCE(t.posted_at, a.discovered_at) > datetime('now', ?)
+            AND a.id != ?
+            ORDER BY bm25(articles_fts, ?, ?)
+            LIMIT ?
+        """, (query, f'-{hours} hours', exclude_article_id or 0) + ARTICLE_WEIGHTS + (limit,))
+
+        signature = simhash(title, summary) if max_distance is not None else None
+        coverage = []
+        for tweet_id, x_id, status, posted_at, article_id, other_title, other_summary in cursor.fetchall():
+            if signature is not None and bin(signature ^ simhash(other_title, other_summary)).count('1') > max_distance:
+                continue
+            coverage.append({
+                'tweet_id': tweet_id, 'x_id': x_id, 'status': status, 'posted_at': posted_at,
+                'article_id': article_id, 'title': other_title
+            })
+        return coverage
+
+    def _run(self, cursor, sql: str, weights: list, query: str, params: list) -> list:
+        """Run with the query as FTS5 syntax, retrying as plain words if it doesn't parse."""
+        try:
+            cursor.execute(sql, weights + [query] + params)
+        except sqlite3.OperationalError:
+            fallback = self.match_query(query)
+            if not fallback or fallback == query:
+                raise
+            logger.debug(f"Not a valid FTS5 query, searching words instead: {query!r}")
+            cursor.execute(sql, weights + [fallback] + params)
+        return cursor.fetchall()
@@ -0,0 +1,171 @@
+"""
+LLM work queue for Energy News Bot
+Ranks pending and approved articles by how likely they are to get posted, within a per-run token budget
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# sources.priority (1=high, 2=medium, 3=low) -> score multiplier
+PRIORITY_WEIGHTS = {1: 1.0, 2: 0.6, 3: 0.35}
+
+# gpt-4o-mini list prices (USD per 1M tokens)
+INPUT_USD_PER_MILLION = 0.15
+OUTPUT_USD_PER_MILLION = 0.60
+
+
+class TokenBudget:
+    """Running token/cost total for one stage run; work is admitted only while it fits."""
+
+    def __init__(self, max_tokens: Optional[int] = None, max_cost_usd: Optional[float] = None,
+                 input_usd_per_million: float = INPUT_USD_PER_MILLION,
+                 output_usd_per_million: float = OUTPUT_USD_PER_MILLION):
+        """
+        Args:
+            max_tokens: Prompt + completion tokens allowed (None = unlimited)
+            max_cost_usd: Spend allowed (None = unlimited)
+        """
+        self.max_tokens = max_tokens
+        self.max_cost_usd = max_cost_usd
+        self.input_usd_per_million = input_usd_per_million
+        self.output_usd_per_million = output_usd_per_million
+        self.tokens = 0
+        self.cost_usd = 0.0
+
+    def admit(self, prompt_tokens: int, completion_tokens: int) -> bool:
+        """Reserve an estimated request if it fits; returns False (reserving nothing) if not."""
+        cost = (prompt_tokens * self.input_usd_per_million
+                + completion_tokens * self.output_usd_per_million) / 1_000_000
+        tokens = prompt_tokens + completion_tokens
+
+        if self.max_tokens is not None and self.tokens + tokens > self.max_tokens:
+            return False
+        if self.max_cost_usd is not None and self.cost_usd + cost > self.max_cost_usd:
+            return False
+
+        self.tokens += tokens
+        self.cost_usd += cost
+        return True
+
+
+class WorkQueue:
+    """
+    Decides which articles get LLM time, and in what order.
+
+    score = source priority weight
+            x freshness (halves every half_life_hours since publication)
+            x story coverage (1 + log2 of outlets carrying the story)
+
+    Articles older than max_age_hours are expired rather than filtered or
+    drafted, since they would be too stale to tweet anyway.
+    """
+
+    def __init__(self, max_age_hours: float = 48, half_life_hours: float = 12,
+                 token_budget: Optional[int] = None, cost_budget_usd: Optional[float] = None):
+        """
+        Args:
+            max_age_hours: Expire pending/approved articles published longer ago than this
+            half_life_hours: Age at which an article's freshness weight halves
+            token_budget: Estimated LLM tokens allowed per stage run (None = unlimited)
+            cost_budget_usd: Estimated LLM spend allowed per stage run (None = unlimited)
+        """
+        self.max_age_hours = max_age_hours
+        self.half_life_hours = half_life_hours
+        self.token_budget = token_budget
+        self.cost_budget_usd = cost_budget_usd
+
+    def budget(self) -> TokenBudget:
+        """A fresh budget for one stage run."""
+        return TokenBudget(self.token_budget, self.cost_budget_usd)
+
+    def score(self, priority: Optional[int], age_hours: Optional[float], cluster_size: int) -> float:
+        weight = PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS[2])
+        freshness = 0.5 ** (max(0.0, age_hours or 0.0) / self.half_life_hours)
+        coverage = 1 + math.log2(max(1, cluster_size))
+        return weight * freshness * coverage
+
+    def expire(self, cursor) -> int:
+        """
+        Mark pending articles, and approved ones not yet drafted, as 'expired' once too old.
+
+        Returns:
+            Number of articles expired
+        """
+        cursor.execute("""
+            UPDATE articles
+            SET status = 'expired'
+            WHERE status IN ('pending', 'approved')
+            AND published_at < datetime('now', ?)
+            AND NOT EXISTS (SELECT 1 FROM tweets t WHERE t.article_id = articles.id)
+        """, (f'-{self.max_age_hours} hours',))
+        if cursor.rowcount:
+            logger.info(f"⌛ Expired {cursor.rowcount} articles older than {self.max_age_hours:g}h")
+        return cursor.rowcount
+
+    def pending(self, cursor) -> List[Tuple[int, str, str]]:
+        """
+        Pending articles that need a verdict, best first, one per story.
+
+        Normally that is each cluster's representative. If a representative
+        left 'pending' without a verdict (expired or archived), the
+        best-scoring remaining copy takes its place, so later copies resolve
+        from its verdict.
+
+        Returns:
+            (id, title, summary) rows
+        """
+        cursor.execute("""
+            SELECT a.id, a.title, a.summary, s.priority,
+                   (julianday('now') - julianday(a.published_at)) * 24,
+                   ac.cluster_id, sc.representative_id,
+                   (SELECT COUNT(*) FROM article_clusters m WHERE m.cluster_id = ac.cluster_id)
+            FROM articles a
+            LEFT JOIN sources s ON s.name = a.source
+            LEFT JOIN article_clusters ac ON ac.article_id = a.id
+            LEFT JOIN story_clusters sc ON sc.id = ac.cluster_id
+            LEFT JOIN articles rep ON rep.id = sc.representative_id
+            WHERE a.status = 'pending'
+            AND (sc.representative_id IS NULL OR rep.id = a.id OR rep.status IS NOT 'pending')
+        """)
+
+        best: Dict = {}
+        for article_id, title, summary, priority, age_hours, cluster_id, representative_id, size in cursor.fetchall():
+            score = self.score(priority, age_hours, size)
+            key = cluster_id if cluster_id is not None else ('article', article_id)
+            if key not in best or score > best[key][0]:
+                best[key] = (score, article_id, title, summary, cluster_id, representative_id)
+
+        ranked = sorted(best.values(), key=lambda item: (-item[0], -item[1]))
+        for _, article_id, _, _, cluster_id, representative_id in ranked:
+            if cluster_id is not None and representative_id != article_id:
+                cursor.execute("""
+                    UPDATE story_clusters SET representative_id = ? WHERE id = ?
+                """, (article_id, cluster_id))
+
+        return [(article_id, title, summary) for _, article_id, title, summary, _, _ in ranked]
+
+    def approved(self, cursor) -> List[Tuple]:
+        """
+        Approved articles without a tweet yet, best first.
+
+        Returns:
+            (id, title, summary, url, image_url) rows
+        """
+        cursor.execute("""
+            SELECT a.id, a.title, a.summary, a.url, a.image_url, s.priority,
+                   (julianday('now') - julianday(a.published_at)) * 24,
+                   COALESCE((
+                       SELECT COUNT(*) FROM article_clusters m
+                       JOIN article_clusters own ON own.cluster_id = m.cluster_id
+                       WHERE own.article_id = a.id
+                   ), 1)
+            FROM articles a
+            LEFT JOIN sources s ON s.name = a.source
+            LEFT JOIN tweets t ON t.article_id = a.id
+            WHERE a.status = 'approved' AND t.id IS NULL
+        """)
+        rows = cursor.fetchall()
+        rows.sort(key=lambda row: (-self.score(row[5], row[6], row[7]), -row[0]))
+        return [row[:5] for row in rows]
@@ -1,6 +1,10 @@
 """
 Energy News Bot - Main Orchestrator
 Runs the complete pipeline: crawl → filter → generate → post
+
+Each stage can also run on its own (run.py crawl|filter|generate|post).
+Stage modules are imported only when a command needs them, so a
+crawl-only cron job never loads openai or tweepy.
 """
 import os
 import sys
@@ -9,15 +13,10 @@ from datetime import datetime
 from dotenv import load_dotenv
 from pathlib import Path
 
-# Python 3.13 compatibility - must be imported before tweepy
-import imghdr_compat
-
 # Add modules to path
 sys.path.append(str(Path(__file__).parent))
 
-from crawler.rss_crawler import RSSCrawler
-from processor.llm_processor import LLMProcessor
-from poster.x_poster import XPoster
+import metrics
 
 # Setup logging
 logging.basicConfig(
@@ -30,14 +29,207 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+STAGES = ['crawl', 'filter', 'generate', 'post']
+
+
+def build_crawler(db_path: str):
+    from crawler.rss_crawler import RSSCrawler
+    archive = None
+    if os.getenv('FEED_ARCHIVE_DIR'):
+        from crawler.feed_archive import FeedArchive
+        archive = FeedArchive(os.getenv('FEED_ARCHIVE_DIR'))
+    return RSSCrawler(db_path, archive=archive)
+
+
+def build_leases():
+    from database.leases import Leases
+    return Leases(lease_seconds=int(os.getenv('LEASE_SECONDS', 600)))
+
+
+def build_processor(db_path: str):
+    from processor.compaction import PromptCompactor
+    from processor.llm_executor import LLMExecutor
+    from processor.llm_processor import LLMProcessor
+    from processor.work_queue import WorkQueue
+    token_budget = os.getenv('LLM_RUN_TOKEN_BUDGET')
+    cost_budget = os.getenv('LLM_RUN_COST_BUDGET_USD')
+    queue = WorkQueue(
+        max_age_hours=float(os.getenv('ARTICLE_MAX_AGE_HOURS', 48)),
+        token_budget=int(token_budget) if token_budget else None,
+        cost_budget_usd=float(cost_budget) if cost_budget else None
+    )
+    fused = os.getenv('LLM_FUSED_MODE', '').lower() in ('1', 'true', 'yes')
+    compactor = PromptCompactor(max_tokens=int(os.getenv('SUMMARY_TOKEN_BUDGET', 160)))
+    executor = LLMExecutor(
+        max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', 8)),
+        requests_per_minute=int(os.getenv('LLM_REQUESTS_PER_MINUTE', 500)),
+        tokens_per_minute=int(os.getenv('LLM_TOKENS_PER_MINUTE', 200000))
+    )
+    return LLMProcessor(db_path, os.getenv('OPENAI_API_KEY'), executor=executor, queue=queue, fused=fused,
+                        compactor=compactor, leases=build_leases())
+
+
+def build_poster(db_path: str):
+    # Python 3.13 compatibility - must be imported before tweepy
+    import imghdr_compat
+    from poster.x_poster import XPoster
+    return XPoster(
+        db_path,
+        os.getenv('X_API_KEY'),
+        os.getenv('X_API_SECRET'),
+        os.getenv('X_ACCESS_TOKEN'),
+        os.getenv('X_ACCESS_TOKEN_SECRET'),
+        leases=build_leases()
+    )
+
+
+def run_stage(stage: str, hours_back: float = 12, max_tweets: int = 10, all_sources: bool = False,
+              generate_limit: int = None) -> dict:
+    """
+    Run a single pipeline stage.
+    
+    Args:
+        stage: One of crawl, filter, generate, post
+        hours_back: Crawl articles from last N hours
+        max_tweets: Maximum tweets to post in this run
+        all_sources: Crawl every enabled source, not just the ones due
+        generate_limit: Most articles one generate run claims (None = all)
+        
+    Returns:
+        The stage's stats dict
+    """
+    load_dotenv()
+    
+    db_path = os.getenv('DATABASE_PATH', './database/energy_news.db')
+    
+    with metrics.timer('pipeline_stage_seconds', stage=stage):
+        if stage == 'crawl':
+            stats = build_crawler(db_path).crawl_all_sources(hours_back=hours_back, due_only=not all_sources)
+        elif stage == 'filter':
+            stats = build_processor(db_path).filter_articles()
+        elif stage == 'generate':
+            stats = build_processor(db_path).generate_tweets(limit=generate_limit)
+        elif stage == 'post':
+            stats = build_poster(db_path).post_tweets(max_tweets=max_tweets, delay_seconds=60)
+        else:
+            raise ValueError(f"Unknown stage: {stage}")
+    
+    logger.info(f"✓ {stage}: {stats}")
+    return stats
+
 
-def run_pipeline(hours_back: int = 12, max_tweets: int = 10):
+def run_replay(hours_back: float = 12, source: str = None, since: datetime = None,
+               until: datetime = None) -> dict:
+    """
+    Re-ingest articles from archived feed bodies (no network).
+    
+    Args:
+        hours_back: Replay bodies fetched within the last N hours (when since is not given)
+        source: Only replay this source
+        since: Replay bodies fetched at or after this time
+        until: ...and before this time (default no limit)
+    """
+    from datetime import timedelta, timezone
+    
+    load_dotenv()
+    
+    db_path = os.getenv('DATABASE_PATH', './database/energy_news.db')
+    
+    if since is None:
+        since = datetime.now(timezone.utc) - timedelta(hours=hours_back)
+    
+    with metrics.timer('pipeline_stage_seconds', stage='replay'):
+        stats = build_crawler(db_path).replay(since=since, until=until, source=source)
+    logger.info(f"✓ replay: {stats}")
+    return stats
+
+
+def parse_timestamp(value: str) -> datetime:
+    """argparse type for ISO 8601 timestamps; ones without an offset are taken as UTC."""
+    import argparse
+    from datetime import timezone
+    
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO timestamp: {value!r}")
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def export_metrics() -> dict:
+    """Write the Prometheus textfile from stored metrics and print it."""
+    load_dotenv()
+    
+    db_path = os.getenv('DATABASE_PATH', './database/energy_news.db')
+    textfile = os.getenv('METRICS_TEXTFILE', './energy_news_bot.prom')
+    stats = metrics.flush(db_path, textfile)
+    with open(textfile, 'r') as f:
+        print(f.read(), end='')
+    return stats
+
+
+def run_retention(full_vacuum: bool = False) -> dict:
+    """
+    Archive finished articles, roll up crawl_log and metrics, and vacuum.
+    
+    Args:
+        full_vacuum: Allow the one-off full VACUUM that enables incremental vacuum on older databases
+    """
+    from database.retention import RetentionManager
+    
+    load_dotenv()
+    
+    db_path = os.getenv('DATABASE_PATH', './database/energy_news.db')
+    
+    with metrics.timer('pipeline_stage_seconds', stage='retention'):
+        stats = RetentionManager(db_path).run(full_vacuum=full_vacuum)
+    logger.info(f"✓ retention: {stats}")
+    return stats
+
+
+def run_search(query: str, tweets: bool = False, hours_back: float = None, limit: int = 20) -> list:
+    """
+    Print ranked full-text matches for a query.
+    
+    Args:
+        query: FTS5 query (plain words work too)
+        tweets: Search tweet text instead of articles
+        hours_back: Only the last N hours (all time if None)
+        limit: Maximum results
+    """
+    from database.storage import connect
+    from processor.search import FullTextSearch
+    
+    load_dotenv()
+    
+    db_path = os.getenv('DATABASE_PATH', './database/energy_news.db')
+    conn = connect(db_path)
+    search = FullTextSearch()
+    try:
+        if tweets:
+            results = search.tweets(conn.cursor(), query, limit=limit, hours=hours_back)
+            for row in results:
+                print(f"#{row['id']} [{row['status']}] {row['posted_at'] or '-'}  {row['tweet_text'][:100]}")
+        else:
+            results = search.articles(conn.cursor(), query, limit=limit, hours=hours_back)
+            for row in results:
+                print(f"#{row['id']} [{row['status']}] {row['published_at']} {row['source']}: {row['title'][:90]}")
+                print(f"    {row['snippet']}")
+    finally:
+        conn.close()
+    
+    print(f"{len(results)} result(s)")
+    return results
+
+
+def run_pipeline(hours_back: float = 12, max_tweets: int = 10, all_sources: bool = False):
     """
     Run the complete news bot pipeline.
     
     Args:
         hours_back: Crawl articles from last N hours
         max_tweets: Maximum tweets to post in this run
+        all_sources: Crawl every enabled source, not just the ones due
     """
     
     # Load environment variables
@@ -52,34 +244,32 @@ def run_pipeline(hours_back: int = 12, max_tweets: int = 10):
     
     # Step 1: Crawl RSS feeds
     logger.info("\n📡 STEP 1: Crawling RSS feeds...")
-    crawler = RSSCrawler(db_path)
-    crawl_stats = crawler.crawl_all_sources(hours_back=hours_back)
-    logger.info(f"✓ Crawled {crawl_stats['sources_crawled']} sources")
+    crawler = build_crawler(db_path)
+    with metrics.timer('pipeline_stage_seconds', stage='crawl'):
+        crawl_stats = crawler.crawl_all_sources(hours_back=hours_back, due_only=not all_sources)
+    logger.info(f"✓ Crawled {crawl_stats['sources_crawled']} sources ({crawl_stats['sources_unchanged']} unchanged)")
     logger.info(f"✓ Found {crawl_stats['articles_found']} articles ({crawl_stats['articles_new']} new)")
     
     # Step 2: Filter articles with LLM
     logger.info("\n🤖 STEP 2: Filtering articles with LLM...")
-    processor = LLMProcessor(db_path, os.getenv('OPENAI_API_KEY'))
-    filter_stats = processor.filter_articles()
+    processor = build_processor(db_path)
+    with metrics.timer('pipeline_stage_seconds', stage='filter'):
+        filter_stats = processor.filter_articles()
     logger.info(f"✓ Filtered {filter_stats['total']} articles")
-    logger.info(f"✓ Approved: {filter_stats['approved']}, Filtered out: {filter_stats['filtered_out']}")
+    logger.info(f"✓ Approved: {filter_stats['approved']}, Filtered out: {filter_stats['filtered_out']}, Duplicates: {filter_stats['duplicates']}")
     
     # Step 3: Generate tweets
     logger.info("\n✍️  STEP 3: Generating tweets...")
-    tweet_stats = processor.generate_tweets()
+    with metrics.timer('pipeline_stage_seconds', stage='generate'):
+        tweet_stats = processor.generate_tweets()
     logger.info(f"✓ Generated {tweet_stats['generated']} tweets")
     
     # Step 4: Post to X
     logger.info("\n🐦 STEP 4: Posting to X...")
-    poster = XPoster(
-        db_path,
-        os.getenv('X_API_KEY'),
-        os.getenv('X_API_SECRET'),
-        os.getenv('X_ACCESS_TOKEN'),
-        os.getenv('X_ACCESS_TOKEN_SECRET')
-    )
-    post_stats = poster.post_tweets(max_tweets=max_tweets, delay_seconds=60)
-    logger.info(f"✓ Posted {post_stats['posted']} tweets (failed: {post_stats['failed']})")
+    poster = build_poster(db_path)
+    with metrics.timer('pipeline_stage_seconds', stage='post'):
+        post_stats = poster.post_tweets(max_tweets=max_tweets, delay_seconds=60)
+    logger.info(f"✓ Posted {post_stats['posted']} tweets (failed: {post_stats['failed']}, next slot: {post_stats['next_post_at'] or 'none'})")
     
     # Summary
     logger.info("\n" + "="*80)
@@ -92,17 +282,95 @@ def run_pipeline(hours_back: int = 12, max_tweets: int = 10):
     logger.info("="*80 + "\n")
 
 
+def run_daemon(hours_back: float = 0.5, max_tweets: int = 3, interval: float = 60, generate_limit: int = None):
+    """
+    Run the pipeline as one long-lived process with independent stages.
+    
+    Args:
+        hours_back: Crawl articles from last N hours
+        max_tweets: Maximum tweets to post per post-stage run
+        interval: Seconds between runs of each stage when idle
+        generate_limit: Most articles one generate-stage run claims (None = all)
+    """
+    from daemon import PipelineDaemon
+    
+    # Load environment variables
+    load_dotenv()
+    
+    db_path = os.getenv('DATABASE_PATH', './database/energy_news.db')
+    
+    # Clients are built once and stay warm for the life of the process
+    crawler = build_crawler(db_path)
+    processor = build_processor(db_path)
+    poster = build_poster(db_path)
+    
+    PipelineDaemon(
+        crawler,
+        processor,
+        poster,
+        metrics_textfile=os.getenv('METRICS_TEXTFILE', './energy_news_bot.prom'),
+        hours_back=hours_back,
+        max_tweets=max_tweets,
+        generate_limit=generate_limit,
+        crawl_interval=interval,
+        filter_interval=interval,
+        generate_interval=interval,
+        post_interval=interval
+    ).run()
+
+
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description="Energy News Bot")
-    parser.add_argument('--hours', type=int, default=12, help='Crawl articles from last N hours')
+    parser.add_argument('command', nargs='?', default='run', choices=['run', 'daemon'] + STAGES + ['replay', 'metrics', 'search', 'retention'],
+                        help='run: one full pipeline pass (default); daemon: long-running staged pipeline; '
+                             'crawl|filter|generate|post: a single stage; replay: re-ingest archived feeds; '
+                             'metrics: export and print metrics; search: full-text search; '
+                             'retention: archive old rows and vacuum')
+    parser.add_argument('query', nargs='?', help='Search: query text (FTS5 syntax accepted)')
+    parser.add_argument('--hours', type=float, help='Crawl articles from last N hours (default 12; search: all time)')
     parser.add_argument('--max-tweets', type=int, default=10, help='Maximum tweets to post')
+    parser.add_argument('--all-sources', action='store_true', help='Ignore the poll schedule and crawl every source')
+    parser.add_argument('--generate-limit', type=int, help='Generate/daemon: most articles one run claims (split the backlog between workers)')
+    parser.add_argument('--interval', type=float, default=60, help='Daemon: seconds between idle stage runs')
+    parser.add_argument('--source', help='Replay: only this source')
+    parser.add_argument('--since', type=parse_timestamp, help='Replay: bodies fetched at or after this ISO time (UTC unless an offset is given; overrides --hours)')
+    parser.add_argument('--until', type=parse_timestamp, help='Replay: bodies fetched before this ISO time')
+    parser.add_argument('--tweets', action='store_true', help='Search: match tweet text instead of articles')
+    parser.add_argument('--limit', type=int, default=20, help='Search: maximum results')
+    parser.add_argument('--full-vacuum', action='store_true', help='Retention: one-off full VACUUM to enable incremental vacuum')
     
     args = parser.parse_args()
+    if args.command == 'search' and not args.query:
+        parser.error('search needs a query')
+    if args.hours is None and args.command != 'search':
+        args.hours = 12
     
     try:
-        run_pipeline(hours_back=args.hours, max_tweets=args.max_tweets)
+        if args.command == 'daemon':
+            run_daemon(hours_back=args.hours, max_tweets=args.max_tweets, interval=args.interval,
+                       generate_limit=args.generate_limit)
+        elif args.command in STAGES:
+            run_stage(args.command, hours_back=args.hours, max_tweets=args.max_tweets, all_sources=args.all_sources,
+                      generate_limit=args.generate_limit)
+        elif args.command == 'replay':
+            run_replay(hours_back=args.hours, source=args.source, since=args.since, until=args.until)
+        elif args.command == 'metrics':
+            export_metrics()
+        elif args.command == 'search':
+            run_search(args.query, tweets=args.tweets, hours_back=args.hours, limit=args.limit)
+        elif args.command == 'retention':
+            run_retention(full_vacuum=args.full_vacuum)
+        else:
+            run_pipeline(hours_back=args.hours, max_tweets=args.max_tweets, all_sources=args.all_sources)
     except Exception as e:
         logger.error(f"Pipeline failed: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        if args.command in ['run', 'replay', 'retention'] + STAGES:
+            # Persist this run's timings even when a stage failed
+            metrics.flush(
+                os.getenv('DATABASE_PATH', './database/energy_news.db'),
+                os.getenv('METRICS_TEXTFILE', './energy_news_bot.prom')
+            )
@@ -1,17 +1,14 @@
 #!/bin/bash
-# Continuous runner - runs every N minutes in a loop
+# Continuous runner - one long-lived daemon process with independent stages
 
 cd "$(dirname "$0")"
 source venv/bin/activate
 
-# Run interval in seconds (60 = 1 minute, 600 = 10 minutes)
+# Seconds between stage runs when idle (60 = 1 minute, 600 = 10 minutes).
+# New articles flow straight through to the next stage without waiting.
 INTERVAL=60
 
-echo "Starting continuous runner with ${INTERVAL}s interval..."
+echo "$(date): Starting daemon with ${INTERVAL}s interval..." >> logs/crawl_runs.log
 
-while true; do
-    echo "$(date): Starting crawl..."
-    python3 run.py --hours 0.5 --max-tweets 3
-    echo "$(date): Crawl completed. Sleeping ${INTERVAL}s..." >> logs/crawl_runs.log
-    sleep $INTERVAL
-done
+# exec so SIGTERM from the supervisor reaches the daemon for a graceful shutdown
+exec python3 run.py daemon --hours 0.5 --max-tweets 3 --interval $INTERVAL
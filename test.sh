@@ -9,6 +9,11 @@ echo ""
 # Activate virtual environment
 source venv/bin/activate
 
+# Unit tests (pip install pytest)
+echo "0️⃣  Running unit tests..."
+python3 -m pytest -q tests
+echo ""
+
 # Test 1: Database setup
 echo "1️⃣  Testing database setup..."
 python3 database/setup.py
@@ -16,12 +21,12 @@ echo ""
 
 # Test 2: RSS Crawler
 echo "2️⃣  Testing RSS crawler..."
-python3 crawler/rss_crawler.py
+python3 -m crawler.rss_crawler
 echo ""
 
 # Test 3: LLM Processor
 echo "3️⃣  Testing LLM processor..."
-python3 processor/llm_processor.py
+python3 -m processor.llm_processor
 echo ""
 
 # Test 4: X Poster (dry run - don't actually post)
@@ -0,0 +1,212 @@
+"""
+Leases must hand every row to exactly one live worker, and let rows held
+by a dead worker be taken over once the lease runs out.
+"""
+import threading
+import time
+
+import pytest
+
+from database.leases import Leases
+from database.storage import connect
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / 'leases.db'
+    conn = connect(path)
+    conn.executemany("""
+        INSERT INTO articles (url, title, source, published_at, status)
+        VALUES (?, ?, 'Test', CURRENT_TIMESTAMP, 'pending')
+    """, [(f'https://example.com/{i}', f'Article {i}') for i in range(1, 41)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def cursor(db_path):
+    conn = connect(db_path)
+    yield conn.cursor()
+    conn.close()
+
+
+def _owner(cursor, article_id):
+    cursor.execute("SELECT claimed_by FROM articles WHERE id = ?", (article_id,))
+    return cursor.fetchone()[0]
+
+
+def _expire(cursor, ids):
+    marks = ','.join('?' * len(ids))
+    cursor.execute(f"""
+        UPDATE articles SET lease_expires_at = datetime('now', '-1 seconds') WHERE id IN ({marks})
+    """, ids)
+
+
+def test_claim_excludes_other_workers(cursor):
+    a, b = Leases('a'), Leases('b')
+
+    assert a.claim(cursor, 'articles', [1, 2, 3]) == [1, 2, 3]
+    assert b.claim(cursor, 'articles', [3, 2, 4]) == [4]
+    assert [_owner(cursor, i) for i in (1, 2, 3, 4)] == ['a', 'a', 'a', 'b']
+
+
+def test_claim_respects_status(cursor):
+    cursor.execute("UPDATE articles SET status = 'approved' WHERE id = 2")
+
+    assert Leases('a').claim(cursor, 'articles', [1, 2, 3], status='pending') == [1, 3]
+    assert _owner(cursor, 2) is None
+
+
+def test_claim_rejects_unleased_tables(cursor):
+    with pytest.raises(ValueError):
+        Leases('a').claim(cursor, 'sources', [1])
+
+
+def test_release_only_drops_own_claims(cursor):
+    a, b = Leases('a'), Leases('b')
+    a.claim(cursor, 'articles', [1, 2])
+    b.claim(cursor, 'articles', [3])
+
+    assert a.release(cursor, 'articles', [1, 2, 3]) == 2
+    assert _owner(cursor, 3) == 'b'
+    assert b.claim(cursor, 'articles', [1, 2]) == [1, 2]
+
+
+def test_renew_extends_own_lease(cursor):
+    a = Leases('a', lease_seconds=600)
+    a.claim(cursor, 'articles', [1])
+    cursor.execute("UPDATE articles SET lease_expires_at = datetime('now', '+5 seconds') WHERE id = 1")
+
+    assert a.claim(cursor, 'articles', [1]) == [1]
+    cursor.execute("SELECT lease_expires_at > datetime('now', '+500 seconds') FROM articles WHERE id = 1")
+    assert cursor.fetchone()[0] == 1
+
+
+def test_expired_lease_is_stolen_and_old_owner_cannot_renew(cursor):
+    a, b = Leases('a'), Leases('b')
+    a.claim(cursor, 'articles', [1, 2])
+    _expire(cursor, [1])
+
+    assert b.claim(cursor, 'articles', [1, 2]) == [1]
+    assert a.claim(cursor, 'articles', [1, 2]) == [2]
+    assert _owner(cursor, 1) == 'b'
+
+
+def test_recover_clears_only_expired_leases(cursor):
+    a = Leases('a')
+    a.claim(cursor, 'articles', [1, 2, 3])
+    _expire(cursor, [1, 2])
+
+    assert Leases('b').recover(cursor) == 2
+    assert [_owner(cursor, i) for i in (1, 2, 3)] == [None, None, 'a']
+    assert Leases('b').recover(cursor) == 0
+
+
+def test_stages_in_one_process_keep_separate_claims(cursor):
+    """The daemon's filter and generate threads must not release each other's claims."""
+    process = Leases('host:1')
+    filter_, generate = process.for_stage('filter'), process.for_stage('generate')
+    filter_.claim(cursor, 'articles', [1, 2], status='pending')
+    cursor.execute("UPDATE articles SET status = 'approved' WHERE id IN (1, 2)")
+
+    # Filter still holds both, so generate can't treat them as its own
+    assert generate.claim(cursor, 'articles', [1, 2], status='approved') == []
+
+    filter_.release(cursor, 'articles', [1])
+    assert generate.claim(cursor, 'articles', [1, 2], status='approved') == [1]
+
+    # Filter's end-of-run release leaves generate's claim alone
+    assert filter_.release(cursor, 'articles', [1, 2]) == 1
+    assert _owner(cursor, 1) == 'host:1:generate'
+    assert Leases('host:2').claim(cursor, 'articles', [1], status='approved') == []
+
+
+def test_processor_stages_get_their_own_worker_ids(tmp_path):
+    from processor.llm_processor import LLMProcessor
+
+    processor = LLMProcessor(str(tmp_path / 'processor.db'), 'test-key', leases=Leases('host:1'))
+
+    assert processor.filter_leases.worker_id == 'host:1:filter'
+    assert processor.generate_leases.worker_id == 'host:1:generate'
+
+
+def test_two_workers_share_a_database(db_path):
+    """Each pending article is processed by exactly one of two concurrent workers."""
+    processed = {'w1': [], 'w2': []}
+    errors = []
+    start = threading.Barrier(2)
+
+    def work(worker_id):
+        conn = connect(db_path, check_same_thread=False)
+        leases = Leases(worker_id)
+        cursor = conn.cursor()
+        try:
+            start.wait()
+            while True:
+                conn.execute("BEGIN IMMEDIATE")
+                # Both workers see the same candidates; only the claim keeps them apart
+                cursor.execute("SELECT id FROM articles WHERE status = 'pending' ORDER BY id LIMIT 10")
+                candidates = [row[0] for row in cursor.fetchall()]
+                held = leases.claim(cursor, 'articles', candidates, status='pending')
+                conn.commit()
+                if not candidates:
+                    break
+
+                # The slow part runs outside the write lock, like an LLM call
+                time.sleep(0.002 * (len(held) or 1))
+                for article_id in held:
+                    cursor.execute("UPDATE articles SET status = 'approved' WHERE id = ?", (article_id,))
+                    processed[worker_id].append(article_id)
+                leases.release(cursor, 'articles', held)
+                conn.commit()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=work, args=(worker_id,)) for worker_id in processed]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert not set(processed['w1']) & set(processed['w2'])
+    assert sorted(processed['w1'] + processed['w2']) == list(range(1, 41))
+
+    conn = connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM articles WHERE claimed_by IS NOT NULL").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM articles WHERE status != 'approved'").fetchone()[0] == 0
+    conn.close()
+
+
+def test_generate_skips_drafts_whose_lease_was_taken(db_path):
+    """A draft whose LLM call outlasted the lease is dropped, not inserted twice."""
+    from processor.llm_processor import LLMProcessor
+
+    # Also used from the executor's worker thread
+    conn = connect(db_path, check_same_thread=False)
+    conn.execute("UPDATE articles SET status = 'approved' WHERE id IN (1, 2)")
+    conn.commit()
+
+    processor = LLMProcessor(str(db_path), 'test-key', leases=Leases('host:1'))
+    other = Leases('host:2').for_stage('generate')
+
+    def draft(article):
+        if article[0] == 1:
+            # Meanwhile our lease expires and another worker takes the article
+            _expire(conn.cursor(), [1])
+            assert other.claim(conn.cursor(), 'articles', [1], status='approved') == [1]
+            conn.commit()
+        return f"Draft for {article[0]}"
+
+    processor._draft_tweet = draft
+    stats = processor.generate_tweets()
+
+    assert stats['generated'] == 1
+    assert stats['lost_lease'] == 1
+    cursor = conn.execute("SELECT article_id FROM tweets")
+    assert [row[0] for row in cursor.fetchall()] == [2]
+    assert _owner(conn.cursor(), 1) == 'host:2:generate'
+    conn.close()
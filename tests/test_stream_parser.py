@@ -0,0 +1,177 @@
+"""
+The streaming parser must agree with feedparser on every feed it accepts,
+and hand anything it can't read properly back to feedparser.
+"""
+from datetime import datetime
+
+import feedparser
+import pytest
+
+from crawler.rss_crawler import RSSCrawler
+from crawler.stream_parser import StreamParseError, iter_entries, read_entries
+
+RSS2 = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0">
+  <channel>
+    <title>Grid News</title>
+    <link>https://grid.example.com/</link>
+    <item>
+      <title>Offshore wind auction clears record capacity</title>
+      <link>https://grid.example.com/a/1?id=7&amp;page=2</link>
+      <guid isPermaLink="false">grid-1</guid>
+      <description>Developers bid for 6 GW of new capacity.</description>
+      <pubDate>Tue, 14 Oct 2025 09:30:00 +0200</pubDate>
+    </item>
+    <item>
+      <title>Permalink guid only</title>
+      <guid>https://grid.example.com/a/2</guid>
+      <description>No link element, so the guid is the URL.</description>
+      <pubDate>Mon, 13 Oct 2025 18:00:00 GMT</pubDate>
+    </item>
+    <item>
+      <title>Explicit permalink guid</title>
+      <guid isPermaLink="true">https://grid.example.com/a/3</guid>
+      <pubDate>Mon, 13 Oct 2025 12:00:00 GMT</pubDate>
+    </item>
+    <item>
+      <title>Link and permalink guid differ</title>
+      <link>https://grid.example.com/a/4</link>
+      <guid>https://grid.example.com/?p=4</guid>
+      <pubDate>Sun, 12 Oct 2025 08:15:00 GMT</pubDate>
+    </item>
+  </channel>
+</rss>
+"""
+
+RSS1 = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns="http://purl.org/rss/1.0/"
+         xmlns:dc="http://purl.org/dc/elements/1.1/">
+  <channel rdf:about="https://solar.example.org/">
+    <title>Solar Weekly</title>
+    <link>https://solar.example.org/</link>
+  </channel>
+  <item rdf:about="https://solar.example.org/posts/perovskite">
+    <title>Perovskite cells pass 3,000 hour test</title>
+    <link>https://solar.example.org/posts/perovskite</link>
+    <description>Stability is catching up with efficiency.</description>
+    <dc:date>2025-10-14T07:00:00Z</dc:date>
+  </item>
+  <item rdf:about="https://solar.example.org/posts/tariffs">
+    <title>Module prices fall again</title>
+    <link>https://solar.example.org/posts/tariffs</link>
+    <description>Spot prices dropped 4% this month.</description>
+    <dc:date>2025-10-13T16:45:00+01:00</dc:date>
+  </item>
+</rdf:RDF>
+"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Hydrogen Desk</title>
+  <id>urn:uuid:60a76c80-d399-11d9-b91C-0003939e0af6</id>
+  <updated>2025-10-14T10:00:00Z</updated>
+  <entry>
+    <title>Electrolyser orders double</title>
+    <link rel="alternate" href="https://h2.example.net/electrolysers"/>
+    <link rel="enclosure" href="https://h2.example.net/chart.png"/>
+    <id>tag:h2.example.net,2025:electrolysers</id>
+    <published>2025-10-14T09:00:00Z</published>
+    <updated>2025-10-14T09:30:00Z</updated>
+    <summary>Backlogs now stretch into 2027.</summary>
+  </entry>
+  <entry>
+    <title>Updated only</title>
+    <link href="https://h2.example.net/pipelines"/>
+    <id>tag:h2.example.net,2025:pipelines</id>
+    <updated>2025-10-13T22:10:00-04:00</updated>
+    <summary>Repurposed gas pipelines pass pressure tests.</summary>
+  </entry>
+</feed>
+"""
+
+# RSS 0.90: items live in the Netscape namespace, which only feedparser knows
+RSS090 = b"""<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns="http://my.netscape.com/rdf/simple/0.9/">
+  <channel>
+    <title>Legacy Power</title>
+    <link>https://legacy.example.com/</link>
+  </channel>
+  <item>
+    <title>Coal plant closes early</title>
+    <link>https://legacy.example.com/coal</link>
+  </item>
+  <item>
+    <title>Hydro upgrade finished</title>
+    <link>https://legacy.example.com/hydro</link>
+  </item>
+</rdf:RDF>
+"""
+
+FIELDS = ('guid', 'url', 'title', 'summary', 'published_at', 'dated')
+
+
+def _feedparser_entries(content: bytes):
+    feed = feedparser.parse(content)
+    assert not feed.bozo, feed.bozo_exception
+    return [RSSCrawler._normalize_entry(entry) for entry in feed.entries]
+
+
+@pytest.mark.parametrize('content', [RSS2, RSS1, ATOM], ids=['rss2', 'rss1', 'atom'])
+def test_matches_feedparser(content):
+    streamed = list(iter_entries(content))
+    expected = _feedparser_entries(content)
+
+    assert len(streamed) == len(expected)
+    for ours, theirs in zip(streamed, expected):
+        assert {k: ours[k] for k in FIELDS} == {k: theirs[k] for k in FIELDS}
+
+
+def test_permalink_guid_is_url_only_without_link():
+    entries = {entry['title']: entry for entry in iter_entries(RSS2)}
+
+    assert entries['Permalink guid only']['url'] == 'https://grid.example.com/a/2'
+    assert entries['Explicit permalink guid']['url'] == 'https://grid.example.com/a/3'
+    assert entries['Link and permalink guid differ']['url'] == 'https://grid.example.com/a/4'
+
+
+def test_non_permalink_guid_is_not_a_url():
+    content = RSS2.replace(b'<guid>https://grid.example.com/a/2</guid>',
+                           b'<guid isPermaLink="false">https://grid.example.com/a/2</guid>')
+    entries = {entry['title']: entry for entry in iter_entries(content)}
+
+    assert entries['Permalink guid only']['url'] == ''
+
+
+def test_unrecognised_items_fall_back_to_feedparser():
+    with pytest.raises(StreamParseError):
+        list(iter_entries(RSS090))
+
+    crawler = RSSCrawler.__new__(RSSCrawler)
+    crawler.streaming = True
+    entries = crawler._parse_entries(RSS090, {}, source='legacy')
+
+    assert [entry['url'] for entry in entries] == [
+        'https://legacy.example.com/coal', 'https://legacy.example.com/hydro'
+    ]
+
+
+def test_items_without_links_fall_back():
+    content = b'<rss><channel><item><title>No link</title><guid isPermaLink="false">x</guid></item></channel></rss>'
+
+    with pytest.raises(StreamParseError):
+        list(iter_entries(content))
+
+
+def test_empty_channel_is_not_an_error():
+    assert list(iter_entries(b'<rss><channel><title>Quiet</title></channel></rss>')) == []
+
+
+def test_read_entries_stops_behind_cutoff():
+    entries, stopped_early = read_entries(RSS2, cutoff_time=datetime(2025, 10, 14), patience=2)
+
+    assert stopped_early
+    assert [entry['title'] for entry in entries] == [
+        'Offshore wind auction clears record capacity', 'Permalink guid only', 'Explicit permalink guid'
+    ]